@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -39,12 +41,26 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'aprendices',
     'django_celery_results',
+    'import_export',
 ]
 
 # MEDIA (para uploads temporales)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'  # (si usas pathlib) o 'os.path.join(BASE_DIR, "media")'
 
+# Caché de reportes Excel generados (media/reportes/cache)
+REPORTES_CACHE_MAX_BYTES = 200 * 1024 * 1024  # 200 MB
+REPORTES_CACHE_MAX_EDAD = 7 * 24 * 3600       # 7 días (segundos)
+
+# Retención de reportes registrados/precalculados (media/reportes/<trabajo>)
+REPORTES_RETENCION_DIAS = 7
+REPORTES_RETENCION_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB
+REPORTES_PENDIENTE_MAX_HORAS = 24  # los PENDIENTES más viejos se marcan ERROR (no se van a generar)
+
+# Procesos del pool compartido que arma los paquetes ZIP por centro: es el
+# máximo de libros generándose a la vez entre todas las descargas (1 = sin pool)
+REPORTES_PAQUETE_PROCESOS = 2
+
 # Email (configúrala con tu SMTP institucional)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.tu-institucion.edu'   # ajusta
@@ -55,6 +71,7 @@ EMAIL_USE_TLS = True
 DEFAULT_FROM_EMAIL = 'no-reply@tu-centro.edu.co'
 SITE_URL = 'http://127.0.0.1:8000'  # ajustar producción
 MIDDLEWARE = [
+    'aprendices.middleware.PerfilPeticionesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -136,12 +153,59 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+# Cache de vistas (aprendices/utils/cache_vistas.py). En local basta locmem
+# (o FileBasedCache); en producción, con varios procesos, un Redis compartido:
+# CACHE_REDIS_URL=redis://localhost:6379/1
+if os.environ.get('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'circular120',
+        }
+    }
+# Segundos que vive una entrada; los cambios de datos la invalidan antes
+CACHE_VISTAS_TIEMPO = 15 * 60
+
+# Perfilado de peticiones (aprendices/middleware.py), desactivado por defecto.
+# Resultados en el admin: Perfiles de Peticiones > Peores endpoints
+PERFIL_PETICIONES = os.environ.get('PERFIL_PETICIONES') == '1'
+PERFIL_MUESTREO = float(os.environ.get('PERFIL_MUESTREO', '0.05'))  # fracción de peticiones con detalle
+PERFIL_UMBRAL_MS = 2000          # las más lentas se registran siempre (solo tiempo total); None = no
+PERFIL_CONSULTAS_LENTAS = 5      # consultas más lentas guardadas por petición
+PERFIL_EXCLUIR_RUTAS = ['/static/', '/media/', '/admin/jsi18n/']
+PERFIL_RETENCION_DIAS = 30
+
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/aprendices/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    # Reportes precalculados para las descargas de la mañana
+    'precalcular-reportes-nocturnos': {
+        'task': 'aprendices.tasks.precalcular_reportes_task',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    # Resúmenes del dashboard (los casos vencidos cambian con la fecha)
+    'reconstruir-resumenes-diarios': {
+        'task': 'aprendices.tasks.reconstruir_resumenes_task',
+        'schedule': crontab(hour=0, minute=5),
+    },
+    # Retención de los perfiles de peticiones
+    'purgar-perfiles-peticiones': {
+        'task': 'aprendices.tasks.purgar_perfiles_task',
+        'schedule': crontab(hour=3, minute=0),
+    },
+}
 
 
 LOGOUT_ALLOWED_METHODS = ['POST', 'GET']
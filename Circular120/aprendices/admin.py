@@ -1,13 +1,24 @@
 # aprendices/admin.py
-from django.contrib import admin
+from datetime import timedelta
+
+from django.contrib import admin, messages
+from django.db.models import Q
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
 from import_export import resources, fields
 from import_export.widgets import ForeignKeyWidget, DateWidget
 from import_export.admin import ImportExportModelAdmin
 from .models import (
     Aprendiz, Ficha, Inasistencia, Competencia, 
     ResultadoAprendizaje, AprendizResultado, ActaComite,
-    CentroFormacion, RolAdministrativo
+    CentroFormacion, RolAdministrativo, ReporteGenerado, ResumenEstadisticas, PerfilPeticion,
+    CambioEstadoAprendiz, ESTADOS_CERRADOS,
 )
+from .utils.busqueda import buscar_aprendices
+from .utils.estados import cambiar_estado_aprendices
+from .utils.paginacion import PaginadorEstimado
+from .utils.perfilado import peores_endpoints, tendencia_diaria
 
 
 # ==================== RESOURCES ====================
@@ -46,6 +57,37 @@ class AprendizResource(resources.ModelResource):
         export_order = fields
 
 
+# ==================== TABLAS GRANDES ====================
+
+class TablaGrandeAdminMixin:
+    """
+    Para tablas de cientos de miles de filas: un solo COUNT (estimado sin
+    filtros, acotado con filtros) y sin date_hierarchy, que agrupa la tabla
+    completa por año; las fechas se filtran con list_filter.
+    """
+    show_full_result_count = False
+    paginator = PaginadorEstimado
+
+
+def buscar_por_aprendiz(queryset, texto, campo='aprendiz', campo_ficha='ficha_id', extra=None):
+    """
+    Búsqueda del admin con el índice de aprendices (utils/busqueda.py) en
+    lugar de LIKE sobre cada campo. Un número también se busca como ficha
+    (campo_ficha; None si el modelo no tiene ficha).
+    extra: Q adicional con la que se combina (OR) la búsqueda.
+    """
+    texto = texto.strip()
+    if not texto:
+        return queryset
+    aprendices = buscar_aprendices(Aprendiz.objects.all(), texto).values('pk')
+    condicion = Q(**{f'{campo}__in': aprendices})
+    if campo_ficha and texto.isdigit():
+        condicion |= Q(**{campo_ficha: texto})
+    if extra is not None:
+        condicion |= extra
+    return queryset.filter(condicion)
+
+
 # ==================== ADMIN CLASSES ====================
 
 @admin.register(CentroFormacion)
@@ -62,15 +104,22 @@ class FichaAdmin(admin.ModelAdmin):
     list_filter = ['centro', 'fecha_inicio']
     search_fields = ['numero', 'programa', 'instructor']
     date_hierarchy = 'fecha_inicio'
+    list_select_related = ['centro']
+    autocomplete_fields = ['centro']
 
 
 @admin.register(Aprendiz)
-class AprendizAdmin(ImportExportModelAdmin):
+class AprendizAdmin(TablaGrandeAdminMixin, ImportExportModelAdmin):
     resource_class = AprendizResource
     list_display = ['documento', 'nombre', 'apellido', 'ficha', 'estado_formacion', 'fecha_inicio']
-    list_filter = ['estado_formacion', 'ficha']
+    # Por ficha se filtra buscando su número: un filtro listaría todas las fichas
+    list_filter = ['estado_formacion', 'ficha__centro', 'fecha_inicio']
     search_fields = ['documento', 'nombre', 'apellido']
-    date_hierarchy = 'fecha_inicio'
+    search_help_text = 'Nombre, apellido o documento (sin importar tildes), o número de ficha'
+    list_select_related = ['ficha']
+    autocomplete_fields = ['ficha']
+    
+    actions = ['certificar_seleccionados', 'cancelar_seleccionados']
     
     fieldsets = (
         ('Información Personal', {
@@ -87,14 +136,43 @@ class AprendizAdmin(ImportExportModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def _cambiar_estado(self, request, queryset, estado):
+        # Igual que en los lotes de la web, los cerrados no cambian en masa:
+        # reabrir un certificado o cancelado se hace editando el aprendiz
+        abiertos = queryset.exclude(estado_formacion__in=ESTADOS_CERRADOS)
+        total = cambiar_estado_aprendices(abiertos, estado, request.user, origen='ADMIN')
+        self.message_user(request, f'{total} aprendices marcados como {estado}')
+        omitidos = queryset.filter(estado_formacion__in=ESTADOS_CERRADOS).exclude(estado_formacion=estado).count()
+        if omitidos:
+            self.message_user(
+                request, f'{omitidos} omitidos por estar certificados o cancelados', level=messages.WARNING
+            )
+    
+    def certificar_seleccionados(self, request, queryset):
+        self._cambiar_estado(request, queryset, 'CERTIFICADO')
+    certificar_seleccionados.short_description = 'Marcar como CERTIFICADO'
+    
+    def cancelar_seleccionados(self, request, queryset):
+        self._cambiar_estado(request, queryset, 'CANCELADO')
+    cancelar_seleccionados.short_description = 'Marcar como CANCELADO'
+    
+    def get_search_results(self, request, queryset, search_term):
+        # También la usa el autocompletar de los formularios con campo aprendiz
+        return buscar_por_aprendiz(queryset, search_term, campo='pk'), False
 
 
 @admin.register(Inasistencia)
-class InasistenciaAdmin(admin.ModelAdmin):
+class InasistenciaAdmin(TablaGrandeAdminMixin, admin.ModelAdmin):
     list_display = ['aprendiz', 'ficha', 'fecha', 'justificada', 'reportado_por']
-    list_filter = ['justificada', 'ficha', 'fecha']
+    list_filter = ['justificada', 'ficha__centro', 'fecha']
     search_fields = ['aprendiz__documento', 'aprendiz__nombre', 'aprendiz__apellido']
-    date_hierarchy = 'fecha'
+    search_help_text = 'Nombre, apellido o documento del aprendiz, o número de ficha'
+    list_select_related = ['aprendiz', 'ficha']
+    autocomplete_fields = ['aprendiz', 'ficha']
+    
+    def get_search_results(self, request, queryset, search_term):
+        return buscar_por_aprendiz(queryset, search_term), False
 
 
 @admin.register(Competencia)
@@ -108,22 +186,34 @@ class ResultadoAprendizajeAdmin(admin.ModelAdmin):
     list_display = ['codigo', 'nombre', 'competencia']
     list_filter = ['competencia']
     search_fields = ['codigo', 'nombre']
+    list_select_related = ['competencia']
+    autocomplete_fields = ['competencia']
 
 
 @admin.register(AprendizResultado)
-class AprendizResultadoAdmin(admin.ModelAdmin):
+class AprendizResultadoAdmin(TablaGrandeAdminMixin, admin.ModelAdmin):
     list_display = ['aprendiz', 'resultado', 'estado', 'fecha']
     list_filter = ['estado', 'fecha']
     search_fields = ['aprendiz__documento', 'aprendiz__nombre', 'resultado__codigo']
-    date_hierarchy = 'fecha'
+    search_help_text = 'Nombre, apellido o documento del aprendiz, o código del resultado'
+    list_select_related = ['aprendiz', 'resultado']
+    autocomplete_fields = ['aprendiz', 'resultado']
+    
+    def get_search_results(self, request, queryset, search_term):
+        return buscar_por_aprendiz(
+            queryset, search_term, campo_ficha=None, extra=Q(resultado__codigo=search_term.strip())
+        ), False
 
 
 @admin.register(ActaComite)
 class ActaComiteAdmin(admin.ModelAdmin):
     list_display = ['ficha', 'fecha', 'creado_por', 'created_at']
-    list_filter = ['fecha', 'ficha']
+    # Solo las fichas con actas, no todas
+    list_filter = ['fecha', ('ficha', admin.RelatedOnlyFieldListFilter)]
     search_fields = ['ficha__numero', 'contenido']
     date_hierarchy = 'fecha'
+    list_select_related = ['ficha', 'creado_por']
+    autocomplete_fields = ['ficha']
 
 
 @admin.register(RolAdministrativo)
@@ -132,6 +222,8 @@ class RolAdministrativoAdmin(admin.ModelAdmin):
     list_filter = ['tipo_rol', 'centro', 'activo']
     search_fields = ['usuario__username', 'usuario__first_name', 'usuario__last_name']
     date_hierarchy = 'fecha_inicio'
+    list_select_related = ['usuario', 'centro']
+    autocomplete_fields = ['usuario', 'centro']
     
     actions = ['deshabilitar_roles']
     
@@ -152,4 +244,92 @@ class RolAdministrativoAdmin(admin.ModelAdmin):
         for rol in queryset:
             rol.deshabilitar()
         self.message_user(request, f'{queryset.count()} roles deshabilitados correctamente')
-    deshabilitar_roles.short_description = 'Deshabilitar roles seleccionados'
\ No newline at end of file
+    deshabilitar_roles.short_description = 'Deshabilitar roles seleccionados'
+
+
+@admin.register(ReporteGenerado)
+class ReporteGeneradoAdmin(admin.ModelAdmin):
+    list_display = ['tipo', 'centro', 'ficha', 'origen', 'estado', 'tamano', 'job_id', 'created_at', 'finalizado']
+    list_filter = ['tipo', 'estado', 'origen', 'centro']
+    search_fields = ['job_id']
+    date_hierarchy = 'created_at'
+    list_select_related = ['centro', 'ficha']
+
+
+@admin.register(ResumenEstadisticas)
+class ResumenEstadisticasAdmin(admin.ModelAdmin):
+    list_display = ['clave', 'ambito', 'total_aprendices', 'total_inasistencias', 'juicios_pendientes', 'casos_urgentes', 'fecha_calculo', 'updated_at']
+    list_filter = ['ambito', 'fecha_calculo']
+    search_fields = ['clave']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(CambioEstadoAprendiz)
+class CambioEstadoAprendizAdmin(TablaGrandeAdminMixin, admin.ModelAdmin):
+    list_display = ['aprendiz', 'estado_anterior', 'estado_nuevo', 'usuario', 'origen', 'lote', 'created_at']
+    list_filter = ['estado_nuevo', 'origen', 'created_at']
+    search_fields = ['aprendiz__documento', 'lote', 'usuario__username']
+    list_select_related = ['aprendiz', 'usuario']
+    
+    # El historial solo lo escriben las acciones de cambio de estado
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PerfilPeticion)
+class PerfilPeticionAdmin(TablaGrandeAdminMixin, admin.ModelAdmin):
+    list_display = ['created_at', 'metodo', 'vista', 'estado_http', 'tiempo_total_ms', 'consultas', 'tiempo_sql_ms', 'tiempo_plantillas_ms', 'muestreada']
+    list_filter = ['created_at', 'muestreada', 'metodo', 'estado_http', 'vista']
+    search_fields = ['vista', 'ruta']
+    list_select_related = ['usuario']
+    change_list_template = 'admin/aprendices/perfilpeticion/change_list.html'
+    
+    PERIODOS = {'1': 'Último día', '7': 'Últimos 7 días', '30': 'Últimos 30 días'}
+    ORDENES = {'total': 'Tiempo acumulado', 'promedio': 'Tiempo promedio', 'maximo': 'Tiempo máximo'}
+    
+    # Los perfiles solo los escribe el middleware
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def get_urls(self):
+        urls = [
+            path(
+                'peores-endpoints/',
+                self.admin_site.admin_view(self.peores_endpoints_view),
+                name='aprendices_perfilpeticion_peores',
+            ),
+        ]
+        return urls + super().get_urls()
+    
+    def peores_endpoints_view(self, request):
+        """Vistas más lentas del periodo y su tendencia diaria"""
+        periodo = request.GET.get('periodo', '7')
+        if periodo not in self.PERIODOS:
+            periodo = '7'
+        orden = request.GET.get('orden', 'total')
+        if orden not in self.ORDENES:
+            orden = 'total'
+        
+        desde = timezone.now() - timedelta(days=int(periodo))
+        endpoints = peores_endpoints(desde, orden=orden)
+        # Tendencia solo de las 5 peores para no cargar la página
+        tendencia = tendencia_diaria([e['vista'] for e in endpoints[:5]], desde)
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Peores endpoints',
+            'endpoints': endpoints,
+            'tendencia': tendencia,
+            'periodo': periodo,
+            'orden': orden,
+            'periodos': self.PERIODOS,
+            'ordenes': self.ORDENES,
+        }
+        return TemplateResponse(request, 'admin/aprendices/perfilpeticion/peores_endpoints.html', context)
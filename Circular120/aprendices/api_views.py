@@ -1,14 +1,20 @@
 # aprendices/api_views.py - CREAR ESTE ARCHIVO
 
+from django.db.models import Count
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.core.serializers import serialize
 from .models import Aprendiz, Ficha, CentroFormacion, RolAdministrativo
+from .utils.busqueda import buscar_aprendices, filtro_prefijo
+from .utils.cache_vistas import cachear_json, metricas_cache
 import json
 
+LIMITE_AUTOCOMPLETAR = 20
+
 @login_required
 @require_http_methods(["GET"])
+@cachear_json('api:aprendices')
 def aprendices_json(request):
     """API JSON para lista de aprendices con filtros"""
     
@@ -23,6 +29,10 @@ def aprendices_json(request):
     if estado:
         aprendices = aprendices.filter(estado_formacion=estado)
     
+    texto = request.GET.get('q', '').strip()
+    if texto:
+        aprendices = buscar_aprendices(aprendices, texto)
+    
     data = {
         'success': True,
         'count': aprendices.count(),
@@ -45,12 +55,51 @@ def aprendices_json(request):
 
 @login_required
 @require_http_methods(["GET"])
+@cachear_json('api:autocompletar_aprendices')
+def autocompletar_aprendices(request):
+    """Autocompletar: aprendices por nombre, apellido o prefijo del documento (?q=)"""
+    texto = request.GET.get('q', '').strip()
+    if not texto:
+        return JsonResponse({'resultados': []})
+    
+    aprendices = buscar_aprendices(Aprendiz.objects.all(), texto).order_by('apellido', 'nombre', 'documento')
+    return JsonResponse({
+        'resultados': [
+            {'id': documento, 'texto': f"{documento} - {nombre} {apellido}", 'ficha': ficha}
+            for documento, nombre, apellido, ficha in aprendices.values_list(
+                'documento', 'nombre', 'apellido', 'ficha_id'
+            )[:LIMITE_AUTOCOMPLETAR]
+        ]
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+@cachear_json('api:autocompletar_fichas')
+def autocompletar_fichas(request):
+    """Autocompletar: fichas cuyo número empieza por ?q= (rango sobre la llave primaria)"""
+    texto = request.GET.get('q', '').strip()
+    if not texto:
+        return JsonResponse({'resultados': []})
+    
+    fichas = Ficha.objects.filter(filtro_prefijo('numero', texto)).order_by('numero')
+    return JsonResponse({
+        'resultados': [
+            {'id': numero, 'texto': f"{numero} - {programa}"}
+            for numero, programa in fichas.values_list('numero', 'programa')[:LIMITE_AUTOCOMPLETAR]
+        ]
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+@cachear_json('api:fichas')
 def fichas_json(request):
     """API JSON para lista de fichas"""
     
     centro_id = request.GET.get('centro')
     
-    fichas = Ficha.objects.all()
+    fichas = Ficha.objects.annotate(num_aprendices=Count('aprendices'))
     
     if centro_id:
         fichas = fichas.filter(centro__codigo=centro_id)
@@ -65,7 +114,7 @@ def fichas_json(request):
                 'instructor': f.instructor,
                 'fecha_inicio': f.fecha_inicio.isoformat() if f.fecha_inicio else None,
                 'fecha_fin': f.fecha_fin.isoformat() if f.fecha_fin else None,
-                'total_aprendices': f.aprendices.count(),
+                'total_aprendices': f.num_aprendices,
             }
             for f in fichas
         ]
@@ -76,6 +125,7 @@ def fichas_json(request):
 
 @login_required
 @require_http_methods(["GET"])
+@cachear_json('api:centros')
 def centros_json(request):
     """API JSON para lista de centros de formación"""
     
@@ -108,6 +158,7 @@ def centros_json(request):
 
 @login_required
 @require_http_methods(["GET"])
+@cachear_json('api:roles')
 def roles_json(request):
     """API JSON para roles administrativos"""
     
@@ -153,6 +204,15 @@ def roles_json(request):
     return JsonResponse(data)
 
 
+@login_required
+@require_http_methods(["GET"])
+def metricas_cache_json(request):
+    """Aciertos y fallos del cache de vistas (solo administradores)"""
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Solo para administradores'}, status=403)
+    return JsonResponse({'success': True, 'vistas': metricas_cache()})
+
+
 @login_required
 @require_http_methods(["POST"])
 def deshabilitar_rol(request, rol_id):
@@ -1,6 +1,8 @@
 # aprendices/filters.py
 import django_filters
+from .forms import AutocompletarWidget
 from .models import Aprendiz, Ficha, CentroFormacion
+from .utils.busqueda import buscar_aprendices
 
 class AprendizFilter(django_filters.FilterSet):
     """Filtros para la lista de aprendices"""
@@ -8,7 +10,7 @@ class AprendizFilter(django_filters.FilterSet):
     ficha = django_filters.ModelChoiceFilter(
         queryset=Ficha.objects.all(),
         label='Ficha',
-        empty_label='Todas las fichas'
+        widget=AutocompletarWidget('autocompletar_fichas', Ficha)
     )
     
     estado_formacion = django_filters.ChoiceFilter(
@@ -17,6 +19,13 @@ class AprendizFilter(django_filters.FilterSet):
         empty_label='Todos los estados'
     )
     
+    q = django_filters.CharFilter(
+        method='filtrar_busqueda',
+        label='Buscar por nombre, apellido o documento'
+    )
+    
+    # El índice de búsqueda mezcla nombre, apellido y documento: estos dos
+    # filtros buscan solo en su columna, como siempre
     nombre = django_filters.CharFilter(
         lookup_expr='icontains',
         label='Buscar por nombre'
@@ -28,13 +37,17 @@ class AprendizFilter(django_filters.FilterSet):
     )
     
     documento = django_filters.CharFilter(
-        lookup_expr='icontains',
+        lookup_expr='startswith',
         label='Buscar por documento'
     )
     
     class Meta:
         model = Aprendiz
-        fields = ['ficha', 'estado_formacion', 'nombre', 'apellido', 'documento']
+        fields = ['ficha', 'estado_formacion', 'q', 'nombre', 'apellido', 'documento']
+    
+    def filtrar_busqueda(self, queryset, name, value):
+        # Índice de búsqueda sin tildes (utils/busqueda.py) en lugar de icontains
+        return buscar_aprendices(queryset, value)
 
 
 class FichaFilter(django_filters.FilterSet):
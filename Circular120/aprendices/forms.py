@@ -1,7 +1,30 @@
 # aprendices/forms.py
 from django import forms
+from django.urls import reverse
 from .models import Aprendiz, Inasistencia, Ficha
 
+
+class AutocompletarWidget(forms.TextInput):
+    """
+    Campo de texto con sugerencias de un endpoint de autocompletar (?q=) en
+    lugar de un <select> con todos los registros: la página solo carga la
+    etiqueta del valor actual.
+    """
+    template_name = 'aprendices/widgets/autocompletar.html'
+
+    def __init__(self, url_name, modelo, attrs=None):
+        self.url_name = url_name
+        self.modelo = modelo
+        super().__init__(attrs={'class': 'form-control', **(attrs or {})})
+
+    def get_context(self, name, value, attrs):
+        ctx = super().get_context(name, value, attrs)
+        objeto = self.modelo.objects.filter(pk=value).first() if value else None
+        ctx['widget']['url'] = reverse(self.url_name)
+        ctx['widget']['etiqueta'] = str(objeto) if objeto else (value or '')
+        return ctx
+
+
 class AprendizForm(forms.ModelForm):
     class Meta:
         model = Aprendiz
@@ -23,7 +46,7 @@ class AprendizForm(forms.ModelForm):
             'email': forms.EmailInput(attrs={'class': 'form-control'}),
             'telefono': forms.TextInput(attrs={'class': 'form-control'}),
             'estado_formacion': forms.Select(attrs={'class': 'form-control'}),
-            'ficha': forms.Select(attrs={'class': 'form-control'}),
+            'ficha': AutocompletarWidget('autocompletar_fichas', Ficha),
         }
         labels = {
             'documento': 'Documento de Identidad',
@@ -47,8 +70,8 @@ class InasistenciaForm(forms.ModelForm):
         widgets = {
             'fecha': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
             'motivo': forms.Textarea(attrs={'rows': 2, 'class': 'form-control'}),
-            'aprendiz': forms.Select(attrs={'class': 'form-control'}),
-            'ficha': forms.Select(attrs={'class': 'form-control'}),
+            'aprendiz': AutocompletarWidget('autocompletar_aprendices', Aprendiz),
+            'ficha': AutocompletarWidget('autocompletar_fichas', Ficha),
             'justificada': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
             'reportado_por': forms.TextInput(attrs={'class': 'form-control'}),
         }
@@ -94,7 +117,7 @@ class UploadFichaDataForm(forms.Form):
     ficha = forms.ModelChoiceField(
         queryset=Ficha.objects.all(),
         label='Seleccionar Ficha',
-        widget=forms.Select(attrs={'class': 'form-control'}),
+        widget=AutocompletarWidget('autocompletar_fichas', Ficha),
         help_text='Selecciona la ficha a la que pertenecen los datos que vas a importar'
     )
     
@@ -0,0 +1,49 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from aprendices.models import CentroFormacion
+from aprendices.utils.paquete_reportes import generar_paquete_centro
+from aprendices.utils.reportes import TIPOS_REPORTE
+
+
+class Command(BaseCommand):
+    help = 'Genera un ZIP con los reportes de cada ficha de un centro de formación'
+
+    def add_arguments(self, parser):
+        parser.add_argument('centro', type=str, help='Código del centro de formación')
+        parser.add_argument(
+            '--salida',
+            type=str,
+            default=None,
+            help='Ruta del ZIP (por defecto, paquete_reportes_<centro>_<fecha>.zip)',
+        )
+        parser.add_argument(
+            '--tipos',
+            nargs='+',
+            choices=TIPOS_REPORTE,
+            default=None,
+            help='Tipos de reporte a incluir (por defecto, todos)',
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=None,
+            help='Número de procesos (por defecto, REPORTES_PAQUETE_PROCESOS; 1 genera en el proceso actual)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            centro = CentroFormacion.objects.get(codigo=options['centro'])
+        except CentroFormacion.DoesNotExist:
+            raise CommandError(f'No existe el centro {options["centro"]}')
+
+        salida = options['salida'] or (
+            f'paquete_reportes_{centro.codigo}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.zip'
+        )
+        self.stdout.write(f'\n📦 Generando paquete de reportes de {centro}...\n')
+
+        with open(salida, 'wb') as destino:
+            generar_paquete_centro(centro, destino, tipos=options['tipos'], procesos=options['procesos'])
+
+        tamano = os.path.getsize(salida) / 1024
+        self.stdout.write(self.style.SUCCESS(f'✅ Paquete generado: {salida} ({tamano:.1f} KB)'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from aprendices.models import ReporteGenerado
+from aprendices.utils.reportes import registrar_trabajos_reportes, generar_reportes_en_paralelo
+
+
+class Command(BaseCommand):
+    help = 'Genera los reportes Excel (globales y por centro) en paralelo usando un pool de procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=None,
+            help='Número de procesos (por defecto, uno por CPU)',
+        )
+        parser.add_argument(
+            '--sin-centros',
+            action='store_true',
+            help='Generar solo los reportes globales',
+        )
+
+    def handle(self, *args, **options):
+        job_id, reporte_ids = registrar_trabajos_reportes(por_centro=not options['sin_centros'])
+        self.stdout.write(f'\n📋 Trabajo {job_id}: {len(reporte_ids)} reportes...\n')
+
+        generar_reportes_en_paralelo(reporte_ids, procesos=options['procesos'])
+
+        for reporte in ReporteGenerado.objects.filter(job_id=job_id).select_related('centro'):
+            if reporte.estado == 'LISTO':
+                self.stdout.write(self.style.SUCCESS(f'  ✅ {reporte} → {reporte.archivo.name}'))
+            else:
+                self.stdout.write(self.style.ERROR(f'  ❌ {reporte}: {reporte.error}'))
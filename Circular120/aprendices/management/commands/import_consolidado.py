@@ -3,11 +3,13 @@
 import os
 import glob
 import pandas as pd
-from datetime import datetime, date
+from datetime import datetime
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.utils import timezone
 from django.utils.dateparse import parse_date
 from aprendices.models import Aprendiz, Ficha, Inasistencia, Competencia, ResultadoAprendizaje, AprendizResultado
+from aprendices.utils.resumenes import lote_resumenes, marcar_fichas
 
 def choose_col(colmap, *cands):
     lower_map = {k.lower().strip(): k for k in colmap}
@@ -113,162 +115,172 @@ class Command(BaseCommand):
 
         stats = {'juicios': 0, 'aprendices': 0, 'fichas': 0, 'actualizados': 0}
 
-        for fpath in files:
-            self.stdout.write(f'\n📄 {os.path.basename(fpath)}')
+        # Resúmenes de estadísticas: un solo recálculo al final de la importación
+        with lote_resumenes():
+            for fpath in files:
+                self.stdout.write(f'\n📄 {os.path.basename(fpath)}')
             
-            try:
-                df_raw = pd.read_excel(fpath, header=None)
-                info_enc = extraer_info_simple(df_raw, self.stdout)
+                try:
+                    df_raw = pd.read_excel(fpath, header=None)
+                    info_enc = extraer_info_simple(df_raw, self.stdout)
                 
-                fila = detectar_fila_inicio(df_raw)
-                df = pd.read_excel(fpath, header=fila, dtype=str)
-                self.stdout.write(f'   ✓ {len(df)} registros')
+                    fila = detectar_fila_inicio(df_raw)
+                    df = pd.read_excel(fpath, header=fila, dtype=str)
+                    self.stdout.write(f'   ✓ {len(df)} registros')
                 
-            except Exception as e:
-                self.stdout.write(f'   ❌ {e}')
-                continue
+                except Exception as e:
+                    self.stdout.write(f'   ❌ {e}')
+                    continue
 
-            colmap = {c: c for c in df.columns}
-            cols_lower = [str(c).lower() for c in df.columns]
+                colmap = {c: c for c in df.columns}
+                cols_lower = [str(c).lower() for c in df.columns]
 
-            tiene_resultado = any(x in cols_lower for x in ['resultado', 'juicio', 'competencia'])
+                tiene_resultado = any(x in cols_lower for x in ['resultado', 'juicio', 'competencia'])
 
-            if tiene_resultado:
-                self.stdout.write('   🔹 JUICIOS')
+                if tiene_resultado:
+                    self.stdout.write('   🔹 JUICIOS')
                 
-                col_doc = choose_col(colmap, 'numero de documento', 'número', 'documento')
-                col_nombre = choose_col(colmap, 'nombre')
-                col_apellido = choose_col(colmap, 'apellido')
-                col_comp = choose_col(colmap, 'competencia')
-                col_ra = choose_col(colmap, 'resultado de aprendizaje', 'resultado')
-                col_juicio = choose_col(colmap, 'juicio de evaluacion', 'juicio')
+                    col_doc = choose_col(colmap, 'numero de documento', 'número', 'documento')
+                    col_nombre = choose_col(colmap, 'nombre')
+                    col_apellido = choose_col(colmap, 'apellido')
+                    col_comp = choose_col(colmap, 'competencia')
+                    col_ra = choose_col(colmap, 'resultado de aprendizaje', 'resultado')
+                    col_juicio = choose_col(colmap, 'juicio de evaluacion', 'juicio')
                 
-                if not col_doc:
-                    continue
+                    if not col_doc:
+                        continue
 
-                # CREAR FICHA PRIMERO
-                ficha_obj = None
-                if info_enc['ficha']:
-                    ficha_obj, created_fi = Ficha.objects.get_or_create(
-                        numero=info_enc['ficha'],
-                        defaults={'programa': info_enc['programa'] or 'Por definir'}
-                    )
+                    # CREAR FICHA PRIMERO
+                    ficha_obj = None
+                    if info_enc['ficha']:
+                        ficha_obj, created_fi = Ficha.objects.get_or_create(
+                            numero=info_enc['ficha'],
+                            defaults={'programa': info_enc['programa'] or 'Por definir'}
+                        )
                     
-                    # ACTUALIZAR el programa si se detectó y la ficha no lo tiene
-                    if info_enc['programa']:
-                        if not ficha_obj.programa or ficha_obj.programa == 'Por definir':
-                            ficha_obj.programa = info_enc['programa']
-                            ficha_obj.save()
-                            self.stdout.write(f'   ✅ Programa actualizado: {info_enc["programa"][:60]}')
+                        # ACTUALIZAR el programa si se detectó y la ficha no lo tiene
+                        if info_enc['programa']:
+                            if not ficha_obj.programa or ficha_obj.programa == 'Por definir':
+                                ficha_obj.programa = info_enc['programa']
+                                ficha_obj.save()
+                                self.stdout.write(f'   ✅ Programa actualizado: {info_enc["programa"][:60]}')
                     
-                    if created_fi:
-                        stats['fichas'] += 1
-                        self.stdout.write(f'   ✅ Ficha {info_enc["ficha"]} creada')
-                    else:
-                        self.stdout.write(f'   ✅ Ficha {info_enc["ficha"]} ya existe')
+                        if created_fi:
+                            stats['fichas'] += 1
+                            self.stdout.write(f'   ✅ Ficha {info_enc["ficha"]} creada')
+                        else:
+                            self.stdout.write(f'   ✅ Ficha {info_enc["ficha"]} ya existe')
 
-                docs_procesados = []
-                creados = 0
+                    docs_procesados = []
+                    creados = 0
                 
-                # Recopilar datos primero
-                aprendices_a_crear = []
-                aprendices_a_actualizar = []
-                juicios_a_crear = []
+                    # Recopilar datos primero
+                    aprendices_a_crear = []
+                    aprendices_a_actualizar = []
+                    juicios_a_crear = []
                 
-                for idx, row in df.iterrows():
-                    try:
-                        doc = normalizar_documento(row.get(col_doc))
-                        if not doc or len(doc) < 4:
-                            continue
+                    for idx, row in df.iterrows():
+                        try:
+                            doc = normalizar_documento(row.get(col_doc))
+                            if not doc or len(doc) < 4:
+                                continue
 
-                        docs_procesados.append(doc)
-                        nombre = str(row.get(col_nombre) or 'Por actualizar').strip() if col_nombre else 'Por actualizar'
-                        apellido = str(row.get(col_apellido) or '').strip() if col_apellido else ''
+                            docs_procesados.append(doc)
+                            nombre = str(row.get(col_nombre) or 'Por actualizar').strip() if col_nombre else 'Por actualizar'
+                            apellido = str(row.get(col_apellido) or '').strip() if col_apellido else ''
 
-                        # Verificar si existe
-                        existe = Aprendiz.objects.filter(documento=doc).exists()
+                            # Verificar si existe
+                            existe = Aprendiz.objects.filter(documento=doc).exists()
                         
-                        if not existe:
-                            aprendices_a_crear.append(Aprendiz(
-                                documento=doc,
-                                nombre=nombre,
-                                apellido=apellido,
-                                estado_formacion='EN_FORMACION',
-                                ficha=ficha_obj
-                            ))
-                        else:
-                            aprendices_a_actualizar.append(doc)
+                            if not existe:
+                                aprendices_a_crear.append(Aprendiz(
+                                    documento=doc,
+                                    nombre=nombre,
+                                    apellido=apellido,
+                                    estado_formacion='EN_FORMACION',
+                                    ficha=ficha_obj
+                                ))
+                            else:
+                                aprendices_a_actualizar.append(doc)
 
-                        # Juicios
-                        comp_code = str(row.get(col_comp) or '').strip() if col_comp else None
-                        ra_text = str(row.get(col_ra) or '').strip() if col_ra else None
-                        juicio_text = str(row.get(col_juicio) or '').strip() if col_juicio else ''
+                            # Juicios
+                            comp_code = str(row.get(col_comp) or '').strip() if col_comp else None
+                            ra_text = str(row.get(col_ra) or '').strip() if col_ra else None
+                            juicio_text = str(row.get(col_juicio) or '').strip() if col_juicio else ''
 
-                        if ra_text and len(ra_text) >= 5:
-                            ra_code = ra_text.split('-')[0].split(':')[0].strip()
+                            if ra_text and len(ra_text) >= 5:
+                                ra_code = ra_text.split('-')[0].split(':')[0].strip()
 
-                            competencia = None
-                            if comp_code:
-                                competencia, _ = Competencia.objects.get_or_create(
-                                    codigo=comp_code, defaults={'nombre': comp_code}
-                                )
+                                competencia = None
+                                if comp_code:
+                                    competencia, _ = Competencia.objects.get_or_create(
+                                        codigo=comp_code, defaults={'nombre': comp_code}
+                                    )
 
-                            ra_obj, _ = ResultadoAprendizaje.objects.get_or_create(
-                                codigo=ra_code,
-                                defaults={'nombre': ra_text[:200], 'competencia': competencia}
-                            )
+                                ra_obj, _ = ResultadoAprendizaje.objects.get_or_create(
+                                    codigo=ra_code,
+                                    defaults={'nombre': ra_text[:200], 'competencia': competencia}
+                                )
 
-                            estado = 'PENDIENTE'
-                            if juicio_text:
-                                j = juicio_text.lower()
-                                if 'aprob' in j:
-                                    estado = 'APROBADO'
-                                elif 'evaluar' in j:
-                                    estado = 'PENDIENTE'
+                                estado = 'PENDIENTE'
+                                if juicio_text:
+                                    j = juicio_text.lower()
+                                    if 'aprob' in j:
+                                        estado = 'APROBADO'
+                                    elif 'evaluar' in j:
+                                        estado = 'PENDIENTE'
 
-                            # Guardar para crear después
-                            juicios_a_crear.append({
-                                'documento': doc,
-                                'resultado': ra_obj,
-                                'estado': estado
-                            })
-                            creados += 1
-                    except Exception as e:
-                        self.stdout.write(f'   ⚠ Error fila {idx}: {e}')
-                        pass
+                                # Guardar para crear después
+                                juicios_a_crear.append({
+                                    'documento': doc,
+                                    'resultado': ra_obj,
+                                    'estado': estado
+                                })
+                                creados += 1
+                        except Exception as e:
+                            self.stdout.write(f'   ⚠ Error fila {idx}: {e}')
+                            pass
                 
-                # Crear aprendices nuevos en bulk
-                if aprendices_a_crear:
-                    Aprendiz.objects.bulk_create(aprendices_a_crear, ignore_conflicts=True)
-                    stats['aprendices'] += len(aprendices_a_crear)
+                    # Crear aprendices nuevos en bulk
+                    if aprendices_a_crear:
+                        for aprendiz in aprendices_a_crear:
+                            aprendiz.actualizar_busqueda()
+                        Aprendiz.objects.bulk_create(aprendices_a_crear, ignore_conflicts=True)
+                        stats['aprendices'] += len(aprendices_a_crear)
+                        marcar_fichas([ficha_obj.numero if ficha_obj else None])
                 
-                # Actualizar aprendices existentes (asignar ficha)
-                if aprendices_a_actualizar:
-                    Aprendiz.objects.filter(documento__in=aprendices_a_actualizar).update(ficha=ficha_obj)
-                
-                # Crear juicios
-                for juicio_data in juicios_a_crear:
-                    try:
-                        aprendiz = Aprendiz.objects.get(documento=juicio_data['documento'])
-                        AprendizResultado.objects.update_or_create(
-                            aprendiz=aprendiz,
-                            resultado=juicio_data['resultado'],
-                            defaults={'estado': juicio_data['estado'], 'fecha': date.today()}
+                    # Actualizar aprendices existentes (asignar ficha)
+                    if aprendices_a_actualizar:
+                        actualizados = Aprendiz.objects.filter(documento__in=aprendices_a_actualizar)
+                        # bulk_create / update no disparan señales
+                        marcar_fichas(
+                            set(actualizados.values_list('ficha_id', flat=True)) | {ficha_obj.numero if ficha_obj else None}
                         )
-                    except:
-                        pass
+                        actualizados.update(ficha=ficha_obj)
+                
+                    # Crear juicios
+                    for juicio_data in juicios_a_crear:
+                        try:
+                            aprendiz = Aprendiz.objects.get(documento=juicio_data['documento'])
+                            AprendizResultado.objects.update_or_create(
+                                aprendiz=aprendiz,
+                                resultado=juicio_data['resultado'],
+                                defaults={'estado': juicio_data['estado'], 'fecha': timezone.localdate()}
+                            )
+                        except:
+                            pass
 
-                self.stdout.write(f'   ✓ {creados} juicios')
-                stats['juicios'] += creados
+                    self.stdout.write(f'   ✓ {creados} juicios')
+                    stats['juicios'] += creados
                 
-                # GUARDAR lista de documentos procesados en archivo temporal
-                if docs_procesados:
-                    import tempfile
-                    temp_docs_file = os.path.join(tempfile.gettempdir(), 'docs_procesados.txt')
-                    with open(temp_docs_file, 'w') as f:
-                        for doc in docs_procesados:
-                            f.write(f"{doc}\n")
-                    self.stdout.write(f'   📝 {len(docs_procesados)} documentos guardados para actualización')
+                    # GUARDAR lista de documentos procesados en archivo temporal
+                    if docs_procesados:
+                        import tempfile
+                        temp_docs_file = os.path.join(tempfile.gettempdir(), 'docs_procesados.txt')
+                        with open(temp_docs_file, 'w') as f:
+                            for doc in docs_procesados:
+                                f.write(f"{doc}\n")
+                        self.stdout.write(f'   📝 {len(docs_procesados)} documentos guardados para actualización')
 
         self.stdout.write('\n' + '='*60)
         self.stdout.write(f'📋 Juicios: {stats["juicios"]}')
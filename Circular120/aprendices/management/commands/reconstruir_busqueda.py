@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from aprendices.models import Aprendiz
+from aprendices.utils.busqueda import instalar_indice_busqueda
+from aprendices.utils.cache_vistas import invalidar_vistas
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la columna de búsqueda de los aprendices y reconstruye el índice (FTS5 / trigramas)'
+
+    def handle(self, *args, **options):
+        lote = []
+        total = 0
+        for aprendiz in Aprendiz.objects.only('documento', 'nombre', 'apellido', 'busqueda').iterator(chunk_size=2000):
+            anterior = aprendiz.busqueda
+            aprendiz.actualizar_busqueda()
+            if aprendiz.busqueda != anterior:
+                lote.append(aprendiz)
+            if len(lote) >= 2000:
+                total += Aprendiz.objects.bulk_update(lote, ['busqueda'])
+                lote = []
+        total += Aprendiz.objects.bulk_update(lote, ['busqueda'])
+        # bulk_update no dispara señales: los resultados de búsqueda cacheados quedan viejos
+        invalidar_vistas()
+
+        if instalar_indice_busqueda(reconstruir=True):
+            self.stdout.write(self.style.SUCCESS(f'✅ {total} aprendices actualizados; índice de búsqueda reconstruido'))
+        else:
+            self.stdout.write(self.style.WARNING(f'⚠ {total} aprendices actualizados; el motor no tiene índice de búsqueda (se usa LIKE)'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from aprendices.utils.resumenes import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero los resúmenes de estadísticas (global, por centro y por ficha)'
+
+    def handle(self, *args, **options):
+        total = reconstruir_resumenes()
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} resúmenes reconstruidos'))
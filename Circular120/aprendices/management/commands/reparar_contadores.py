@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from aprendices.utils.contadores import reparar_contadores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de juicios e inasistencias de cada aprendiz y corrige los desactualizados'
+
+    def handle(self, *args, **options):
+        corregidos = reparar_contadores()
+        self.stdout.write(self.style.SUCCESS(f'✅ {corregidos} aprendices con contadores corregidos'))
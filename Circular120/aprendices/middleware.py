@@ -0,0 +1,53 @@
+# aprendices/middleware.py
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from aprendices.utils.perfilado import instrumentar_plantillas, medir_peticion, registrar_perfil
+
+
+class PerfilPeticionesMiddleware:
+    """
+    Perfilado opcional de peticiones (PERFIL_PETICIONES = True). Por cada
+    petición muestreada (PERFIL_MUESTREO, fracción entre 0 y 1) registra en
+    PerfilPeticion la vista, el tiempo total, las consultas SQL y su tiempo,
+    el tiempo de plantillas y las consultas más lentas con su origen.
+    Las no muestreadas que tarden más de PERFIL_UMBRAL_MS se registran solo
+    con el tiempo total.
+    
+    Desactivado no tiene costo: Django lo descarta al cargar los middlewares.
+    Va de primero en MIDDLEWARE para que el tiempo incluya a los demás.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFIL_PETICIONES', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.muestreo = getattr(settings, 'PERFIL_MUESTREO', 0.05)
+        self.umbral_ms = getattr(settings, 'PERFIL_UMBRAL_MS', None)
+        self.max_lentas = getattr(settings, 'PERFIL_CONSULTAS_LENTAS', 5)
+        self.excluir = tuple(getattr(settings, 'PERFIL_EXCLUIR_RUTAS', ()))
+        instrumentar_plantillas()
+
+    def __call__(self, request):
+        if self.excluir and request.path.startswith(self.excluir):
+            return self.get_response(request)
+        
+        muestreada = random.random() < self.muestreo
+        if not muestreada and self.umbral_ms is None:
+            return self.get_response(request)
+        
+        # Las respuestas en streaming cuentan hasta que la vista retorna, sin el envío del cuerpo
+        inicio = time.perf_counter()
+        if muestreada:
+            with medir_peticion(self.max_lentas) as medicion:
+                response = self.get_response(request)
+        else:
+            medicion = None
+            response = self.get_response(request)
+        tiempo_total = time.perf_counter() - inicio
+        
+        if muestreada or tiempo_total * 1000 >= self.umbral_ms:
+            registrar_perfil(request, response, tiempo_total, medicion)
+        return response
@@ -0,0 +1,35 @@
+# Generated by Django 5.1 on 2026-10-19 17:32
+
+import aprendices.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aprendices', '0004_alter_aprendiz_estado_formacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReporteGenerado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.CharField(db_index=True, max_length=36, verbose_name='Trabajo')),
+                ('tipo', models.CharField(choices=[('inasistencias', 'Inasistencias'), ('juicios', 'Juicios Evaluativos'), ('circular120', 'Circular 120')], max_length=20, verbose_name='Tipo de Reporte')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('LISTO', 'Listo'), ('ERROR', 'Error')], default='PENDIENTE', max_length=20, verbose_name='Estado')),
+                ('archivo', models.FileField(blank=True, null=True, upload_to=aprendices.models._ruta_reporte, verbose_name='Archivo')),
+                ('tamano', models.PositiveBigIntegerField(default=0, verbose_name='Tamaño (bytes)')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finalizado', models.DateTimeField(blank=True, null=True, verbose_name='Finalizado')),
+                ('centro', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reportes', to='aprendices.centroformacion', verbose_name='Centro de Formación')),
+            ],
+            options={
+                'verbose_name': 'Reporte Generado',
+                'verbose_name_plural': 'Reportes Generados',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
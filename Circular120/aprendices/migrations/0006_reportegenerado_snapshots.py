@@ -0,0 +1,29 @@
+# Generated by Django 5.1 on 2026-10-19 17:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aprendices', '0005_reportegenerado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='ficha',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reportes', to='aprendices.ficha', verbose_name='Ficha'),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='origen',
+            field=models.CharField(choices=[('MANUAL', 'Manual'), ('NOCTURNO', 'Precálculo Nocturno')], default='MANUAL', max_length=20, verbose_name='Origen'),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='version',
+            field=models.CharField(blank=True, default='', max_length=500, verbose_name='Versión de Datos'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1 on 2026-10-19 17:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aprendices', '0006_reportegenerado_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenEstadisticas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=40, unique=True, verbose_name='Clave')),
+                ('ambito', models.CharField(choices=[('GLOBAL', 'Global'), ('CENTRO', 'Centro de Formación'), ('FICHA', 'Ficha')], max_length=10, verbose_name='Ámbito')),
+                ('total_aprendices', models.IntegerField(default=0, verbose_name='Aprendices')),
+                ('por_estado', models.JSONField(blank=True, default=dict, verbose_name='Aprendices por Estado')),
+                ('total_inasistencias', models.IntegerField(default=0, verbose_name='Inasistencias')),
+                ('inasistencias_justificadas', models.IntegerField(default=0, verbose_name='Inasistencias Justificadas')),
+                ('juicios_pendientes', models.IntegerField(default=0, verbose_name='Juicios Pendientes')),
+                ('productiva_vencida', models.IntegerField(default=0, verbose_name='Productiva Vencida')),
+                ('ficha_vencida', models.IntegerField(default=0, verbose_name='Ficha Vencida')),
+                ('casos_urgentes', models.IntegerField(default=0, verbose_name='Casos Urgentes')),
+                ('total_fichas', models.IntegerField(default=0, verbose_name='Fichas')),
+                ('fichas_activas', models.IntegerField(default=0, verbose_name='Fichas Activas')),
+                ('fichas_vencidas', models.IntegerField(default=0, verbose_name='Fichas Vencidas')),
+                ('fecha_calculo', models.DateField(verbose_name='Fecha de Cálculo')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('centro', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='aprendices.centroformacion', verbose_name='Centro de Formación')),
+                ('ficha', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='aprendices.ficha', verbose_name='Ficha')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Estadísticas',
+                'verbose_name_plural': 'Resúmenes de Estadísticas',
+                'ordering': ['ambito', 'clave'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1 on 2026-10-19 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aprendices', '0007_resumenestadisticas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inasistencia',
+            index=models.Index(fields=['-fecha'], name='inasist_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inasistencia',
+            index=models.Index(fields=['ficha', '-fecha'], name='inasist_ficha_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inasistencia',
+            index=models.Index(fields=['aprendiz', '-fecha'], name='inasist_aprendiz_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inasistencia',
+            index=models.Index(fields=['justificada', '-fecha'], name='inasist_justif_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1 on 2026-10-19 17:55
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def calcular_contadores(apps, schema_editor):
+    Aprendiz = apps.get_model('aprendices', 'Aprendiz')
+    Inasistencia = apps.get_model('aprendices', 'Inasistencia')
+    AprendizResultado = apps.get_model('aprendices', 'AprendizResultado')
+
+    valores = {}
+    for fila in Inasistencia.objects.order_by().values('aprendiz').annotate(
+        total_inasistencias=Count('pk'),
+        inasistencias_injustificadas=Count('pk', filter=Q(justificada=False)),
+    ):
+        valores.setdefault(fila.pop('aprendiz'), {}).update(fila)
+    for fila in AprendizResultado.objects.order_by().values('aprendiz').annotate(
+        juicios_pendientes=Count('pk', filter=Q(estado='PENDIENTE')),
+        juicios_aprobados=Count('pk', filter=Q(estado='APROBADO')),
+        juicios_no_aprobados=Count('pk', filter=Q(estado='NO_APROBADO')),
+    ):
+        valores.setdefault(fila.pop('aprendiz'), {}).update(fila)
+
+    for documento, campos in valores.items():
+        Aprendiz.objects.filter(pk=documento).update(**campos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aprendices', '0008_inasistencia_indices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aprendiz',
+            name='inasistencias_injustificadas',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Inasistencias sin Justificar'),
+        ),
+        migrations.AddField(
+            model_name='aprendiz',
+            name='juicios_aprobados',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Juicios Aprobados'),
+        ),
+        migrations.AddField(
+            model_name='aprendiz',
+            name='juicios_no_aprobados',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Juicios No Aprobados'),
+        ),
+        migrations.AddField(
+            model_name='aprendiz',
+            name='juicios_pendientes',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Juicios Pendientes'),
+        ),
+        migrations.AddField(
+            model_name='aprendiz',
+            name='total_inasistencias',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Inasistencias'),
+        ),
+        migrations.AddIndex(
+            model_name='aprendiz',
+            index=models.Index(fields=['juicios_pendientes'], name='aprendiz_juicios_pend_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='aprendiz',
+            index=models.Index(fields=['inasistencias_injustificadas'], name='aprendiz_inasist_injust_idx'),
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop),
+    ]
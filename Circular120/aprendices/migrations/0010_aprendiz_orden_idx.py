@@ -0,0 +1,17 @@
+# Generated by Django 5.1 on 2026-10-19 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aprendices', '0009_aprendiz_contadores'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aprendiz',
+            index=models.Index(fields=['apellido', 'nombre', 'documento'], name='aprendiz_orden_idx'),
+        ),
+    ]
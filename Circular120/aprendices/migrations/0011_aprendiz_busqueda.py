@@ -0,0 +1,34 @@
+# Generated by Django 5.1 on 2026-10-19 17:59
+
+from django.db import migrations, models
+
+from aprendices.utils.busqueda import normalizar
+
+
+def calcular_busqueda(apps, schema_editor):
+    # El índice FTS5 / de trigramas se instala después, en post_migrate
+    Aprendiz = apps.get_model('aprendices', 'Aprendiz')
+    lote = []
+    for aprendiz in Aprendiz.objects.only('documento', 'nombre', 'apellido').iterator(chunk_size=2000):
+        aprendiz.busqueda = normalizar(f'{aprendiz.nombre} {aprendiz.apellido} {aprendiz.documento}')
+        lote.append(aprendiz)
+        if len(lote) >= 2000:
+            Aprendiz.objects.bulk_update(lote, ['busqueda'])
+            lote = []
+    Aprendiz.objects.bulk_update(lote, ['busqueda'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aprendices', '0010_aprendiz_orden_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aprendiz',
+            name='busqueda',
+            field=models.CharField(blank=True, default='', editable=False, max_length=250),
+        ),
+        migrations.RunPython(calcular_busqueda, migrations.RunPython.noop),
+    ]
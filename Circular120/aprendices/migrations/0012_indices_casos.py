@@ -0,0 +1,29 @@
+# Generated by Django 5.1 on 2026-10-19 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aprendices', '0011_aprendiz_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aprendiz',
+            index=models.Index(fields=['estado_formacion', 'fecha_fin_productiva'], name='aprendiz_estado_fin_prod_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='aprendiz',
+            index=models.Index(condition=models.Q(('fecha_fin_productiva__isnull', False)), fields=['fecha_fin_productiva'], name='aprendiz_fin_prod_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='aprendizresultado',
+            index=models.Index(fields=['aprendiz', 'estado'], name='juicio_aprendiz_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ficha',
+            index=models.Index(condition=models.Q(('fecha_fin__isnull', False)), fields=['fecha_fin'], name='ficha_fecha_fin_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1 on 2026-10-19 18:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aprendices', '0012_indices_casos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilPeticion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vista', models.CharField(max_length=150, verbose_name='Vista')),
+                ('ruta', models.CharField(max_length=500, verbose_name='Ruta')),
+                ('metodo', models.CharField(max_length=10, verbose_name='Método')),
+                ('estado_http', models.PositiveSmallIntegerField(verbose_name='Estado HTTP')),
+                ('muestreada', models.BooleanField(default=True, verbose_name='¿Muestreada?')),
+                ('tiempo_total_ms', models.FloatField(verbose_name='Tiempo Total (ms)')),
+                ('consultas', models.PositiveIntegerField(blank=True, null=True, verbose_name='Consultas SQL')),
+                ('tiempo_sql_ms', models.FloatField(blank=True, null=True, verbose_name='Tiempo SQL (ms)')),
+                ('tiempo_plantillas_ms', models.FloatField(blank=True, null=True, verbose_name='Tiempo Plantillas (ms)')),
+                ('consultas_lentas', models.JSONField(blank=True, default=list, verbose_name='Consultas Más Lentas')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Perfil de Petición',
+                'verbose_name_plural': 'Perfiles de Peticiones',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='perfil_fecha_idx'), models.Index(fields=['vista', 'created_at'], name='perfil_vista_fecha_idx')],
+            },
+        ),
+    ]
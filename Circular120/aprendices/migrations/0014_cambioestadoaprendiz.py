@@ -0,0 +1,34 @@
+# Generated by Django 5.1 on 2026-10-19 18:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aprendices', '0013_perfilpeticion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioEstadoAprendiz',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado_anterior', models.CharField(choices=[('EN_FORMACION', 'En Formación'), ('ETAPA_LECTIVA', 'Etapa Lectiva'), ('ETAPA_PRODUCTIVA', 'Etapa Productiva'), ('POR_CERTIFICAR', 'Por Certificar'), ('CERTIFICADO', 'Certificado'), ('CANCELADO', 'Cancelado'), ('RETIRO_VOLUNTARIO', 'Retiro Voluntario'), ('APLAZAMIENTO', 'Aplazamiento'), ('TRASLADADO', 'Trasladado')], max_length=30, verbose_name='Estado Anterior')),
+                ('estado_nuevo', models.CharField(choices=[('EN_FORMACION', 'En Formación'), ('ETAPA_LECTIVA', 'Etapa Lectiva'), ('ETAPA_PRODUCTIVA', 'Etapa Productiva'), ('POR_CERTIFICAR', 'Por Certificar'), ('CERTIFICADO', 'Certificado'), ('CANCELADO', 'Cancelado'), ('RETIRO_VOLUNTARIO', 'Retiro Voluntario'), ('APLAZAMIENTO', 'Aplazamiento'), ('TRASLADADO', 'Trasladado')], max_length=30, verbose_name='Estado Nuevo')),
+                ('origen', models.CharField(choices=[('WEB', 'Aplicación'), ('ADMIN', 'Administración')], default='WEB', max_length=10, verbose_name='Origen')),
+                ('lote', models.CharField(db_index=True, max_length=36, verbose_name='Lote')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('aprendiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cambios_estado', to='aprendices.aprendiz', verbose_name='Aprendiz')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Realizado por')),
+            ],
+            options={
+                'verbose_name': 'Cambio de Estado',
+                'verbose_name_plural': 'Cambios de Estado',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1 on 2026-10-19 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aprendices', '0014_cambioestadoaprendiz'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aprendizresultado',
+            index=models.Index(fields=['-fecha'], name='juicio_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='aprendizresultado',
+            index=models.Index(fields=['estado', '-fecha'], name='juicio_estado_fecha_idx'),
+        ),
+    ]
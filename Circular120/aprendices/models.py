@@ -1,7 +1,11 @@
 # aprendices/models.py
 from django.db import models
+from django.db.models import Case, DateField, F, Func, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
-from datetime import date, timedelta
+from django.utils import timezone
+from datetime import timedelta
+from aprendices.utils.busqueda import normalizar
 
 class CentroFormacion(models.Model):
     """Centros de formación de la Regional Boyacá"""
@@ -47,11 +51,82 @@ class Ficha(models.Model):
         verbose_name = 'Ficha de Caracterización'
         verbose_name_plural = 'Fichas de Caracterización'
         ordering = ['-numero']
+        indexes = [
+            # Fichas vencidas (fecha_fin < hoy) en reportes y casos vencidos
+            models.Index(fields=['fecha_fin'], condition=Q(fecha_fin__isnull=False), name='ficha_fecha_fin_idx'),
+        ]
     
     def __str__(self):
         return f"{self.numero} - {self.programa}"
 
 
+class DiasEntre(Func):
+    """Días transcurridos entre dos fechas (fecha_final - fecha_inicial), calculados en la BD"""
+    arity = 2
+    output_field = IntegerField()
+    # PostgreSQL / Oracle: date - date = número de días
+    template = '(%(expressions)s)'
+    arg_joiner = ' - '
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template='CAST(julianday(%(expressions)s) AS INTEGER)',
+            arg_joiner=') - julianday(',
+            **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template='DATEDIFF(%(expressions)s)',
+            arg_joiner=', ',
+            **extra_context
+        )
+
+
+# Niveles de urgencia de los casos vencidos (Circular 120)
+URGENCIA_CRITICO = 'CRÍTICO'
+URGENCIA_MODERADO = 'MODERADO'
+URGENCIA_RECIENTE = 'RECIENTE'
+DIAS_CRITICO = 60
+DIAS_MODERADO = 30
+
+
+# Estados finales: no cuentan como casos vencidos ni urgentes (ver índices parciales de Aprendiz)
+ESTADOS_CERRADOS = ['CERTIFICADO', 'CANCELADO']
+
+
+class AprendizQuerySet(models.QuerySet):
+    def con_vencimiento(self, hoy=None):
+        """
+        Anota en la BD los datos de vencimiento de cada aprendiz (equivalente a dias_vencido()):
+          fecha_vencimiento: fin de productiva si ya pasó, si no fin de la ficha si ya pasó
+          dias_vencidos:     días desde fecha_vencimiento (0 si no está vencido)
+          nivel_urgencia:    CRÍTICO (>60 días), MODERADO (>30) o RECIENTE
+        """
+        hoy = hoy or timezone.localdate()
+        return self.annotate(
+            fecha_vencimiento=Case(
+                When(fecha_fin_productiva__lt=hoy, then=F('fecha_fin_productiva')),
+                When(ficha__fecha_fin__lt=hoy, then=F('ficha__fecha_fin')),
+                default=None,
+                output_field=DateField(),
+            ),
+        ).annotate(
+            dias_vencidos=Coalesce(
+                DiasEntre(Value(hoy, output_field=DateField()), F('fecha_vencimiento')),
+                Value(0),
+            ),
+        ).annotate(
+            nivel_urgencia=Case(
+                When(dias_vencidos__gt=DIAS_CRITICO, then=Value(URGENCIA_CRITICO)),
+                When(dias_vencidos__gt=DIAS_MODERADO, then=Value(URGENCIA_MODERADO)),
+                default=Value(URGENCIA_RECIENTE),
+            ),
+        )
+
+
 class Aprendiz(models.Model):
     ESTADO_FORMACION_CHOICES = [
         ('EN_FORMACION', 'En Formación'),
@@ -94,20 +169,63 @@ class Aprendiz(models.Model):
     
     observaciones = models.TextField(blank=True, null=True, verbose_name='Observaciones')
     
+    # Contadores desnormalizados (utils/contadores.py): se mantienen desde las
+    # señales y los importadores, y se reparan con el comando reparar_contadores
+    juicios_pendientes = models.PositiveIntegerField(default=0, editable=False, verbose_name='Juicios Pendientes')
+    juicios_aprobados = models.PositiveIntegerField(default=0, editable=False, verbose_name='Juicios Aprobados')
+    juicios_no_aprobados = models.PositiveIntegerField(default=0, editable=False, verbose_name='Juicios No Aprobados')
+    total_inasistencias = models.PositiveIntegerField(default=0, editable=False, verbose_name='Inasistencias')
+    inasistencias_injustificadas = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Inasistencias sin Justificar'
+    )
+    
+    # Nombre, apellido y documento sin tildes ni mayúsculas (utils/busqueda.py)
+    busqueda = models.CharField(max_length=250, blank=True, default='', editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = AprendizQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Aprendiz'
         verbose_name_plural = 'Aprendices'
         ordering = ['apellido', 'nombre']
+        indexes = [
+            # Orden del listado (paginación por cursor)
+            models.Index(fields=['apellido', 'nombre', 'documento'], name='aprendiz_orden_idx'),
+            models.Index(fields=['juicios_pendientes'], name='aprendiz_juicios_pend_idx'),
+            models.Index(fields=['inasistencias_injustificadas'], name='aprendiz_inasist_injust_idx'),
+            # Por certificar / productiva vencida: estado = X [AND fecha_fin_productiva < hoy]
+            models.Index(fields=['estado_formacion', 'fecha_fin_productiva'], name='aprendiz_estado_fin_prod_idx'),
+            # fecha_fin_productiva < X sin estado (casos urgentes). Parcial: solo las filas
+            # con fecha; "campo < %s" implica "campo IS NOT NULL", así que SQLite y
+            # PostgreSQL lo usan aunque el valor llegue como parámetro
+            models.Index(
+                fields=['fecha_fin_productiva'], condition=Q(fecha_fin_productiva__isnull=False),
+                name='aprendiz_fin_prod_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.documento} - {self.nombre} {self.apellido}"
     
+    def actualizar_busqueda(self):
+        """Recalcula busqueda; llamarlo antes de bulk_create/bulk_update (save lo hace solo)"""
+        self.busqueda = normalizar(f'{self.nombre} {self.apellido} {self.documento}')
+    
+    def save(self, *args, **kwargs):
+        self.actualizar_busqueda()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'nombre', 'apellido'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'busqueda'}
+        super().save(*args, **kwargs)
+    
     def dias_vencido(self):
-        """Calcula cuántos días lleva vencido"""
-        hoy = date.today()
+        """Calcula cuántos días lleva vencido (en consultas usar Aprendiz.objects.con_vencimiento())"""
+        if hasattr(self, 'dias_vencidos'):
+            return self.dias_vencidos
+        hoy = timezone.localdate()
         if self.fecha_fin_productiva and self.fecha_fin_productiva < hoy:
             return (hoy - self.fecha_fin_productiva).days
         if self.ficha and self.ficha.fecha_fin and self.ficha.fecha_fin < hoy:
@@ -140,6 +258,13 @@ class Inasistencia(models.Model):
         verbose_name = 'Inasistencia'
         verbose_name_plural = 'Inasistencias'
         ordering = ['-fecha']
+        indexes = [
+            # Listado por fecha y sus filtros (ficha, aprendiz, justificada) con el mismo orden
+            models.Index(fields=['-fecha'], name='inasist_fecha_idx'),
+            models.Index(fields=['ficha', '-fecha'], name='inasist_ficha_fecha_idx'),
+            models.Index(fields=['aprendiz', '-fecha'], name='inasist_aprendiz_fecha_idx'),
+            models.Index(fields=['justificada', '-fecha'], name='inasist_justif_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"{self.aprendiz} - {self.fecha}"
@@ -212,6 +337,13 @@ class AprendizResultado(models.Model):
         verbose_name_plural = 'Juicios Evaluativos'
         unique_together = [['aprendiz', 'resultado']]
         ordering = ['-fecha']
+        indexes = [
+            # Conteos por aprendiz y estado (contadores, resúmenes, juicios por competencia)
+            models.Index(fields=['aprendiz', 'estado'], name='juicio_aprendiz_estado_idx'),
+            # Listado del admin por fecha, con y sin filtro de estado
+            models.Index(fields=['-fecha'], name='juicio_fecha_idx'),
+            models.Index(fields=['estado', '-fecha'], name='juicio_estado_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"{self.aprendiz} - {self.resultado.codigo} ({self.estado})"
@@ -299,5 +431,244 @@ class RolAdministrativo(models.Model):
     def deshabilitar(self):
         """Deshabilita el rol sin eliminarlo"""
         self.activo = False
-        self.fecha_fin = date.today()
-        self.save()
\ No newline at end of file
+        self.fecha_fin = timezone.localdate()
+        self.save()
+
+def _ruta_reporte(instance, filename):
+    return f'reportes/{instance.job_id}/{filename}'
+
+
+class ReporteGenerado(models.Model):
+    """Registro de los reportes Excel generados en segundo plano"""
+    TIPO_CHOICES = [
+        ('inasistencias', 'Inasistencias'),
+        ('juicios', 'Juicios Evaluativos'),
+        ('circular120', 'Circular 120'),
+    ]
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('LISTO', 'Listo'),
+        ('ERROR', 'Error'),
+    ]
+    ORIGEN_CHOICES = [
+        ('MANUAL', 'Manual'),
+        ('NOCTURNO', 'Precálculo Nocturno'),
+    ]
+    
+    job_id = models.CharField(max_length=36, db_index=True, verbose_name='Trabajo')
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name='Tipo de Reporte')
+    centro = models.ForeignKey(
+        CentroFormacion,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reportes',
+        verbose_name='Centro de Formación'
+    )
+    ficha = models.ForeignKey(
+        Ficha,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='reportes',
+        verbose_name='Ficha'
+    )
+    origen = models.CharField(
+        max_length=20,
+        choices=ORIGEN_CHOICES,
+        default='MANUAL',
+        verbose_name='Origen'
+    )
+    version = models.CharField(max_length=500, blank=True, default='', verbose_name='Versión de Datos')
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADO_CHOICES,
+        default='PENDIENTE',
+        verbose_name='Estado'
+    )
+    archivo = models.FileField(upload_to=_ruta_reporte, blank=True, null=True, verbose_name='Archivo')
+    tamano = models.PositiveBigIntegerField(default=0, verbose_name='Tamaño (bytes)')
+    error = models.TextField(blank=True, null=True, verbose_name='Error')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    finalizado = models.DateTimeField(blank=True, null=True, verbose_name='Finalizado')
+    
+    class Meta:
+        verbose_name = 'Reporte Generado'
+        verbose_name_plural = 'Reportes Generados'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        if self.ficha_id:
+            ambito = f'Ficha {self.ficha_id}'
+        else:
+            ambito = self.centro.codigo if self.centro else 'General'
+        return f"{self.get_tipo_display()} ({ambito}) - {self.get_estado_display()}"
+
+
+class ResumenEstadisticas(models.Model):
+    """
+    Conteos precalculados (global, por centro y por ficha) para el dashboard y
+    las vistas de fichas. Se mantienen al día desde las señales y las
+    importaciones (aprendices/utils/resumenes.py).
+    """
+    AMBITO_CHOICES = [
+        ('GLOBAL', 'Global'),
+        ('CENTRO', 'Centro de Formación'),
+        ('FICHA', 'Ficha'),
+    ]
+    
+    clave = models.CharField(max_length=40, unique=True, verbose_name='Clave')
+    ambito = models.CharField(max_length=10, choices=AMBITO_CHOICES, verbose_name='Ámbito')
+    ficha = models.ForeignKey(
+        Ficha,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Ficha'
+    )
+    centro = models.ForeignKey(
+        CentroFormacion,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Centro de Formación'
+    )
+    
+    total_aprendices = models.IntegerField(default=0, verbose_name='Aprendices')
+    por_estado = models.JSONField(default=dict, blank=True, verbose_name='Aprendices por Estado')
+    total_inasistencias = models.IntegerField(default=0, verbose_name='Inasistencias')
+    inasistencias_justificadas = models.IntegerField(default=0, verbose_name='Inasistencias Justificadas')
+    juicios_pendientes = models.IntegerField(default=0, verbose_name='Juicios Pendientes')
+    productiva_vencida = models.IntegerField(default=0, verbose_name='Productiva Vencida')
+    ficha_vencida = models.IntegerField(default=0, verbose_name='Ficha Vencida')
+    casos_urgentes = models.IntegerField(default=0, verbose_name='Casos Urgentes')
+    total_fichas = models.IntegerField(default=0, verbose_name='Fichas')
+    fichas_activas = models.IntegerField(default=0, verbose_name='Fichas Activas')
+    fichas_vencidas = models.IntegerField(default=0, verbose_name='Fichas Vencidas')
+    
+    fecha_calculo = models.DateField(verbose_name='Fecha de Cálculo')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Resumen de Estadísticas'
+        verbose_name_plural = 'Resúmenes de Estadísticas'
+        ordering = ['ambito', 'clave']
+    
+    def __str__(self):
+        return f"{self.get_ambito_display()} {self.clave} ({self.fecha_calculo})"
+    
+    @property
+    def inasistencias_injustificadas(self):
+        return self.total_inasistencias - self.inasistencias_justificadas
+    
+    def total_estado(self, *estados):
+        return sum(self.por_estado.get(estado, 0) for estado in estados)
+    
+    @property
+    def distribucion_estados(self):
+        """Lista [{'estado_formacion', 'total'}] de los estados con aprendices"""
+        return [
+            {'estado_formacion': estado, 'total': self.por_estado[estado]}
+            for estado, _ in Aprendiz.ESTADO_FORMACION_CHOICES
+            if self.por_estado.get(estado)
+        ]
+
+
+class VersionDatos(models.Model):
+    """
+    Contador de cambios de los datos de los reportes (una sola fila). Vive en
+    la base para que el proceso web, los workers de Celery y los comandos lean
+    la misma versión sin importar el backend de cache
+    (aprendices/utils/cache_reportes.py).
+    """
+    version = models.PositiveBigIntegerField(default=0, verbose_name='Versión')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Versión de Datos'
+        verbose_name_plural = 'Versión de Datos'
+    
+    def __str__(self):
+        return f"Versión {self.version}"
+
+
+class PerfilPeticion(models.Model):
+    """
+    Medición de una petición registrada por PerfilPeticionesMiddleware
+    (aprendices/middleware.py). Las peticiones muestreadas traen el detalle
+    de SQL y plantillas; las que solo superaron el umbral de lentitud, el
+    tiempo total.
+    """
+    vista = models.CharField(max_length=150, verbose_name='Vista')
+    ruta = models.CharField(max_length=500, verbose_name='Ruta')
+    metodo = models.CharField(max_length=10, verbose_name='Método')
+    estado_http = models.PositiveSmallIntegerField(verbose_name='Estado HTTP')
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Usuario'
+    )
+    muestreada = models.BooleanField(default=True, verbose_name='¿Muestreada?')
+    tiempo_total_ms = models.FloatField(verbose_name='Tiempo Total (ms)')
+    consultas = models.PositiveIntegerField(null=True, blank=True, verbose_name='Consultas SQL')
+    tiempo_sql_ms = models.FloatField(null=True, blank=True, verbose_name='Tiempo SQL (ms)')
+    tiempo_plantillas_ms = models.FloatField(null=True, blank=True, verbose_name='Tiempo Plantillas (ms)')
+    consultas_lentas = models.JSONField(default=list, blank=True, verbose_name='Consultas Más Lentas')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Perfil de Petición'
+        verbose_name_plural = 'Perfiles de Peticiones'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='perfil_fecha_idx'),
+            models.Index(fields=['vista', 'created_at'], name='perfil_vista_fecha_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.metodo} {self.vista} ({self.tiempo_total_ms:.0f} ms)"
+
+
+class CambioEstadoAprendiz(models.Model):
+    """Historial de los cambios de estado hechos desde las acciones de certificar/cancelar (individuales o en lote)"""
+    ORIGEN_CHOICES = [
+        ('WEB', 'Aplicación'),
+        ('ADMIN', 'Administración'),
+    ]
+    
+    aprendiz = models.ForeignKey(
+        Aprendiz,
+        on_delete=models.CASCADE,
+        related_name='cambios_estado',
+        verbose_name='Aprendiz'
+    )
+    estado_anterior = models.CharField(max_length=30, choices=Aprendiz.ESTADO_FORMACION_CHOICES, verbose_name='Estado Anterior')
+    estado_nuevo = models.CharField(max_length=30, choices=Aprendiz.ESTADO_FORMACION_CHOICES, verbose_name='Estado Nuevo')
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Realizado por'
+    )
+    origen = models.CharField(max_length=10, choices=ORIGEN_CHOICES, default='WEB', verbose_name='Origen')
+    # Mismo valor para todos los aprendices cambiados en una operación
+    lote = models.CharField(max_length=36, db_index=True, verbose_name='Lote')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Cambio de Estado'
+        verbose_name_plural = 'Cambios de Estado'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.aprendiz_id}: {self.estado_anterior} → {self.estado_nuevo}"
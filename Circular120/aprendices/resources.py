@@ -1,7 +1,8 @@
 from import_export import resources, fields, widgets
 from import_export.widgets import ForeignKeyWidget
 from .models import Aprendiz, Ficha, Competencia, ResultadoAprendizaje, AprendizResultado
-from datetime import date, datetime
+from datetime import datetime
+from django.utils import timezone
 
 
 class SafeDateWidget(widgets.Widget):
@@ -244,7 +245,7 @@ class AprendizJuiciosResource(resources.ModelResource):
                 AprendizResultado.objects.update_or_create(
                     aprendiz=aprendiz,
                     resultado=ra_obj,
-                    defaults={'estado': estado_j, 'fecha': date.today()}
+                    defaults={'estado': estado_j, 'fecha': timezone.localdate()}
                 )
 
         except Exception as e:
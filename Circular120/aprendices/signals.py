@@ -0,0 +1,75 @@
+# aprendices/signals.py
+from django.db.models.signals import post_delete, post_init, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Aprendiz, AprendizResultado, CentroFormacion, Ficha, Inasistencia
+from .utils.busqueda import instalar_indice_busqueda
+from .utils.resumenes import marcar_aprendices, marcar_contadores, marcar_fichas
+
+
+# ── Resúmenes de estadísticas (ResumenEstadisticas) ──────────────────
+
+@receiver(post_init, sender=Aprendiz)
+@receiver(post_init, sender=Inasistencia)
+def guardar_ficha_original(sender, instance, **kwargs):
+    """Recuerda la ficha con la que se cargó el registro, para detectar traslados"""
+    if 'ficha_id' in instance.__dict__:
+        instance._ficha_original = instance.ficha_id
+
+
+@receiver(post_save, sender=Aprendiz)
+@receiver(post_delete, sender=Aprendiz)
+@receiver(post_save, sender=Inasistencia)
+@receiver(post_delete, sender=Inasistencia)
+def resumen_por_ficha(sender, instance, **kwargs):
+    marcar_fichas({instance.ficha_id, getattr(instance, '_ficha_original', instance.ficha_id)})
+    instance._ficha_original = instance.ficha_id
+
+
+@receiver(post_save, sender=AprendizResultado)
+@receiver(post_delete, sender=AprendizResultado)
+def resumen_por_juicio(sender, instance, **kwargs):
+    marcar_aprendices([instance.aprendiz_id])
+
+
+@receiver(post_save, sender=Ficha)
+def resumen_ficha_guardada(sender, instance, **kwargs):
+    marcar_fichas([instance.numero])
+
+
+@receiver(post_delete, sender=Ficha)
+def resumen_ficha_eliminada(sender, instance, **kwargs):
+    # Sus aprendices pasan a "sin ficha" (SET_NULL, sin señales)
+    marcar_fichas([instance.numero, None])
+
+
+@receiver(pre_delete, sender=CentroFormacion)
+def resumen_centro_eliminado(sender, instance, **kwargs):
+    marcar_fichas(Ficha.objects.filter(centro=instance).values_list('numero', flat=True))
+
+
+# ── Contadores por aprendiz (Aprendiz.juicios_*, *_inasistencias) ───
+
+@receiver(post_init, sender=Inasistencia)
+@receiver(post_init, sender=AprendizResultado)
+def guardar_aprendiz_original(sender, instance, **kwargs):
+    if 'aprendiz_id' in instance.__dict__:
+        instance._aprendiz_original = instance.aprendiz_id
+
+
+@receiver(post_save, sender=Inasistencia)
+@receiver(post_delete, sender=Inasistencia)
+@receiver(post_save, sender=AprendizResultado)
+@receiver(post_delete, sender=AprendizResultado)
+def contadores_aprendiz(sender, instance, **kwargs):
+    marcar_contadores({instance.aprendiz_id, getattr(instance, '_aprendiz_original', instance.aprendiz_id)})
+    instance._aprendiz_original = instance.aprendiz_id
+
+
+# ── Índice de búsqueda de aprendices ─────────────────────────────────
+
+@receiver(post_migrate)
+def indice_busqueda(sender, using='default', **kwargs):
+    # En SQLite las migraciones que reconstruyen la tabla borran los triggers del índice
+    if sender.name == 'aprendices':
+        instalar_indice_busqueda(using)
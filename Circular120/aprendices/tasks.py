@@ -1,5 +1,11 @@
-from celery import shared_task
+from celery import group, shared_task
 from django.core.management import call_command
+from aprendices.utils.reportes import (
+    generar_reporte_registrado, registrar_trabajos_reportes,
+    registrar_reportes_nocturnos, aplicar_retencion_reportes, marcar_reportes_error,
+)
+from aprendices.utils.perfilado import aplicar_retencion_perfiles
+from aprendices.utils.resumenes import reconstruir_con_bloqueo
 
 @shared_task
 def importar_excel_task(path):
@@ -7,4 +13,61 @@ def importar_excel_task(path):
         call_command('import_consolidado', path)
         return "OK"
     except Exception as e:
-        return str(e)
\ No newline at end of file
+        return str(e)
+
+
+@shared_task
+def generar_reporte_task(reporte_id):
+    """Genera un reporte registrado en ReporteGenerado"""
+    return generar_reporte_registrado(reporte_id)
+
+
+def lanzar_generacion_reportes(por_centro=True):
+    """
+    Registra los reportes (globales y por centro) y los encola como un
+    grupo de tareas Celery que se ejecutan en paralelo.
+    Retorna: job_id para consultar el avance
+    """
+    job_id, reporte_ids = registrar_trabajos_reportes(por_centro=por_centro)
+    encolar_reportes(reporte_ids)
+    return job_id
+
+
+def encolar_reportes(reporte_ids):
+    """
+    Encola la generación de los reportes registrados. Si no se pueden
+    encolar (broker caído), quedan en ERROR en lugar de PENDIENTE para siempre.
+    """
+    try:
+        group(generar_reporte_task.s(reporte_id) for reporte_id in reporte_ids).apply_async()
+    except Exception as e:
+        marcar_reportes_error(reporte_ids, f'No se pudo encolar la generación: {e}')
+        raise
+
+
+@shared_task
+def precalcular_reportes_task():
+    """
+    Tarea nocturna (Celery beat): aplica la política de retención y
+    precalcula los reportes estándar (global, por centro y por ficha con
+    casos abiertos) para que las descargas de la mañana sean inmediatas.
+    """
+    eliminados = aplicar_retencion_reportes()
+    job_id, reporte_ids = registrar_reportes_nocturnos()
+    encolar_reportes(reporte_ids)
+    return {'job_id': job_id, 'reportes': len(reporte_ids), 'eliminados': eliminados}
+
+
+@shared_task
+def reconstruir_resumenes_task():
+    """
+    Tarea diaria (Celery beat): recalcula los resúmenes, cuyos conteos de
+    vencidos dependen de la fecha. Las lecturas siguen sirviendo los de ayer hasta entonces.
+    """
+    return reconstruir_con_bloqueo()
+
+
+@shared_task
+def purgar_perfiles_task():
+    """Tarea diaria (Celery beat): elimina los perfiles de peticiones fuera del periodo de retención"""
+    return aplicar_retencion_perfiles()
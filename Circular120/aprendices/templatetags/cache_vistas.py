@@ -0,0 +1,42 @@
+from django import template
+
+from aprendices.utils.cache_vistas import en_cache
+
+
+register = template.Library()
+
+
+class FragmentoCacheNode(template.Node):
+    def __init__(self, nodelist, nombre, partes):
+        self.nodelist = nodelist
+        self.nombre = nombre
+        self.partes = partes
+
+    def render(self, context):
+        nombre = self.nombre.resolve(context)
+        partes = [parte.resolve(context) for parte in self.partes]
+        request = context.get('request')
+        return en_cache(
+            f'fragmento:{nombre}', lambda: self.nodelist.render(context), *partes,
+            usuario=getattr(request, 'user', None),
+        )
+
+
+@register.tag
+def fragmento_cache(parser, token):
+    """
+    {% fragmento_cache "nombre" [variable ...] %}...{% endfragmento_cache %}
+
+    Cachea el HTML del bloque por nombre, variables, ámbito del usuario y
+    versión de los datos: las consultas de los querysets perezosos que el
+    bloque recorre no se ejecutan en un acierto. El bloque no debe incluir
+    csrf_token ni datos de la sesión.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' requiere al menos el nombre del fragmento")
+    nodelist = parser.parse(('endfragmento_cache',))
+    parser.delete_first_token()
+    return FragmentoCacheNode(
+        nodelist, parser.compile_filter(bits[1]), [parser.compile_filter(bit) for bit in bits[2:]]
+    )
@@ -1,3 +1,1817 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipIf
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from . import api_views, urls
+from .filters import AprendizFilter
+from .tasks import precalcular_reportes_task
+from .models import (
+    DIAS_CRITICO, DIAS_MODERADO, URGENCIA_CRITICO, URGENCIA_MODERADO, URGENCIA_RECIENTE,
+    Aprendiz, AprendizResultado, CambioEstadoAprendiz, CentroFormacion, Competencia, Ficha, Inasistencia,
+    PerfilPeticion, ReporteGenerado, ResultadoAprendizaje, ResumenEstadisticas, RolAdministrativo,
+)
+from .utils.busqueda import buscar_aprendices
+from .utils.cache_reportes import directorio_cache, obtener_reporte, snapshot_vigente, version_datos as version_reportes
+from .utils.cache_vistas import CLAVE_VERSION, metricas_cache
+from .utils.contadores import reparar_contadores
+from .utils import exportar
+from .utils.estados import cambiar_estado_aprendices
+from .utils.paginacion import TAMANO_PAGINA, PaginadorEstimado, contar_acotado, paginar_keyset
+from .utils import paquete_reportes
+from .utils.paquete_reportes import flujo_paquete_centro, generar_paquete_centro
+from .utils.perfilado import aplicar_retencion_perfiles
+from .utils.reportes import (
+    GeneradorReportes, aplicar_retencion_reportes, fichas_con_casos_abiertos, generar_reporte_registrado,
+    registrar_reportes_nocturnos, registrar_trabajos_reportes,
+)
+from .utils import resumenes
+from .utils.resumenes import (
+    CLAVE_GLOBAL, calcular_resumenes_fichas, clave_centro, clave_ficha, lote_resumenes,
+    obtener_resumen, reconstruir_con_bloqueo, reconstruir_resumenes,
+)
+from .views import ORDEN_POR_CERTIFICAR, ORDEN_VENCIDOS, SECCIONES_VENCIDOS, metricas_dashboard, resumen_juicios
+
+
+class PruebaBase(TestCase):
+    """
+    Datos comunes: el usuario coordinador (con sesión iniciada en cada
+    prueba) y el centro 9111. Cada prueba empieza con el cache vacío.
+    """
+    superusuario = False
+
+    @classmethod
+    def setUpTestData(cls):
+        crear = User.objects.create_superuser if cls.superusuario else User.objects.create_user
+        cls.usuario = crear('coordinador', password='clave-segura-123')
+        cls.centro = CentroFormacion.objects.create(codigo='9111', nombre='Centro Prueba', municipio='Tunja')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+
+class DashboardTest(PruebaBase):
+    """Métricas del dashboard leídas del resumen precalculado"""
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.localdate()
+        super().setUpTestData()
+        vencida = Ficha.objects.create(numero='100', centro=cls.centro, fecha_fin=hoy - timedelta(days=45))
+        vigente = Ficha.objects.create(numero='101', centro=cls.centro, fecha_fin=hoy + timedelta(days=90))
+
+        Aprendiz.objects.create(documento='1', nombre='Ana', apellido='Ruiz', ficha=vencida)
+        Aprendiz.objects.create(
+            documento='2', nombre='Luis', apellido='Pérez', ficha=vigente,
+            estado_formacion='ETAPA_PRODUCTIVA', fecha_fin_productiva=hoy - timedelta(days=40)
+        )
+        Aprendiz.objects.create(
+            documento='3', nombre='Sara', apellido='Gómez', ficha=vencida, estado_formacion='CERTIFICADO'
+        )
+        Aprendiz.objects.create(
+            documento='4', nombre='Juan', apellido='Díaz', ficha=vigente, estado_formacion='POR_CERTIFICAR'
+        )
+        Inasistencia.objects.create(aprendiz_id='1', ficha=vencida, fecha=hoy)
+        reconstruir_resumenes()
+
+    def test_metricas(self):
+        metricas = metricas_dashboard()
+
+        self.assertEqual(metricas['total_aprendices'], 4)
+        self.assertEqual(metricas['total_fichas'], 2)
+        self.assertEqual(metricas['total_inasistencias'], 1)
+        self.assertEqual(metricas['por_certificar'], 1)
+        self.assertEqual(metricas['productiva_vencida'], 1)
+        self.assertEqual(metricas['ficha_vencida'], 1)
+        self.assertEqual(metricas['casos_urgentes'], 2)
+        self.assertEqual(
+            {item['estado_formacion']: item['total'] for item in metricas['por_estado']},
+            {'EN_FORMACION': 1, 'ETAPA_PRODUCTIVA': 1, 'CERTIFICADO': 1, 'POR_CERTIFICAR': 1}
+        )
+
+    def test_numero_de_consultas(self):
+        # Sesión + usuario, resumen global y lista de urgentes
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['lista_urgentes']), 2)
+
+
+class ResumenEstadisticasTest(PruebaBase):
+    """Mantenimiento incremental de los resúmenes desde las señales"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        hoy = timezone.localdate()
+        cls.ficha = Ficha.objects.create(numero='100', centro=cls.centro, fecha_fin=hoy - timedelta(days=45))
+        cls.otra = Ficha.objects.create(numero='101', fecha_fin=hoy + timedelta(days=30))
+        Aprendiz.objects.create(documento='1', nombre='Ana', apellido='Ruiz', ficha=cls.ficha)
+        cls.resultado = ResultadoAprendizaje.objects.create(codigo='RA1', nombre='Resultado 1')
+        reconstruir_resumenes()
+
+    def assertResumenesIgualesAReconstruir(self):
+        """Los resúmenes incrementales deben coincidir con un cálculo desde cero"""
+        campos = ['clave', 'total_aprendices', 'por_estado', 'total_inasistencias', 'inasistencias_justificadas',
+                  'juicios_pendientes', 'ficha_vencida', 'casos_urgentes', 'total_fichas', 'fichas_vencidas']
+        incrementales = list(ResumenEstadisticas.objects.order_by('clave').values(*campos))
+        reconstruir_resumenes()
+        self.assertEqual(incrementales, list(ResumenEstadisticas.objects.order_by('clave').values(*campos)))
+
+    def test_cambios_actualizan_ficha_centro_y_global(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            aprendiz = Aprendiz.objects.create(documento='2', nombre='Luis', apellido='Pérez', ficha=self.ficha)
+        with self.captureOnCommitCallbacks(execute=True):
+            Inasistencia.objects.create(aprendiz=aprendiz, ficha=self.ficha, fecha=timezone.localdate(), justificada=True)
+            AprendizResultado.objects.create(aprendiz=aprendiz, resultado=self.resultado, fecha=timezone.localdate())
+
+        ficha = obtener_resumen(clave_ficha('100'))
+        self.assertEqual(ficha.total_aprendices, 2)
+        self.assertEqual(ficha.inasistencias_justificadas, 1)
+        self.assertEqual(ficha.juicios_pendientes, 1)
+        self.assertEqual(obtener_resumen(clave_centro(self.centro.pk)).total_aprendices, 2)
+        self.assertEqual(obtener_resumen(CLAVE_GLOBAL).total_aprendices, 2)
+        self.assertResumenesIgualesAReconstruir()
+
+    def test_traslado_y_eliminacion(self):
+        aprendiz = Aprendiz.objects.get(pk='1')
+        with self.captureOnCommitCallbacks(execute=True):
+            aprendiz.ficha = self.otra
+            aprendiz.estado_formacion = 'CERTIFICADO'
+            aprendiz.save()
+        self.assertEqual(obtener_resumen(clave_ficha('100')).total_aprendices, 0)
+        self.assertEqual(obtener_resumen(clave_ficha('101')).total_estado('CERTIFICADO'), 1)
+        self.assertResumenesIgualesAReconstruir()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.otra.delete()
+        self.assertFalse(ResumenEstadisticas.objects.filter(clave=clave_ficha('101')).exists())
+        self.assertEqual(obtener_resumen(clave_ficha(None)).total_aprendices, 1)
+        self.assertResumenesIgualesAReconstruir()
+
+    def test_calculo_por_ficha(self):
+        centro_id, valores = calcular_resumenes_fichas(['100'])['100']
+        self.assertEqual(centro_id, self.centro.pk)
+        self.assertEqual(valores['ficha_vencida'], 1)
+        self.assertEqual(valores['fichas_vencidas'], 1)
+
+    def test_lectura_sin_reconstruir(self):
+        # 20:00 en Bogotá es el día siguiente en UTC: sigue siendo el mismo día local
+        noche = datetime(2026, 3, 10, 20, 0, tzinfo=ZoneInfo('America/Bogota'))
+        with mock.patch('django.utils.timezone.now', return_value=noche):
+            reconstruir_resumenes()
+            self.assertEqual(obtener_resumen().fecha_calculo, date(2026, 3, 10))
+            self.assertEqual(timezone.localdate().isoformat(), '2026-03-10')
+
+        # Al día siguiente se sirve el de ayer, con una sola consulta, hasta la tarea diaria
+        with mock.patch('django.utils.timezone.now', return_value=noche + timedelta(days=1)):
+            with self.assertNumQueries(1):
+                resumen = obtener_resumen()
+        self.assertEqual((resumen.fecha_calculo, resumen.total_aprendices), (date(2026, 3, 10), 1))
+
+        # Sin resúmenes (base nueva) se calculan una vez
+        ResumenEstadisticas.objects.all().delete()
+        self.assertEqual(obtener_resumen().total_aprendices, 1)
+        self.assertTrue(ResumenEstadisticas.objects.filter(clave=clave_ficha('101')).exists())
+
+    def test_reconstruccion_con_bloqueo(self):
+        global_ = ResumenEstadisticas.objects.get(clave=CLAVE_GLOBAL)
+        # Quien obtiene el bloqueo después de otra reconstrucción del mismo día no la repite
+        self.assertIsNone(reconstruir_con_bloqueo())
+        manana = timezone.localdate() + timedelta(days=1)
+        self.assertEqual(reconstruir_con_bloqueo(manana), ResumenEstadisticas.objects.count())
+        # La fila global (la que se bloquea) se actualiza en su sitio
+        self.assertEqual(ResumenEstadisticas.objects.get(clave=CLAVE_GLOBAL).pk, global_.pk)
+        self.assertIsNone(reconstruir_con_bloqueo(manana))
+
+    def test_lote_fallido_no_deja_pendientes(self):
+        estado = resumenes._pendientes()
+        # Lote revertido: nada queda marcado en el hilo ni se aplica al confirmar
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(ValueError), transaction.atomic(), lote_resumenes():
+                Inasistencia.objects.create(aprendiz_id='1', ficha=self.ficha, fecha=timezone.localdate())
+                raise ValueError
+        self.assertEqual(callbacks, [])
+        self.assertEqual((estado.fichas, estado.aprendices, estado.contadores, estado.lotes), (set(), set(), set(), 0))
+
+        # Lote con error cuyos cambios sí se confirman: se aplican al confirmar
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), lote_resumenes():
+                Inasistencia.objects.create(aprendiz_id='1', ficha=self.ficha, fecha=timezone.localdate())
+                raise ValueError
+            self.assertEqual((estado.fichas, estado.aprendices, estado.contadores), (set(), set(), set()))
+        self.assertEqual(Aprendiz.objects.get(pk='1').total_inasistencias, 1)
+        self.assertEqual(obtener_resumen(clave_ficha('100')).total_inasistencias, 1)
+        self.assertResumenesIgualesAReconstruir()
+
+
+class VencimientoTest(TestCase):
+    """con_vencimiento() (en la BD) debe coincidir con Aprendiz.dias_vencido() y los umbrales de urgencia"""
+
+    # documento: (días desde el fin de la productiva, días desde el fin de la ficha, días vencidos esperados);
+    # None = sin fecha. Días positivos = en el pasado
+    CASOS = {
+        'p30': (30, None, 30), 'p31': (31, None, 31), 'p60': (60, None, 60), 'p61': (61, None, 61),
+        'p1': (1, None, 1), 'p0': (0, None, 0), 'futura': (-5, None, 0),
+        # Sin fin de productiva (o sin vencer) se usa el fin de la ficha
+        'f30': (None, 30, 30), 'f31': (None, 31, 31), 'f60': (None, 60, 60), 'f61': (None, 61, 61),
+        'futura_f45': (-5, 45, 45),
+        # Con las dos vencidas manda la productiva
+        'p10_f90': (10, 90, 10),
+        'sin_fechas': (None, None, 0), 'sin_ficha': (None, 'sin ficha', 0),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.localdate()
+        for i, (documento, (productiva, fin_ficha, _)) in enumerate(cls.CASOS.items()):
+            ficha = None
+            if fin_ficha != 'sin ficha':
+                ficha = Ficha.objects.create(
+                    numero=str(200 + i),
+                    fecha_fin=hoy - timedelta(days=fin_ficha) if fin_ficha is not None else None,
+                )
+            Aprendiz.objects.create(
+                documento=documento, nombre='Ana', apellido='Ruiz', ficha=ficha,
+                fecha_fin_productiva=hoy - timedelta(days=productiva) if productiva is not None else None,
+            )
+
+    def test_sql_igual_a_python(self):
+        anotados = {a.documento: a for a in Aprendiz.objects.select_related('ficha').con_vencimiento()}
+        for aprendiz in Aprendiz.objects.select_related('ficha'):
+            esperado = self.CASOS[aprendiz.documento][2]
+            with self.subTest(documento=aprendiz.documento):
+                self.assertEqual(aprendiz.dias_vencido(), esperado)
+                self.assertEqual(anotados[aprendiz.documento].dias_vencidos, esperado)
+                if esperado > DIAS_CRITICO:
+                    nivel = URGENCIA_CRITICO
+                elif esperado > DIAS_MODERADO:
+                    nivel = URGENCIA_MODERADO
+                else:
+                    nivel = URGENCIA_RECIENTE
+                self.assertEqual(anotados[aprendiz.documento].nivel_urgencia, nivel)
+
+    def test_umbrales(self):
+        niveles = dict(Aprendiz.objects.con_vencimiento().values_list('documento', 'nivel_urgencia'))
+        self.assertEqual(
+            [niveles[d] for d in ('p30', 'p31', 'p60', 'p61', 'f30', 'f31', 'f60', 'f61')],
+            [URGENCIA_RECIENTE, URGENCIA_MODERADO, URGENCIA_MODERADO, URGENCIA_CRITICO] * 2,
+        )
+        # Con otra fecha de referencia, los días se cuentan desde ella
+        manana = timezone.localdate() + timedelta(days=1)
+        self.assertEqual(Aprendiz.objects.con_vencimiento(manana).get(documento='p60').dias_vencidos, 61)
+        self.assertEqual(Aprendiz.objects.con_vencimiento(manana).get(documento='p0').dias_vencidos, 1)
+
+
+class AprendizDetailTest(PruebaBase):
+    """Detalle del aprendiz con historial paginado y juicios agrupados"""
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.localdate()
+        super().setUpTestData()
+        ficha = Ficha.objects.create(numero='100', fecha_fin=hoy + timedelta(days=30))
+        cls.aprendiz = Aprendiz.objects.create(documento='1', nombre='Ana', apellido='Ruiz', ficha=ficha)
+        for dias in range(45):
+            Inasistencia.objects.create(aprendiz=cls.aprendiz, ficha=ficha, fecha=hoy - timedelta(days=dias))
+        competencia = Competencia.objects.create(codigo='C1', nombre='Competencia 1')
+        for codigo, estado in [('RA1', 'APROBADO'), ('RA2', 'APROBADO'), ('RA3', 'PENDIENTE'), ('RA4', 'NO_APROBADO')]:
+            resultado = ResultadoAprendizaje.objects.create(codigo=codigo, nombre=codigo, competencia=competencia)
+            AprendizResultado.objects.create(aprendiz=cls.aprendiz, resultado=resultado, estado=estado, fecha=hoy)
+
+    def test_resumen_juicios(self):
+        (fila,) = resumen_juicios(self.aprendiz)
+        self.assertEqual(fila['resultado__competencia__codigo'], 'C1')
+        self.assertEqual((fila['aprobados'], fila['pendientes'], fila['no_aprobados'], fila['total']), (2, 1, 1, 4))
+
+    def test_numero_de_consultas(self):
+        url = reverse('aprendiz_detail', args=[self.aprendiz.pk])
+        # Sesión + usuario, aprendiz con ficha, conteo y página de inasistencias, juicios
+        with self.assertNumQueries(6):
+            response = self.client.get(url, {'page': 3})
+        inasistencias = response.context['inasistencias']
+        self.assertEqual(inasistencias.paginator.count, 45)
+        self.assertEqual(len(inasistencias), 5)
+
+
+class InasistenciaListTest(PruebaBase):
+    """Listado de inasistencias filtrado en el servidor"""
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.localdate()
+        super().setUpTestData()
+        ficha = Ficha.objects.create(numero='100', fecha_fin=hoy + timedelta(days=30))
+        otra = Ficha.objects.create(numero='101', fecha_fin=hoy + timedelta(days=30))
+        ana = Aprendiz.objects.create(documento='1', nombre='Ana', apellido='Ruiz', ficha=ficha)
+        luis = Aprendiz.objects.create(documento='2', nombre='Luis', apellido='Pérez', ficha=otra)
+        for dias in range(10):
+            Inasistencia.objects.create(aprendiz=ana, ficha=ficha, fecha=hoy - timedelta(days=dias), justificada=dias < 3)
+        Inasistencia.objects.create(aprendiz=luis, ficha=otra, fecha=hoy - timedelta(days=60))
+        reconstruir_resumenes()
+
+    def test_filtros(self):
+        hoy = timezone.localdate()
+        response = self.client.get(reverse('inasistencia_list'), {'ficha': '100', 'justificada': 'no'})
+        self.assertEqual(response.context['totales'], {'total': 7, 'justificadas': 0, 'no_justificadas': 7})
+
+        response = self.client.get(reverse('inasistencia_list'), {'desde': hoy - timedelta(days=4), 'hasta': 'no-es-fecha'})
+        self.assertEqual(response.context['totales']['total'], 5)
+
+        response = self.client.get(reverse('inasistencia_list'), {'documento': '2'})
+        self.assertEqual([i.aprendiz_id for i in response.context['object_list']], ['2'])
+
+    def test_numero_de_consultas(self):
+        # Sesión + usuario, totales del resumen global y página con joins
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('inasistencia_list'))
+            self.assertContains(response, 'Ruiz')
+        self.assertEqual(response.context['totales'], {'total': 11, 'justificadas': 3, 'no_justificadas': 8})
+
+    def test_cursores(self):
+        orden = ['-fecha', '-id']
+        esperado = list(Inasistencia.objects.order_by(*orden))
+
+        paginas, pagina = [], paginar_keyset(Inasistencia.objects.all(), orden, tamano=4)
+        self.assertFalse(pagina.hay_anterior)
+        while True:
+            paginas.append(pagina.filas)
+            if not pagina.hay_mas:
+                break
+            pagina = paginar_keyset(Inasistencia.objects.all(), orden, pagina.siguiente, tamano=4)
+        self.assertEqual([fila for filas in paginas for fila in filas], esperado)
+
+        # De la última página hacia atrás se recorren las mismas páginas
+        for filas in reversed(paginas[:-1]):
+            pagina = paginar_keyset(Inasistencia.objects.all(), orden, tamano=4, antes=pagina.anterior)
+            self.assertEqual(pagina.filas, filas)
+        self.assertFalse(pagina.hay_anterior)
+
+        self.assertEqual(contar_acotado(Inasistencia.objects.all(), 5), (5, False))
+        self.assertEqual(contar_acotado(Inasistencia.objects.all(), 50), (11, True))
+
+    def descargar(self, params):
+        response = self.client.get(reverse('inasistencia_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_exportar_csv(self):
+        response, contenido = self.descargar({'format': 'csv', 'ficha': '100', 'justificada': 'no'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertRegex(response['Content-Disposition'], r'attachment; filename="inasistencias_\d{8}_\d{6}\.csv"')
+        texto = contenido.decode('utf-8')
+        self.assertTrue(texto.startswith('\ufeff'))
+        filas = list(csv.reader(StringIO(texto.lstrip('\ufeff'))))
+        self.assertEqual(filas[0], [
+            'Documento', 'Nombre', 'Apellido', 'Ficha', 'Fecha', 'Justificada', 'Motivo', 'Reportado Por',
+        ])
+        # Todas las filtradas, sin paginar y en el orden de la lista
+        self.assertEqual(len(filas) - 1, 7)
+        primera = ['1', 'Ana', 'Ruiz', '100', (timezone.localdate() - timedelta(days=3)).isoformat(), 'False']
+        self.assertEqual(filas[1][:6], primera)
+
+        _, contenido = self.descargar({'format': 'csv', 'ficha': '999'})
+        self.assertEqual(len(list(csv.reader(StringIO(contenido.decode('utf-8'))))), 1)
+
+    @skipIf(exportar.pa is None, 'requiere pyarrow')
+    def test_exportar_parquet(self):
+        response, contenido = self.descargar({'format': 'parquet', 'ficha': '100'})
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.parquet')
+        self.assertIn('inasistencias_', response['Content-Disposition'])
+        tabla = exportar.pq.read_table(BytesIO(contenido))
+        self.assertEqual(tabla.num_rows, 10)
+        tipos = {campo.name: str(campo.type) for campo in tabla.schema}
+        self.assertEqual(tipos, {
+            'Documento': 'string', 'Nombre': 'string', 'Apellido': 'string', 'Ficha': 'string',
+            'Fecha': 'date32[day]', 'Justificada': 'bool', 'Motivo': 'string', 'Reportado Por': 'string',
+        })
+        columnas = tabla.to_pydict()
+        self.assertEqual(columnas['Fecha'][0], timezone.localdate())
+        self.assertEqual(columnas['Justificada'].count(True), 3)
+
+        # Lista vacía: archivo válido, sin filas
+        _, contenido = self.descargar({'format': 'parquet', 'ficha': '999'})
+        self.assertEqual(exportar.pq.read_table(BytesIO(contenido)).num_rows, 0)
+
+    def test_exportar_parquet_sin_pyarrow(self):
+        with mock.patch.object(exportar, 'pa', None):
+            response = self.client.get(reverse('inasistencia_list'), {'format': 'parquet'})
+        self.assertEqual(response.status_code, 501)
+        self.assertIn('pyarrow', response.content.decode())
+
+    def test_cursores_alterados(self):
+        orden = ['-fecha', '-id']
+        primera = paginar_keyset(Inasistencia.objects.all(), orden, tamano=4).filas
+        alterados = [
+            [{'x': 1}, 5], ['2024-01-01', 'abc'], ['no-es-fecha', 5], [None, 5], [[1], 5], [1], {'fecha': 1},
+        ]
+        for valores in alterados:
+            cursor = base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+            with self.subTest(valores=valores):
+                # Se vuelve a la primera página en lugar de fallar
+                pagina = paginar_keyset(Inasistencia.objects.all(), orden, cursor, tamano=4)
+                self.assertEqual((pagina.filas, pagina.hay_anterior), (primera, False))
+                self.assertEqual(paginar_keyset(Inasistencia.objects.all(), orden, tamano=4, antes=cursor).filas, primera)
+
+                for nombre, params in (
+                    ('inasistencia_list', {'despues': cursor}), ('inasistencia_list', {'antes': cursor}),
+                    ('aprendiz_list', {'despues': cursor}), ('casos_vencidos', {'seccion': 'urgentes', 'despues': cursor}),
+                    ('reporte_circular120', {'seccion': 'productiva_vencida', 'despues': cursor}),
+                ):
+                    self.assertEqual(self.client.get(reverse(nombre), params).status_code, 200, nombre)
+
+
+class CargarMasTest(PruebaBase):
+    """ "Cargar más" de casos vencidos y por certificar: el cursor recorre cada sección sin huecos ni repetidos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.localdate()
+        super().setUpTestData()
+        ficha = Ficha.objects.create(numero='100', fecha_fin=hoy + timedelta(days=90))
+        aprendices = []
+        # 60 por sección, con muchos empates en días vencidos (el documento desempata)
+        for n in range(180):
+            dias = (1, 31, 61)[n // 60] + n % 60 // 3
+            aprendices.append(Aprendiz(
+                documento=f'{n:04d}', nombre='Ana', apellido='Ruiz', ficha=ficha, estado_formacion='EN_FORMACION',
+                fecha_fin_productiva=hoy - timedelta(days=dias),
+            ))
+        # Por certificar: fechas repetidas y sin fecha (van al final)
+        for n in range(60):
+            aprendices.append(Aprendiz(
+                documento=f'c{n:03d}', nombre='Luis', apellido='Pérez', ficha=ficha, estado_formacion='POR_CERTIFICAR',
+                fecha_fin_productiva=hoy + timedelta(days=n % 4) if n % 5 else None,
+            ))
+        for aprendiz in aprendices:
+            aprendiz.actualizar_busqueda()
+        Aprendiz.objects.bulk_create(aprendices)
+        reconstruir_resumenes()
+
+    def recorrer(self, url, primera, params, patron):
+        """Documentos de la primera página más los de cada "cargar más" hasta que no haya cursor"""
+        documentos = [a.documento for a in primera.filas]
+        siguiente = primera.siguiente
+        while siguiente:
+            datos = self.client.get(url, dict(params, despues=siguiente)).json()
+            filas = re.findall(patron, datos['html'])
+            self.assertTrue(filas, 'página vacía con cursor')
+            documentos += filas
+            siguiente = datos['siguiente']
+        return documentos
+
+    def test_casos_vencidos(self):
+        url = reverse('casos_vencidos')
+        response = self.client.get(url)
+        vencidos = Aprendiz.objects.filter(estado_formacion='EN_FORMACION').con_vencimiento()
+        for seccion, nivel in SECCIONES_VENCIDOS.items():
+            with self.subTest(seccion=seccion):
+                esperado = list(
+                    vencidos.filter(nivel_urgencia=nivel).order_by(*ORDEN_VENCIDOS).values_list('documento', flat=True)
+                )
+                self.assertGreater(len(esperado), TAMANO_PAGINA * 2)
+                documentos = self.recorrer(
+                    url, response.context[seccion], {'seccion': seccion}, r'monospace;font-size:12px">(\w+)</strong>'
+                )
+                self.assertEqual(documentos, esperado)
+
+    def test_casos_por_certificar(self):
+        url = reverse('casos_por_certificar')
+        response = self.client.get(url)
+        documentos = self.recorrer(url, response.context['aprendices'], {}, r'<span class="doc">(\w+)</span>')
+        esperado = list(
+            Aprendiz.objects.filter(estado_formacion='POR_CERTIFICAR')
+            .annotate(orden_fecha=Coalesce('fecha_fin_productiva', Value(date.max)))
+            .order_by(*ORDEN_POR_CERTIFICAR).values_list('documento', flat=True)
+        )
+        self.assertEqual(len(documentos), 60)
+        self.assertEqual(documentos, esperado)
+
+
+class Circular120Test(PruebaBase):
+    """Página del reporte Circular 120: totales por sección iguales a las filas exportadas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.localdate()
+        super().setUpTestData()
+        vencida = Ficha.objects.create(numero='100', fecha_fin=hoy - timedelta(days=10))
+        vigente = Ficha.objects.create(numero='101', fecha_fin=hoy + timedelta(days=30))
+        for documento, ficha, estado, fin_productiva in (
+            ('1', vencida, 'EN_FORMACION', None),
+            ('2', vencida, 'ETAPA_LECTIVA', None),           # ficha vencida sin estar EN_FORMACION
+            ('3', vencida, 'ETAPA_PRODUCTIVA', -5),          # en dos secciones
+            ('4', vencida, 'CERTIFICADO', None),             # cerrado: en ninguna
+            ('5', vencida, 'CANCELADO', None),
+            ('6', vigente, 'POR_CERTIFICAR', None),
+            ('7', vigente, 'ETAPA_PRODUCTIVA', -40),
+            ('8', vigente, 'ETAPA_PRODUCTIVA', 5),
+        ):
+            Aprendiz.objects.create(
+                documento=documento, nombre='Ana', apellido='Ruiz', ficha=ficha, estado_formacion=estado,
+                fecha_fin_productiva=hoy + timedelta(days=fin_productiva) if fin_productiva is not None else None,
+            )
+
+    def test_totales_iguales_a_la_exportacion(self):
+        contexto = self.client.get(reverse('reporte_circular120')).context
+        response = self.client.get(reverse('reporte_circular120_excel'), {'format': 'csv'})
+        filas = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        secciones = {
+            'por_certificar': 'Por Certificar',
+            'productiva_vencida': 'Productiva Vencida',
+            'ficha_vencida': 'Ficha Vencida',
+        }
+        for nombre, seccion in secciones.items():
+            with self.subTest(seccion=nombre):
+                exportados = sorted(fila['Documento'] for fila in filas if fila['Sección'] == seccion)
+                self.assertEqual(contexto[f'total_{nombre}'], len(exportados))
+                self.assertEqual(sorted(a.documento for a in contexto[nombre].filas), exportados)
+        self.assertEqual(contexto['total_ficha_vencida'], 3)
+        self.assertEqual(contexto['total_casos'], len(filas))
+
+
+class FichaListTest(PruebaBase):
+    """Listado de fichas con conteos y estado anotados en la misma consulta"""
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.localdate()
+        super().setUpTestData()
+        for numero, fin, aprendices, inasistencias in (('100', -5, 3, 2), ('101', 30, 1, 0), ('102', None, 0, 0)):
+            ficha = Ficha.objects.create(
+                numero=numero, fecha_inicio=hoy - timedelta(days=int(numero)),
+                fecha_fin=hoy + timedelta(days=fin) if fin is not None else None,
+            )
+            for n in range(aprendices):
+                Aprendiz.objects.create(documento=f'{numero}{n}', nombre='Ana', apellido='Ruiz', ficha=ficha)
+            for n in range(inasistencias):
+                # Varias inasistencias del mismo aprendiz no cuentan aprendices de más
+                Inasistencia.objects.create(aprendiz_id=f'{numero}0', ficha=ficha, fecha=hoy - timedelta(days=n))
+        reconstruir_resumenes()
+
+    def test_conteos_y_estado(self):
+        response = self.client.get(reverse('ficha_list'))
+        filas = {
+            f.numero: (f.num_aprendices, f.num_inasistencias, f.estado_ficha) for f in response.context['object_list']
+        }
+        self.assertEqual(filas, {'100': (3, 2, 'vencida'), '101': (1, 0, 'activa'), '102': (0, 0, 'activa')})
+        self.assertContains(response, '<span class="badge badge-info">3</span>', html=True)
+
+        response = self.client.get(reverse('ficha_list'), {'format': 'csv'})
+        filas = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(
+            [(f['Número'], f['Aprendices'], f['Inasistencias'], f['Estado']) for f in filas],
+            [('100', '3', '2', 'vencida'), ('101', '1', '0', 'activa'), ('102', '0', '0', 'activa')],
+        )
+
+    def test_consultas_fijas(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as antes:
+            self.client.get(reverse('ficha_list'))
+        for numero in range(200, 210):
+            ficha = Ficha.objects.create(numero=str(numero))
+            Aprendiz.objects.create(documento=f'{numero}', nombre='Luis', apellido='Pérez', ficha=ficha)
+        cache.clear()
+        with CaptureQueriesContext(connection) as despues:
+            self.client.get(reverse('ficha_list'))
+        self.assertEqual(len(despues), len(antes))
+
+
+class FichaDetailTest(PruebaBase):
+    """Detalle de ficha: conteos por aprendiz en la tabla sin consultas por fila"""
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.localdate()
+        super().setUpTestData()
+        cls.ficha = Ficha.objects.create(numero='100', programa='ADSO')
+        ana = Aprendiz.objects.create(documento='1', nombre='Ana', apellido='Ruiz', ficha=cls.ficha)
+        Aprendiz.objects.create(documento='2', nombre='Luis', apellido='Pérez', ficha=cls.ficha)
+        for n, justificada in enumerate((True, False, False)):
+            Inasistencia.objects.create(aprendiz=ana, ficha=cls.ficha, fecha=hoy - timedelta(days=n), justificada=justificada)
+        for n, estado in enumerate(('PENDIENTE', 'PENDIENTE', 'APROBADO')):
+            resultado = ResultadoAprendizaje.objects.create(codigo=f'RA{n}', nombre=f'Resultado {n}')
+            AprendizResultado.objects.create(aprendiz=ana, resultado=resultado, estado=estado, fecha=hoy)
+        reconstruir_resumenes()
+
+    def test_conteos_por_aprendiz(self):
+        response = self.client.get(reverse('ficha_detail', args=['100']))
+        filas = {
+            a.documento: (a.total_inasistencias, a.inasistencias_injustificadas, a.juicios_pendientes)
+            for a in response.context['aprendices']
+        }
+        self.assertEqual(filas, {'1': (3, 2, 2), '2': (0, 0, 0)})
+        self.assertContains(response, 'title="2 sin justificar"')
+        self.assertContains(response, '<span class="badge badge-warning">2</span>', html=True)
+        self.assertEqual(response.context['total_inasistencias'], 3)
+
+    def test_consultas_fijas(self):
+        url = reverse('ficha_detail', args=['100'])
+        with CaptureQueriesContext(connection) as antes:
+            self.client.get(url)
+        for n in range(3, 13):
+            Aprendiz.objects.create(documento=str(n), nombre='Eva', apellido='Díaz', ficha=self.ficha)
+        with CaptureQueriesContext(connection) as despues:
+            self.client.get(url)
+        self.assertEqual(len(despues), len(antes))
+
+
+class ContadoresAprendizTest(TestCase):
+    """Contadores desnormalizados de juicios e inasistencias en Aprendiz"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ficha = Ficha.objects.create(numero='100')
+        cls.ana = Aprendiz.objects.create(documento='1', nombre='Ana', apellido='Ruiz', ficha=cls.ficha)
+        cls.luis = Aprendiz.objects.create(documento='2', nombre='Luis', apellido='Pérez', ficha=cls.ficha)
+        cls.resultados = [
+            ResultadoAprendizaje.objects.create(codigo=f'RA{i}', nombre=f'Resultado {i}') for i in range(3)
+        ]
+
+    def contadores(self, aprendiz):
+        aprendiz.refresh_from_db()
+        return (aprendiz.juicios_pendientes, aprendiz.juicios_aprobados, aprendiz.juicios_no_aprobados,
+                aprendiz.total_inasistencias, aprendiz.inasistencias_injustificadas)
+
+    def test_ediciones_individuales(self):
+        hoy = timezone.localdate()
+        juicio = AprendizResultado.objects.create(aprendiz=self.ana, resultado=self.resultados[0], fecha=hoy)
+        inasistencia = Inasistencia.objects.create(aprendiz=self.ana, ficha=self.ficha, fecha=hoy)
+        self.assertEqual(self.contadores(self.ana), (1, 0, 0, 1, 1))
+
+        juicio.estado = 'APROBADO'
+        juicio.save()
+        inasistencia.justificada = True
+        inasistencia.save()
+        self.assertEqual(self.contadores(self.ana), (0, 1, 0, 1, 0))
+
+        # Reasignada a otro aprendiz: se corrigen ambos
+        inasistencia.aprendiz = self.luis
+        inasistencia.save()
+        juicio.delete()
+        self.assertEqual(self.contadores(self.ana), (0, 0, 0, 0, 0))
+        self.assertEqual(self.contadores(self.luis), (0, 0, 0, 1, 0))
+
+    def test_lote_y_reparacion(self):
+        hoy = timezone.localdate()
+        with lote_resumenes():
+            for resultado, estado in zip(self.resultados, ['PENDIENTE', 'APROBADO', 'NO_APROBADO']):
+                AprendizResultado.objects.create(aprendiz=self.luis, resultado=resultado, estado=estado, fecha=hoy)
+            # Dentro del lote todavía no se han recalculado
+            self.assertEqual(self.contadores(self.luis), (0, 0, 0, 0, 0))
+        self.assertEqual(self.contadores(self.luis), (1, 1, 1, 0, 0))
+
+        Aprendiz.objects.filter(pk=self.ana.pk).update(juicios_pendientes=7, total_inasistencias=3)
+        self.assertEqual(reparar_contadores(), 1)
+        self.assertEqual(self.contadores(self.ana), (0, 0, 0, 0, 0))
+        self.assertEqual(reparar_contadores(), 0)
+
+
+class BusquedaAprendicesTest(PruebaBase):
+    """Búsqueda sin tildes ni mayúsculas por nombre, apellido y documento"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Aprendiz.objects.create(documento='1052', nombre='María José', apellido='Núñez', estado_formacion='CERTIFICADO')
+        Aprendiz.objects.create(documento='2077', nombre='Jose', apellido='Nunez Peña')
+        Aprendiz.objects.create(documento='3099', nombre='Ana', apellido='Ruiz')
+
+    def documentos(self, texto):
+        return sorted(buscar_aprendices(Aprendiz.objects.all(), texto).values_list('documento', flat=True))
+
+    def test_busqueda(self):
+        self.assertEqual(self.documentos('nunez'), ['1052', '2077'])
+        self.assertEqual(self.documentos('JOSÉ núñ'), ['1052', '2077'])
+        self.assertEqual(self.documentos('maria nunez'), ['1052'])
+        self.assertEqual(self.documentos('pena'), ['2077'])
+        self.assertEqual(self.documentos('30'), ['3099'])
+        self.assertEqual(self.documentos('"*'), ['1052', '2077', '3099'])
+
+    def test_sincronizacion(self):
+        aprendiz = Aprendiz.objects.get(pk='3099')
+        aprendiz.apellido = 'Gómez'
+        aprendiz.save(update_fields=['apellido'])
+        self.assertEqual(self.documentos('gomez'), ['3099'])
+        self.assertEqual(self.documentos('ruiz'), [])
+
+        nuevo = Aprendiz(documento='4000', nombre='Íñigo', apellido='Ávila')
+        nuevo.actualizar_busqueda()
+        Aprendiz.objects.bulk_create([nuevo])
+        self.assertEqual(self.documentos('inigo avila'), ['4000'])
+
+        Aprendiz.objects.filter(pk='4000').delete()
+        self.assertEqual(self.documentos('inigo'), [])
+
+    def test_filtros_por_columna(self):
+        def filtrar(**params):
+            return sorted(AprendizFilter(params, queryset=Aprendiz.objects.all()).qs.values_list('documento', flat=True))
+
+        # nombre y apellido buscan solo en su columna: "jos" es nombre, no apellido
+        self.assertEqual(filtrar(nombre='jos'), ['1052', '2077'])
+        self.assertEqual(filtrar(apellido='jos'), [])
+        self.assertEqual(filtrar(apellido='peña'), ['2077'])
+        self.assertEqual(filtrar(nombre='ruiz'), [])
+        # q sí busca en las tres, sin tildes
+        self.assertEqual(filtrar(q='nunez pena'), ['2077'])
+
+    def test_vista_y_api(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse('aprendiz_list'), {'q': 'Nuñez', 'estado': 'CERTIFICADO'})
+        self.assertEqual([a.documento for a in response.context['object_list']], ['1052'])
+        response = self.client.get(reverse('api_aprendices'), {'q': 'nunez'})
+        self.assertEqual(response.json()['count'], 2)
+
+
+class AutocompletarTest(PruebaBase):
+    """Endpoints de autocompletar y formularios sin listas completas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for numero in ['2756890', '2756891', '3001234']:
+            Ficha.objects.create(numero=numero, programa=f'Programa {numero}')
+        for i in range(30):
+            Aprendiz.objects.create(documento=f'10{i:02d}', nombre='Ana', apellido=f'Apellido{i:02d}')
+        Aprendiz.objects.create(documento='2000', nombre='Íñigo', apellido='Ávila')
+
+    def test_endpoints(self):
+        response = self.client.get(reverse('autocompletar_fichas'), {'q': '27568'})
+        self.assertEqual([r['id'] for r in response.json()['resultados']], ['2756890', '2756891'])
+
+        response = self.client.get(reverse('autocompletar_aprendices'), {'q': 'inigo'})
+        self.assertEqual(response.json()['resultados'], [{'id': '2000', 'texto': '2000 - Íñigo Ávila', 'ficha': None}])
+
+        response = self.client.get(reverse('autocompletar_aprendices'), {'q': 'ana'})
+        self.assertEqual(len(response.json()['resultados']), 20)
+
+    def test_formulario_inasistencia(self):
+        response = self.client.get(reverse('inasistencia_create'))
+        self.assertNotContains(response, 'Apellido05')
+        self.assertNotContains(response, '<option value="2756890"')
+
+        response = self.client.post(reverse('inasistencia_create'), {
+            'aprendiz': '2000', 'ficha': '2756890', 'fecha': '2024-05-02',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Inasistencia.objects.filter(aprendiz_id='2000', ficha_id='2756890').exists())
+
+
+class CacheVistasTest(PruebaBase):
+    """Cache de vistas de lectura invalidado por versión de los datos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+        cls.ficha = Ficha.objects.create(numero='100', programa='ADSO')
+        Aprendiz.objects.create(documento='1', nombre='Ana', apellido='Ruiz', ficha=cls.ficha)
+        reconstruir_resumenes()
+
+    def test_acierto_sin_consultas(self):
+        self.client.get(reverse('dashboard'))
+        # Solo sesión + usuario
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_aprendices'], 1)
+
+        self.client.get(reverse('ficha_list'))
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('ficha_list'))
+        self.assertContains(response, 'ADSO')
+
+        self.assertEqual(metricas_cache(['dashboard'])['dashboard'], {'aciertos': 1, 'fallos': 1, 'tasa_aciertos': 0.5})
+
+    def test_cambios_invalidan(self):
+        url = reverse('api_aprendices')
+        self.assertEqual(self.client.get(url).json()['count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Aprendiz.objects.create(documento='2', nombre='Luis', apellido='Pérez', ficha=self.ficha)
+        self.assertEqual(self.client.get(url).json()['count'], 2)
+
+        # Importación masiva: bulk_create no dispara señales, el lote invalida al confirmar
+        with self.captureOnCommitCallbacks(execute=True):
+            with lote_resumenes():
+                Aprendiz.objects.bulk_create([Aprendiz(documento='3', nombre='Sara', apellido='Gómez')])
+        self.assertEqual(self.client.get(url).json()['count'], 3)
+
+        self.assertEqual(self.client.get(reverse('dashboard')).context['total_inasistencias'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Inasistencia.objects.create(aprendiz_id='1', ficha=self.ficha, fecha=timezone.localdate())
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_inasistencias'], 1)
+
+    def test_metricas_solo_administradores(self):
+        self.client.get(reverse('api_aprendices'))
+        self.client.get(reverse('api_aprendices'))
+        self.assertEqual(self.client.get(reverse('api_metricas_cache')).status_code, 403)
+
+        self.client.force_login(self.admin)
+        vistas = self.client.get(reverse('api_metricas_cache')).json()['vistas']
+        self.assertEqual(vistas['api:aprendices'], {'aciertos': 1, 'fallos': 1, 'tasa_aciertos': 0.5})
+
+
+def usar_media_temporal(prueba):
+    """MEDIA_ROOT en un directorio temporal que se borra al terminar la prueba"""
+    media = tempfile.mkdtemp()
+    prueba.addCleanup(shutil.rmtree, media, ignore_errors=True)
+    configuracion = override_settings(MEDIA_ROOT=media)
+    configuracion.enable()
+    prueba.addCleanup(configuracion.disable)
+
+
+def valores_libro(libro):
+    """Valores de todas las celdas de la hoja activa"""
+    return {celda for fila in libro.active.iter_rows(values_only=True) for celda in fila if celda is not None}
+
+
+class GeneradorReportesTest(PruebaBase):
+    """Los reportes se escriben en su archivo destino y las descargas se transmiten desde disco"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.ficha = Ficha.objects.create(numero='100', programa='ADSO')
+        Aprendiz.objects.create(documento='1', nombre='Ana', apellido='Ruiz', ficha=cls.ficha)
+        Inasistencia.objects.create(aprendiz_id='1', ficha=cls.ficha, fecha=timezone.localdate())
+
+    def setUp(self):
+        super().setUp()
+        usar_media_temporal(self)
+
+    def test_escribe_en_el_destino(self):
+        ruta = os.path.join(settings.MEDIA_ROOT, 'inasistencias.xlsx')
+        with open(ruta, 'w+b') as destino:
+            # Se devuelve el mismo archivo, al inicio, sin copia en memoria
+            self.assertIs(GeneradorReportes().generar('inasistencias', ficha=self.ficha, destino=destino), destino)
+            self.assertEqual(destino.tell(), 0)
+        self.assertIn('1', valores_libro(load_workbook(ruta)))
+
+    def test_sin_destino_pasa_a_disco(self):
+        with GeneradorReportes().generar('juicios') as excel:
+            self.assertFalse(excel._rolled)
+        with mock.patch('aprendices.utils.reportes.SPOOL_MAX_BYTES', 1):
+            with GeneradorReportes().generar('juicios') as excel:
+                self.assertTrue(excel._rolled)
+                load_workbook(excel)
+
+    def test_descarga_desde_el_archivo_cacheado(self):
+        response = self.client.get(reverse('reporte_inasistencias_excel'), {'ficha': '100'})
+        self.assertTrue(response.streaming)
+        contenido = b''.join(response.streaming_content)
+        # Lo enviado es el archivo del cache, tal cual quedó en disco
+        [nombre] = os.listdir(directorio_cache())
+        with open(os.path.join(directorio_cache(), nombre), 'rb') as archivo:
+            self.assertEqual(contenido, archivo.read())
+        self.assertIn('1', valores_libro(load_workbook(BytesIO(contenido))))
+
+
+class CacheReportesTest(PruebaBase):
+    """Reportes en Excel cacheados en disco: se regeneran cuando cambian los datos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.ficha = Ficha.objects.create(numero='100', programa='ADSO')
+        Aprendiz.objects.create(documento='1', nombre='Ana', apellido='Ruiz', ficha=cls.ficha)
+        competencia = Competencia.objects.create(codigo='C1', nombre='Competencia')
+        resultado = ResultadoAprendizaje.objects.create(codigo='R1', nombre='Resultado', competencia=competencia)
+        cls.juicio = AprendizResultado.objects.create(
+            aprendiz_id='1', resultado=resultado, estado='PENDIENTE', fecha=timezone.localdate()
+        )
+        cls.inasistencia = Inasistencia.objects.create(aprendiz_id='1', ficha=cls.ficha, fecha=timezone.localdate())
+
+    def setUp(self):
+        super().setUp()
+        usar_media_temporal(self)
+        self.generados = 0
+
+    def generar(self, destino):
+        self.generados += 1
+        destino.write(b'reporte')
+
+    def descargar_juicios(self):
+        """Valor de la columna Juicio en la primera fila del reporte descargado"""
+        response = self.client.get(reverse('reporte_juicios_excel'))
+        libro = load_workbook(BytesIO(b''.join(response.streaming_content)))
+        return libro.active['H4'].value
+
+    def test_edicion_de_juicio_regenera(self):
+        self.assertEqual(self.descargar_juicios(), 'PENDIENTE')
+        self.assertEqual(self.descargar_juicios(), 'PENDIENTE')
+        self.assertEqual(len(os.listdir(directorio_cache())), 1)
+
+        # Cambia el estado sin cambiar fechas de creación ni totales
+        with self.captureOnCommitCallbacks(execute=True):
+            self.juicio.estado = 'APROBADO'
+            self.juicio.save()
+        self.assertEqual(self.descargar_juicios(), 'APROBADO')
+        self.assertEqual(len(os.listdir(directorio_cache())), 2)
+
+    def test_edicion_de_inasistencia_e_importacion_regeneran(self):
+        parametros = {'ficha': '100', 'centro': None, 'fecha_desde': None, 'fecha_hasta': None}
+        obtener_reporte('inasistencias', self.generar, **parametros)
+        obtener_reporte('inasistencias', self.generar, **parametros)
+        self.assertEqual(self.generados, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.inasistencia.justificada = True
+            self.inasistencia.save()
+        obtener_reporte('inasistencias', self.generar, **parametros)
+        self.assertEqual(self.generados, 2)
+
+        # Reimportación: update_or_create sobre juicios existentes dentro del lote
+        with self.captureOnCommitCallbacks(execute=True):
+            with lote_resumenes():
+                AprendizResultado.objects.update_or_create(
+                    aprendiz_id='1', resultado=self.juicio.resultado, defaults={'estado': 'APROBADO'}
+                )
+        obtener_reporte('inasistencias', self.generar, **parametros)
+        self.assertEqual(self.generados, 3)
+
+    def test_version_independiente_del_cache(self):
+        # Otro proceso (un worker de Celery con locmem) no comparte el cache de este
+        version = version_reportes()
+        cache.clear()
+        self.assertEqual(version_reportes(), version)
+        obtener_reporte('circular120', self.generar, ficha=None, centro=None)
+
+        # Un cambio confirmado en ese otro proceso: no invalida el cache de este
+        with mock.patch('aprendices.utils.resumenes.invalidar_vistas'):
+            with self.captureOnCommitCallbacks(execute=True):
+                Aprendiz.objects.get(documento='1').save()
+        self.assertNotEqual(version_reportes(), version)
+        obtener_reporte('circular120', self.generar, ficha=None, centro=None)
+        self.assertEqual(self.generados, 2)
+
+    def test_limpieza_conserva_el_reporte_devuelto(self):
+        viejo = obtener_reporte('circular120', self.generar, ficha=None, centro=None)
+        with self.captureOnCommitCallbacks(execute=True):
+            Aprendiz.objects.filter(documento='1').update(nombre='Ana María')
+            Aprendiz.objects.get(documento='1').save()
+        # Un límite menor que cualquier archivo: se elimina todo menos el que se va a servir
+        with override_settings(REPORTES_CACHE_MAX_BYTES=1):
+            ruta = obtener_reporte('circular120', self.generar, ficha=None, centro=None)
+        self.assertTrue(os.path.exists(ruta))
+        self.assertFalse(os.path.exists(viejo))
+        self.assertEqual(os.listdir(directorio_cache()), [os.path.basename(ruta)])
+
+
+@override_settings(REPORTES_PAQUETE_PROCESOS=1)
+class PaqueteReportesTest(PruebaBase):
+    """Paquete ZIP de reportes por ficha de un centro"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for numero in ('100', '101'):
+            ficha = Ficha.objects.create(numero=numero, programa='ADSO', centro=cls.centro)
+            Aprendiz.objects.create(documento=numero, nombre='Ana', apellido='Ruiz', ficha=ficha)
+        Ficha.objects.create(numero='200', programa='Otro centro')
+
+    def setUp(self):
+        super().setUp()
+        usar_media_temporal(self)
+
+    def nombres(self, contenido):
+        with zipfile.ZipFile(BytesIO(contenido)) as zf:
+            for nombre in zf.namelist():
+                # Cada entrada es un libro de Excel válido
+                load_workbook(BytesIO(zf.read(nombre)))
+            return sorted(zf.namelist())
+
+    def test_paquete_en_el_proceso_actual(self):
+        destino = BytesIO()
+        generar_paquete_centro(self.centro, destino, procesos=1)
+        self.assertEqual(self.nombres(destino.getvalue()), [
+            f'{numero}/{tipo}_{numero}.xlsx' for numero in ('100', '101')
+            for tipo in ('circular120', 'inasistencias', 'juicios')
+        ])
+
+        destino = BytesIO()
+        generar_paquete_centro(self.centro, destino, tipos=['juicios'], procesos=1)
+        self.assertEqual(self.nombres(destino.getvalue()), ['100/juicios_100.xlsx', '101/juicios_101.xlsx'])
+
+    def test_flujo_incremental(self):
+        generar = mock.patch.object(
+            paquete_reportes, 'generar_reporte_ficha', wraps=paquete_reportes.generar_reporte_ficha,
+        )
+        with generar as generados:
+            flujo = flujo_paquete_centro(self.centro, tipos=['juicios'], procesos=1)
+            # El primer libro se envía antes de generar el segundo
+            primero = next(flujo)
+            self.assertTrue(primero.startswith(b'PK'))
+            self.assertEqual(generados.call_count, 1)
+            contenido = primero + b''.join(flujo)
+            self.assertEqual(generados.call_count, 2)
+        self.assertEqual(self.nombres(contenido), ['100/juicios_100.xlsx', '101/juicios_101.xlsx'])
+
+        # Cortar la descarga deja de generar y borra los temporales
+        with generar as generados:
+            flujo = flujo_paquete_centro(self.centro, tipos=['juicios'], procesos=1)
+            next(flujo)
+            flujo.close()
+            self.assertEqual(generados.call_count, 1)
+            directorio = generados.call_args.args[2]
+        self.assertFalse(os.path.exists(directorio))
+
+    def test_vista(self):
+        response = self.client.get(reverse('paquete_reportes', args=['9111']))
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertIn('paquete_reportes_9111_', response['Content-Disposition'])
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(self.nombres(b''.join(response.streaming_content))), 6)
+
+        self.assertEqual(self.client.get(reverse('paquete_reportes', args=['0000'])).status_code, 404)
+
+    def test_comando(self):
+        salida = os.path.join(settings.MEDIA_ROOT, 'paquete.zip')
+        call_command('generar_paquete_reportes', '9111', salida=salida, tipos=['juicios'], procesos=1, stdout=StringIO())
+        with open(salida, 'rb') as archivo:
+            self.assertEqual(self.nombres(archivo.read()), ['100/juicios_100.xlsx', '101/juicios_101.xlsx'])
+
+        with self.assertRaisesMessage(CommandError, 'No existe el centro 0000'):
+            call_command('generar_paquete_reportes', '0000', salida=salida, stdout=StringIO())
+
+
+class TrabajosReportesTest(PruebaBase):
+    """Reportes registrados en ReporteGenerado y generados por las tareas de Celery"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        CentroFormacion.objects.create(codigo='9222', nombre='Centro Inactivo', municipio='Tunja', activo=False)
+        cls.ficha = Ficha.objects.create(numero='100', programa='ADSO', centro=cls.centro)
+        Aprendiz.objects.create(documento='1', nombre='Ana', apellido='Ruiz', ficha=cls.ficha)
+
+    def setUp(self):
+        super().setUp()
+        usar_media_temporal(self)
+
+    def test_registrar_y_generar(self):
+        job_id, reporte_ids = registrar_trabajos_reportes(fichas=[self.ficha])
+        reportes = ReporteGenerado.objects.filter(pk__in=reporte_ids)
+        # Globales, centro activo y ficha; el centro inactivo no
+        self.assertEqual(len(reporte_ids), 9)
+        self.assertEqual({r.job_id for r in reportes}, {job_id})
+        self.assertEqual(
+            sorted((r.tipo, r.centro_id is not None, r.ficha_id or '') for r in reportes),
+            sorted((tipo, centro, ficha) for tipo in ('inasistencias', 'juicios', 'circular120')
+                   for centro, ficha in ((False, ''), (True, ''), (False, '100'))),
+        )
+        self.assertEqual(set(reportes.values_list('estado', flat=True)), {'PENDIENTE'})
+
+        reporte = reportes.get(tipo='juicios', ficha='100')
+        nombre = generar_reporte_registrado(reporte.pk)
+        reporte.refresh_from_db()
+        self.assertEqual((reporte.estado, reporte.archivo.name, reporte.version), ('LISTO', nombre, version_reportes()))
+        self.assertEqual(reporte.tamano, os.path.getsize(reporte.archivo.path))
+        self.assertIsNotNone(reporte.finalizado)
+        load_workbook(reporte.archivo.path)
+
+        reporte = reportes.get(tipo='circular120', ficha__isnull=True, centro__isnull=True)
+        with mock.patch.object(GeneradorReportes, 'generar', side_effect=RuntimeError('disco lleno')):
+            self.assertIsNone(generar_reporte_registrado(reporte.pk))
+        reporte.refresh_from_db()
+        self.assertEqual((reporte.estado, reporte.error), ('ERROR', 'disco lleno'))
+        self.assertFalse(reporte.archivo)
+
+    def test_estado_del_trabajo(self):
+        job_id, reporte_ids = registrar_trabajos_reportes(por_centro=False)
+        url = reverse('estado_reportes', args=[job_id])
+        datos = self.client.get(url).json()
+        self.assertFalse(datos['terminado'])
+        self.assertEqual([(r['estado'], r['url']) for r in datos['reportes']], [('PENDIENTE', None)] * 3)
+
+        for reporte_id in reporte_ids:
+            generar_reporte_registrado(reporte_id)
+        datos = self.client.get(url).json()
+        self.assertTrue(datos['terminado'])
+        for reporte in datos['reportes']:
+            self.assertEqual((reporte['estado'], reporte['centro'], reporte['error']), ('LISTO', None, None))
+            self.assertTrue(reporte['url'].startswith(f'/media/reportes/{job_id}/'))
+            self.assertGreater(reporte['tamano'], 0)
+
+        self.assertEqual(self.client.get(reverse('estado_reportes', args=['no-existe'])).json()['terminado'], False)
+
+    def test_broker_caido(self):
+        with mock.patch('aprendices.tasks.group') as grupo:
+            grupo.return_value.apply_async.side_effect = ConnectionError('broker caído')
+            response = self.client.get(reverse('generar_todos_reportes'))
+            self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+            with self.assertRaises(ConnectionError):
+                precalcular_reportes_task()
+
+        reportes = ReporteGenerado.objects.all()
+        # Globales y del centro activo, desde la vista y desde la tarea nocturna (la ficha no tiene casos abiertos)
+        self.assertEqual(reportes.count(), 6 + 6)
+        self.assertEqual(set(reportes.values_list('estado', flat=True)), {'ERROR'})
+        self.assertIn('broker caído', reportes.first().error)
+
+    def test_retencion_expira_pendientes(self):
+        _, (reciente, perdido, viejo) = registrar_trabajos_reportes(por_centro=False)
+        ahora = timezone.now()
+        ReporteGenerado.objects.filter(pk=perdido).update(created_at=ahora - timedelta(days=2))
+        ReporteGenerado.objects.filter(pk=viejo).update(created_at=ahora - timedelta(days=8))
+
+        self.assertEqual(aplicar_retencion_reportes(dias=7), 1)
+        estados = dict(ReporteGenerado.objects.values_list('pk', 'estado'))
+        self.assertEqual(estados, {reciente: 'PENDIENTE', perdido: 'ERROR'})
+
+
+class ReportesNocturnosTest(PruebaBase):
+    """Precálculo nocturno de reportes, su uso en las descargas y la retención"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        hoy = timezone.localdate()
+        # (ficha, fin de la ficha en días, estado del aprendiz, fin de la productiva en días)
+        for numero, fin_ficha, estado, fin_productiva in (
+            ('100', -10, 'EN_FORMACION', None),        # ficha vencida
+            ('101', 30, 'POR_CERTIFICAR', None),
+            ('102', 30, 'ETAPA_PRODUCTIVA', -5),       # productiva vencida
+            ('103', -10, 'CERTIFICADO', None),         # vencida pero cerrada
+            ('104', 30, 'EN_FORMACION', None),
+            ('105', 30, 'ETAPA_PRODUCTIVA', 5),
+        ):
+            ficha = Ficha.objects.create(numero=numero, centro=cls.centro, fecha_fin=hoy + timedelta(days=fin_ficha))
+            Aprendiz.objects.create(
+                documento=numero, nombre='Ana', apellido='Ruiz', ficha=ficha, estado_formacion=estado,
+                fecha_fin_productiva=hoy + timedelta(days=fin_productiva) if fin_productiva is not None else None,
+            )
+
+    def setUp(self):
+        super().setUp()
+        usar_media_temporal(self)
+        self.generados = 0
+
+    def generar(self, destino):
+        self.generados += 1
+        destino.write(b'reporte')
+
+    def test_fichas_con_casos_abiertos(self):
+        self.assertEqual(set(fichas_con_casos_abiertos().values_list('numero', flat=True)), {'100', '101', '102'})
+
+    def test_registrar_reportes_nocturnos(self):
+        job_id, reporte_ids = registrar_reportes_nocturnos()
+        reportes = ReporteGenerado.objects.filter(job_id=job_id)
+        # Tres tipos: global, centro y cada ficha con casos abiertos
+        self.assertEqual(len(reporte_ids), 3 * (1 + 1 + 3))
+        self.assertEqual(set(reportes.values_list('origen', 'estado')), {('NOCTURNO', 'PENDIENTE')})
+        self.assertEqual(set(reportes.exclude(ficha=None).values_list('ficha_id', flat=True)), {'100', '101', '102'})
+
+    def test_snapshot_vigente(self):
+        _, reporte_ids = registrar_trabajos_reportes(por_centro=False, fichas=Ficha.objects.filter(numero='100'))
+        for reporte_id in reporte_ids:
+            generar_reporte_registrado(reporte_id)
+        general = ReporteGenerado.objects.get(tipo='circular120', ficha=None)
+        de_ficha = ReporteGenerado.objects.get(tipo='circular120', ficha='100')
+
+        # El precalculado de hoy se sirve sin generar nada, solo para su mismo ámbito
+        self.assertEqual(snapshot_vigente('circular120', version_reportes()), general)
+        self.assertEqual(obtener_reporte('circular120', self.generar, ficha=None, centro=None), general.archivo.path)
+        self.assertEqual(obtener_reporte('circular120', self.generar, ficha='100', centro=None), de_ficha.archivo.path)
+        self.assertEqual(self.generados, 0)
+        obtener_reporte('circular120', self.generar, ficha='101', centro=None)
+        self.assertEqual(self.generados, 1)
+        # Con filtro de fechas no aplica el precalculado
+        obtener_reporte('inasistencias', self.generar, ficha=None, centro=None, fecha_desde='2026-01-01', fecha_hasta=None)
+        self.assertEqual(self.generados, 2)
+
+        # Tras un cambio de datos el precalculado ya no está vigente
+        with self.captureOnCommitCallbacks(execute=True):
+            Aprendiz.objects.get(documento='104').save()
+        self.assertIsNone(snapshot_vigente('circular120', version_reportes()))
+        ruta = obtener_reporte('circular120', self.generar, ficha=None, centro=None)
+        self.assertEqual(self.generados, 3)
+        self.assertTrue(ruta.startswith(directorio_cache()))
+
+        # Ni el de otro día
+        ReporteGenerado.objects.update(version=version_reportes(), created_at=timezone.now() - timedelta(days=1))
+        self.assertIsNone(snapshot_vigente('circular120', version_reportes()))
+
+    def test_snapshot_de_otro_proceso(self):
+        # El worker de Celery que precalcula tiene otro cache (locmem) con otra versión de vistas
+        cache.set(CLAVE_VERSION, 111, None)
+        _, reporte_ids = registrar_trabajos_reportes(por_centro=False)
+        for reporte_id in reporte_ids:
+            generar_reporte_registrado(reporte_id)
+        general = ReporteGenerado.objects.get(tipo='juicios', ficha=None)
+
+        # El proceso web lo sirve por la mañana aunque su cache sea otro
+        cache.clear()
+        cache.set(CLAVE_VERSION, 222, None)
+        self.assertEqual(obtener_reporte('juicios', self.generar, ficha=None, centro=None), general.archivo.path)
+        self.assertEqual(self.generados, 0)
+
+    def test_retencion(self):
+        _, reporte_ids = registrar_trabajos_reportes(por_centro=False)
+        for reporte_id in reporte_ids:
+            generar_reporte_registrado(reporte_id)
+        viejo, mediano, nuevo = ReporteGenerado.objects.filter(pk__in=reporte_ids).order_by('pk')
+        ahora = timezone.now()
+        for reporte, dias in ((viejo, 8), (mediano, 2), (nuevo, 1)):
+            ReporteGenerado.objects.filter(pk=reporte.pk).update(created_at=ahora - timedelta(days=dias))
+
+        # Sin límite de tamaño solo sale el que pasó los días de retención, con su archivo
+        self.assertEqual(aplicar_retencion_reportes(dias=7, max_bytes=10 ** 9), 1)
+        self.assertFalse(os.path.exists(viejo.archivo.path))
+        self.assertTrue(os.path.exists(mediano.archivo.path))
+
+        # Con límite de tamaño se conservan los más recientes que caben
+        self.assertEqual(aplicar_retencion_reportes(dias=7, max_bytes=nuevo.tamano), 1)
+        self.assertEqual(list(ReporteGenerado.objects.values_list('pk', flat=True)), [nuevo.pk])
+        self.assertFalse(os.path.exists(mediano.archivo.path))
+        self.assertTrue(os.path.exists(nuevo.archivo.path))
+
+
+def consultas_ejecutadas(funcion):
+    """(sql, params) de cada SELECT que ejecuta funcion(), con los parámetros sin interpolar"""
+    consultas = []
+
+    def registrar(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            consultas.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(registrar):
+        funcion()
+    return consultas
+
+
+def recorridos_completos(sql, params):
+    """
+    Pasos del plan (EXPLAIN) que recorren una tabla completa. En SQLite, un
+    SCAN sin índice, o por índice sin LIMIT que lo corte; en PostgreSQL, un
+    Seq Scan con enable_seqscan desactivado (es decir, sin índice posible).
+    Los parámetros se pasan aparte, como en la consulta real: con valores
+    literales SQLite puede elegir índices parciales que luego no usa.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            pasos = [fila[3] for fila in cursor.fetchall()]
+            return [
+                paso for paso in pasos
+                if re.match(r'SCAN (?!subquery|CONSTANT ROW)', paso) and 'VIRTUAL TABLE' not in paso
+                and ('INDEX' not in paso or 'LIMIT' not in sql)
+            ]
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(f'EXPLAIN {sql}', params)
+        return [fila[0].strip() for fila in cursor.fetchall() if 'Seq Scan on' in fila[0]]
+
+
+class PlanesConsultaTest(PruebaBase):
+    """Ninguna consulta frecuente de las vistas, la API o los reportes recorre una tabla completa"""
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.localdate()
+        super().setUpTestData()
+        vencida = Ficha.objects.create(numero='100', centro=cls.centro, fecha_fin=hoy - timedelta(days=45))
+        vigente = Ficha.objects.create(numero='101', centro=cls.centro, fecha_fin=hoy + timedelta(days=90))
+        competencia = Competencia.objects.create(codigo='C1', nombre='Competencia')
+        resultado = ResultadoAprendizaje.objects.create(codigo='R1', nombre='Resultado', competencia=competencia)
+
+        estados = ['EN_FORMACION', 'ETAPA_PRODUCTIVA', 'POR_CERTIFICAR', 'CERTIFICADO']
+        for i, estado in enumerate(estados * 3):
+            aprendiz = Aprendiz.objects.create(
+                documento=str(1000 + i), nombre='Ana', apellido=f'Ruiz{i}', estado_formacion=estado,
+                ficha=vencida if i % 2 else vigente, fecha_fin_productiva=hoy - timedelta(days=20 * i),
+            )
+            Inasistencia.objects.create(aprendiz=aprendiz, ficha=aprendiz.ficha, fecha=hoy - timedelta(days=i))
+            AprendizResultado.objects.create(aprendiz=aprendiz, resultado=resultado, fecha=hoy)
+        reconstruir_resumenes()
+
+    def consultas_frecuentes(self):
+        hoy = timezone.localdate()
+        cursor = paginar_keyset(Aprendiz.objects.con_vencimiento(hoy), ORDEN_VENCIDOS, tamano=1).siguiente
+        generador = GeneradorReportes()
+        get = self.client.get
+        return {
+            # views.py
+            'dashboard': lambda: get(reverse('dashboard')),
+            'casos_por_certificar': lambda: get(reverse('casos_por_certificar')),
+            'casos_vencidos': lambda: get(reverse('casos_vencidos')),
+            'casos_vencidos (cargar más)': lambda: get(
+                reverse('casos_vencidos'), {'seccion': 'urgentes', 'despues': cursor}
+            ),
+            'reporte_circular120': lambda: get(reverse('reporte_circular120')),
+            'reporte_circular120 (cargar más)': lambda: get(
+                reverse('reporte_circular120'), {'seccion': 'ficha_vencida', 'despues': cursor}
+            ),
+            'aprendiz_list': lambda: get(reverse('aprendiz_list')),
+            'aprendiz_list filtrada': lambda: get(
+                reverse('aprendiz_list'), {'ficha': '100', 'estado': 'ETAPA_PRODUCTIVA', 'orden': 'juicios'}
+            ),
+            'aprendiz_list búsqueda': lambda: get(reverse('aprendiz_list'), {'q': 'ruiz1'}),
+            'aprendiz_detail': lambda: get(reverse('aprendiz_detail', args=['1001'])),
+            'inasistencia_list': lambda: get(reverse('inasistencia_list')),
+            'inasistencia_list filtrada': lambda: get(reverse('inasistencia_list'), {
+                'ficha': '100', 'desde': hoy - timedelta(days=5), 'justificada': 'no',
+            }),
+            'inasistencia_list por aprendiz': lambda: get(reverse('inasistencia_list'), {'documento': '1001'}),
+            # api_views.py
+            'api_aprendices': lambda: get(reverse('api_aprendices'), {'ficha': '100', 'estado': 'EN_FORMACION'}),
+            'autocompletar_aprendices': lambda: get(reverse('autocompletar_aprendices'), {'q': 'ana'}),
+            'autocompletar_fichas': lambda: get(reverse('autocompletar_fichas'), {'q': '10'}),
+            # utils/reportes.py
+            'reporte inasistencias por ficha': lambda: list(generador.filas_inasistencias(ficha='100')),
+            'reporte juicios por ficha': lambda: list(generador.filas_juicios(ficha='100')),
+            'reporte circular120': lambda: [list(q) for q in generador.consultas_circular120()],
+            'reporte circular120 por centro': lambda: [list(q) for q in generador.consultas_circular120(centro=self.centro)],
+            'fichas con casos abiertos': lambda: list(fichas_con_casos_abiertos()),
+        }
+
+    def test_sin_recorridos_completos(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('EXPLAIN solo se interpreta en SQLite y PostgreSQL')
+
+        for nombre, funcion in self.consultas_frecuentes().items():
+            cache.clear()
+            consultas = consultas_ejecutadas(funcion)
+            self.assertTrue(consultas, nombre)
+            for sql, params in consultas:
+                if 'aprendices_' not in sql:
+                    continue  # sesión y usuario
+                with self.subTest(consulta=nombre, sql=sql[:120]):
+                    self.assertEqual(recorridos_completos(sql, params), [])
+
+
+def sembrar_datos(escala):
+    """
+    Datos de prueba proporcionales a escala: 2·escala fichas de 8·escala
+    aprendices (todos los estados y niveles de urgencia), cada uno con escala + 1 inasistencias y un juicio por cada uno
+    de los 2·escala resultados de aprendizaje. Los objetos que usan las URLs
+    (centro 9111, ficha 100, aprendiz 1000, trabajo "trabajo-prueba") existen
+    en todas las escalas y crecen con ella.
+    """
+    hoy = timezone.localdate()
+    # (estado, días desde el fin de la productiva): en formación reciente, moderado y crítico,
+    # productiva vencida, por certificar y cerrados
+    perfiles = [
+        ('EN_FORMACION', -10), ('EN_FORMACION', 20), ('ETAPA_PRODUCTIVA', 45), ('EN_FORMACION', 90),
+        ('POR_CERTIFICAR', -10), ('CERTIFICADO', 20), ('EN_FORMACION', 45), ('CANCELADO', 90),
+    ]
+
+    # El de PruebaBase, si la prueba lo tiene
+    centro, _ = CentroFormacion.objects.get_or_create(
+        codigo='9111', defaults={'nombre': 'Centro Prueba', 'municipio': 'Tunja'}
+    )
+    competencias = Competencia.objects.bulk_create([
+        Competencia(codigo=f'C{i}', nombre=f'Competencia {i}') for i in range(2)
+    ])
+    resultados = ResultadoAprendizaje.objects.bulk_create([
+        ResultadoAprendizaje(codigo=f'R{i}', nombre=f'Resultado {i}', competencia=competencias[i % 2])
+        for i in range(2 * escala)
+    ])
+    fichas = Ficha.objects.bulk_create([
+        Ficha(
+            numero=str(100 + i), programa=f'Programa {i}', instructor=f'Instructor {i}', centro=centro,
+            fecha_inicio=hoy - timedelta(days=400), fecha_fin=hoy + timedelta(days=(-45 if i % 2 else 90)),
+        )
+        for i in range(2 * escala)
+    ])
+
+    aprendices = []
+    for ficha in fichas:
+        for j in range(8 * escala):
+            estado, dias = perfiles[j % len(perfiles)]
+            aprendiz = Aprendiz(
+                documento=str(1000 + len(aprendices)), nombre=f'Nombre{j}', apellido=f'Apellido{j}', ficha=ficha,
+                estado_formacion=estado, fecha_fin_productiva=hoy - timedelta(days=dias),
+            )
+            aprendiz.actualizar_busqueda()
+            aprendices.append(aprendiz)
+    Aprendiz.objects.bulk_create(aprendices)
+
+    Inasistencia.objects.bulk_create([
+        Inasistencia(aprendiz=a, ficha=a.ficha, fecha=hoy - timedelta(days=d), justificada=d % 2 == 0)
+        for a in aprendices for d in range(escala + 1)
+    ])
+    AprendizResultado.objects.bulk_create([
+        AprendizResultado(aprendiz=a, resultado=r, fecha=hoy, estado=['PENDIENTE', 'APROBADO'][i % 2])
+        for a in aprendices for i, r in enumerate(resultados)
+    ])
+    ReporteGenerado.objects.bulk_create([
+        ReporteGenerado(job_id='trabajo-prueba', tipo='inasistencias', centro=centro, ficha=fichas[i % len(fichas)])
+        for i in range(2 * escala)
+    ])
+    RolAdministrativo.objects.bulk_create([
+        RolAdministrativo(
+            usuario=User.objects.create_user(f'coordinador{i}'), tipo_rol='COORDINADOR_ACADEMICO',
+            centro=centro, fecha_inicio=hoy,
+        )
+        for i in range(escala)
+    ])
+
+    # bulk_create no dispara señales: contadores y resúmenes se calculan al final
+    reparar_contadores()
+    reconstruir_resumenes()
+
+
+# Peticiones por nombre de URL (aprendices/urls.py): (kwargs de la URL, parámetros GET o datos POST)
+PETICIONES = {
+    'dashboard': ({}, {}),
+    'aprendiz_list': ({}, {}),
+    'aprendiz_create': ({}, {}),
+    'aprendiz_update': ({'pk': '1000'}, {}),
+    'aprendiz_detail': ({'pk': '1000'}, {}),
+    'inasistencia_list': ({}, {}),
+    'inasistencia_create': ({}, {}),
+    'import_inasistencias': ({}, {}),
+    'acta_create': ({}, {}),
+    'upload_file': ({}, {}),
+    'import_excel': ({}, {}),
+    'ficha_list': ({}, {}),
+    'ficha_create': ({}, {}),
+    'ficha_update': ({'pk': '100'}, {}),
+    'ficha_detail': ({'pk': '100'}, {}),
+    'ficha_upload_data': ({'numero_ficha': '100'}, {}),
+    'casos_por_certificar': ({}, {}),
+    'casos_vencidos': ({}, {}),
+    'reporte_circular120': ({}, {}),
+    'aprobar_certificacion': ({'documento': '1002'}, {}),
+    'cancelar_aprendiz': ({'documento': '1003'}, {}),
+    'certificar_lote': ({}, {'ficha': '101'}),
+    'cancelar_lote': ({}, {'documentos': ['1004', '1005', '1006']}),
+    'reporte_inasistencias_excel': ({}, {'ficha': '100'}),
+    'reporte_juicios_excel': ({}, {'format': 'csv'}),
+    'reporte_circular120_excel': ({}, {'centro': '9111'}),
+    'estado_reportes': ({'job_id': 'trabajo-prueba'}, {}),
+    'api_aprendices': ({}, {}),
+    'autocompletar_aprendices': ({}, {'q': 'nombre'}),
+    'autocompletar_fichas': ({}, {'q': '1'}),
+    'api_metricas_cache': ({}, {}),
+}
+
+# Las que cambian datos solo aceptan POST
+PETICIONES_POST = {'aprobar_certificacion', 'cancelar_aprendiz', 'certificar_lote', 'cancelar_lote'}
+
+# Vistas de api_views sin ruta: se llaman directamente
+VISTAS_API = {
+    'api_views.fichas_json': (api_views.fichas_json, {}),
+    'api_views.centros_json': (api_views.centros_json, {}),
+    'api_views.roles_json': (api_views.roles_json, {'centro': '9111'}),
+}
+
+# URLs que no se pueden medir dentro de la transacción de una prueba
+EXCLUIDAS = {
+    # Genera tres libros por ficha del centro: sus consultas crecen con las fichas (ver PaqueteReportesTest)
+    'paquete_reportes',
+    # Encola tareas de Celery (necesita el broker)
+    'generar_todos_reportes',
+}
+
+# Máximo de consultas por vista (con el cache de vistas vacío). Si una
+# vista necesita más, subir su presupuesto de forma explícita en el cambio.
+# Las páginas cuentan 2 de sesión + usuario; las de api_views sin ruta, no
+PRESUPUESTO_CONSULTAS = {
+    'dashboard': 4,
+    'aprendiz_list': 4,
+    'aprendiz_create': 2,
+    'aprendiz_update': 4,
+    'aprendiz_detail': 6,
+    'inasistencia_list': 4,
+    'inasistencia_create': 2,
+    'import_inasistencias': 2,
+    'acta_create': 4,
+    'upload_file': 2,
+    'import_excel': 2,
+    'ficha_list': 5,
+    'ficha_create': 2,
+    'ficha_update': 3,
+    'ficha_detail': 5,
+    'ficha_upload_data': 4,
+    'casos_por_certificar': 4,
+    'casos_vencidos': 6,
+    'reporte_circular120': 6,
+    # Sesión + usuario, savepoint, SELECT, UPDATE, INSERT del historial, liberar savepoint
+    # (+1 de get_object_or_404 en los individuales); sin importar cuántos aprendices cambien
+    'aprobar_certificacion': 8,
+    'cancelar_aprendiz': 8,
+    'certificar_lote': 7,
+    'cancelar_lote': 7,
+    'reporte_inasistencias_excel': 8,
+    'reporte_juicios_excel': 3,
+    'reporte_circular120_excel': 9,
+    'estado_reportes': 3,
+    'api_aprendices': 4,
+    'autocompletar_aprendices': 3,
+    'autocompletar_fichas': 3,
+    'api_metricas_cache': 2,
+    'api_views.fichas_json': 2,
+    'api_views.centros_json': 2,
+    'api_views.roles_json': 2,
+}
+
+
+class ConsultasPorVistaTest(TestCase):
+    """
+    Cada URL de la aplicación se pide con datos de dos tamaños: el número de
+    consultas no puede crecer con los datos (N+1) ni pasar del presupuesto.
+    """
+    ESCALAS = (1, 4)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+
+    def test_todas_las_urls_cubiertas(self):
+        nombres = {patron.name for patron in urls.urlpatterns}
+        self.assertEqual(nombres - set(PETICIONES) - EXCLUIDAS, set(), 'URLs sin petición en PETICIONES')
+        self.assertEqual(set(PETICIONES) | set(VISTAS_API), set(PRESUPUESTO_CONSULTAS), 'Vistas sin presupuesto')
+
+    def medir(self):
+        """Consultas de cada petición sobre los datos actuales, con el cache de vistas vacío"""
+        fabrica = RequestFactory()
+        peticiones = {
+            nombre: (lambda kwargs=kwargs, params=params, nombre=nombre: (
+                self.client.post if nombre in PETICIONES_POST else self.client.get
+            )(reverse(nombre, kwargs=kwargs), params))
+            for nombre, (kwargs, params) in PETICIONES.items()
+        }
+        for nombre, (vista, params) in VISTAS_API.items():
+            def llamar(vista=vista, params=params):
+                request = fabrica.get('/', params)
+                request.user = self.usuario
+                return vista(request)
+            peticiones[nombre] = llamar
+
+        conteos = {}
+        for nombre, peticion in peticiones.items():
+            cache.clear()
+            with CaptureQueriesContext(connection) as consultas:
+                response = peticion()
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            self.assertLess(response.status_code, 400, nombre)
+            conteos[nombre] = len(consultas)
+        return conteos
+
+    def test_consultas_no_crecen_con_los_datos(self):
+        self.client.force_login(self.usuario)
+        conteos = {}
+        for escala in self.ESCALAS:
+            with transaction.atomic(), override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=self.media)):
+                sembrar_datos(escala)
+                conteos[escala] = self.medir()
+                transaction.set_rollback(True)
+
+        pequena, grande = (conteos[escala] for escala in self.ESCALAS)
+        for nombre in pequena:
+            with self.subTest(vista=nombre):
+                self.assertEqual(grande[nombre], pequena[nombre], 'las consultas crecen con los datos (N+1)')
+                self.assertLessEqual(grande[nombre], PRESUPUESTO_CONSULTAS.get(nombre, 0), 'presupuesto excedido')
+
+
+class PerfilPeticionesTest(PruebaBase):
+    """Middleware de perfilado: registro por muestreo y umbral, y página de peores endpoints"""
+    superusuario = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        ficha = Ficha.objects.create(numero='100', programa='ADSO')
+        Aprendiz.objects.create(documento='1', nombre='Ana', apellido='Ruiz', ficha=ficha)
+        reconstruir_resumenes()
+
+    def test_desactivado(self):
+        self.client.get(reverse('dashboard'))
+        self.assertFalse(PerfilPeticion.objects.exists())
+
+    @override_settings(PERFIL_PETICIONES=True, PERFIL_MUESTREO=1.0, PERFIL_CONSULTAS_LENTAS=2)
+    def test_peticion_muestreada(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('dashboard'))
+
+        perfil = PerfilPeticion.objects.get()
+        self.assertEqual(perfil.vista, 'dashboard')
+        self.assertEqual(perfil.estado_http, 200)
+        self.assertEqual(perfil.usuario, self.usuario)
+        self.assertTrue(perfil.muestreada)
+        # Todas las de la petición menos el INSERT del propio perfil
+        self.assertEqual(perfil.consultas, len(consultas) - 1)
+        self.assertGreater(perfil.tiempo_plantillas_ms, 0)
+        self.assertGreaterEqual(perfil.tiempo_total_ms, perfil.tiempo_plantillas_ms)
+        self.assertEqual(len(perfil.consultas_lentas), 2)
+        self.assertGreaterEqual(perfil.consultas_lentas[0]['ms'], perfil.consultas_lentas[1]['ms'])
+        self.assertTrue(all(c['origen'].startswith('aprendices/') for c in perfil.consultas_lentas))
+
+    @override_settings(PERFIL_PETICIONES=True, PERFIL_MUESTREO=0, PERFIL_UMBRAL_MS=0, PERFIL_EXCLUIR_RUTAS=['/admin/'])
+    def test_umbral_y_exclusiones(self):
+        self.client.get(reverse('ficha_list'))
+        self.client.get(reverse('admin:index'))
+
+        perfil = PerfilPeticion.objects.get()
+        self.assertEqual(perfil.vista, 'ficha_list')
+        self.assertFalse(perfil.muestreada)
+        self.assertIsNone(perfil.consultas)
+        self.assertEqual(perfil.consultas_lentas, [])
+
+    @override_settings(PERFIL_PETICIONES=True, PERFIL_MUESTREO=0, PERFIL_UMBRAL_MS=None)
+    def test_sin_muestreo_ni_umbral(self):
+        self.client.get(reverse('dashboard'))
+        self.assertFalse(PerfilPeticion.objects.exists())
+
+    def test_peores_endpoints_y_retencion(self):
+        for vista, tiempos in (('dashboard', [100, 120]), ('casos_vencidos', [900]), ('ficha_list', [50, 60, 70])):
+            for tiempo in tiempos:
+                PerfilPeticion.objects.create(
+                    vista=vista, ruta='/', metodo='GET', estado_http=200, tiempo_total_ms=tiempo, consultas=5
+                )
+        antiguo = PerfilPeticion.objects.create(vista='reporte_circular120', ruta='/', metodo='GET', estado_http=200, tiempo_total_ms=5000)
+        PerfilPeticion.objects.filter(pk=antiguo.pk).update(created_at=timezone.now() - timedelta(days=40))
+
+        url = reverse('admin:aprendices_perfilpeticion_peores')
+        endpoints = self.client.get(url).context['endpoints']
+        self.assertEqual([e['vista'] for e in endpoints], ['casos_vencidos', 'dashboard', 'ficha_list'])
+        endpoints = self.client.get(url, {'orden': 'total', 'periodo': '30'}).context['endpoints']
+        self.assertEqual(endpoints[0]['tiempo_acumulado'], 900)
+        response = self.client.get(url, {'orden': 'promedio'})
+        self.assertEqual(response.context['tendencia']['dashboard'][0]['peticiones'], 2)
+        self.assertContains(response, 'casos_vencidos')
+
+        self.assertEqual(aplicar_retencion_perfiles(dias=30), 1)
+        self.assertEqual(PerfilPeticion.objects.count(), 6)
+
+
+class CambioEstadoLoteTest(PruebaBase):
+    """Certificación y cancelación en lote: un UPDATE, historial y resúmenes por lote"""
+    superusuario = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        ficha = Ficha.objects.create(numero='100')
+        otra = Ficha.objects.create(numero='101')
+        for documento, estado, ficha_aprendiz in (
+            ('1', 'POR_CERTIFICAR', ficha), ('2', 'POR_CERTIFICAR', ficha), ('3', 'POR_CERTIFICAR', ficha),
+            ('4', 'EN_FORMACION', ficha), ('5', 'POR_CERTIFICAR', otra), ('6', 'CANCELADO', otra),
+            ('7', 'CERTIFICADO', otra),
+        ):
+            Aprendiz.objects.create(
+                documento=documento, nombre='Nombre', apellido='Apellido', ficha=ficha_aprendiz, estado_formacion=estado
+            )
+        reconstruir_resumenes()
+
+    def estados(self):
+        return dict(Aprendiz.objects.values_list('documento', 'estado_formacion'))
+
+    def test_certificar_ficha(self):
+        antes = Aprendiz.objects.get(documento='1').updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('certificar_lote'), {'ficha': '100'})
+        self.assertRedirects(response, reverse('casos_por_certificar'))
+
+        estados = self.estados()
+        self.assertEqual([estados[d] for d in '1234'], ['CERTIFICADO'] * 3 + ['EN_FORMACION'])
+        self.assertEqual(estados['5'], 'POR_CERTIFICAR')
+        self.assertGreater(Aprendiz.objects.get(documento='1').updated_at, antes)
+
+        cambios = CambioEstadoAprendiz.objects.all()
+        self.assertEqual(len(cambios), 3)
+        self.assertEqual({(c.usuario_id, c.estado_anterior, c.origen) for c in cambios}, {(self.usuario.pk, 'POR_CERTIFICAR', 'WEB')})
+        self.assertEqual(len({c.lote for c in cambios}), 1)
+
+        self.assertEqual(obtener_resumen(clave_ficha('100')).por_estado, {'CERTIFICADO': 3, 'EN_FORMACION': 1})
+        self.assertEqual(obtener_resumen().total_estado('POR_CERTIFICAR'), 1)
+
+    def test_seleccion(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('certificar_lote'), {'documentos': ['4', '5', '6']})
+            self.client.post(reverse('cancelar_lote'), {'documentos': ['1', '7']})
+
+        estados = self.estados()
+        # Los cerrados (cancelado, certificado) no cambian por lote
+        self.assertEqual(
+            [estados[d] for d in '14567'], ['CANCELADO', 'CERTIFICADO', 'CERTIFICADO', 'CANCELADO', 'CERTIFICADO']
+        )
+        self.assertEqual(CambioEstadoAprendiz.objects.count(), 3)
+        self.assertEqual(obtener_resumen().total_estado('CANCELADO'), 2)
+
+    def test_individuales_solo_post(self):
+        url = reverse('aprobar_certificacion', args=['1'])
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.client.post(url)
+        self.client.post(reverse('cancelar_aprendiz', args=['4']))
+        self.assertEqual([self.estados()[d] for d in '14'], ['CERTIFICADO', 'CANCELADO'])
+        self.assertEqual(CambioEstadoAprendiz.objects.count(), 2)
+
+    def test_accion_admin(self):
+        url = reverse('admin:aprendices_aprendiz_changelist')
+        response = self.client.post(url, {
+            'action': 'certificar_seleccionados', '_selected_action': ['1', '2', '6', '7'],
+        }, follow=True)
+        # El cancelado no se certifica (ni el certificado se toca)
+        self.assertEqual([self.estados()[d] for d in '1267'], ['CERTIFICADO', 'CERTIFICADO', 'CANCELADO', 'CERTIFICADO'])
+        self.assertEqual(set(CambioEstadoAprendiz.objects.values_list('aprendiz_id', 'origen')), {('1', 'ADMIN'), ('2', 'ADMIN')})
+        self.assertEqual(
+            [str(m) for m in response.context['messages']],
+            ['2 aprendices marcados como CERTIFICADO', '1 omitidos por estar certificados o cancelados'],
+        )
+
+        # Tampoco se cancela un certificado
+        self.client.post(url, {'action': 'cancelar_seleccionados', '_selected_action': ['3', '7']})
+        self.assertEqual([self.estados()[d] for d in '37'], ['CANCELADO', 'CERTIFICADO'])
+        self.assertEqual(CambioEstadoAprendiz.objects.filter(aprendiz_id='7').count(), 0)
+
+    def test_una_sola_actualizacion(self):
+        with CaptureQueriesContext(connection) as consultas:
+            total = cambiar_estado_aprendices(Aprendiz.objects.filter(ficha_id='100'), 'CANCELADO', self.usuario)
+        self.assertEqual(total, 4)
+        sentencias = [c['sql'].split()[0] for c in consultas]
+        self.assertEqual(sentencias.count('UPDATE'), 1)
+        self.assertEqual(sentencias.count('INSERT'), 1)
+
+
+class AdminTablasGrandesTest(PruebaBase):
+    """Changelists del admin: consultas constantes, búsqueda indexada y conteo acotado"""
+    superusuario = True
+    CHANGELISTS = ['aprendiz', 'inasistencia', 'aprendizresultado', 'ficha', 'actacomite', 'roladministrativo']
+
+    def contar_consultas(self):
+        conteos = {}
+        for modelo in self.CHANGELISTS:
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(reverse(f'admin:aprendices_{modelo}_changelist'))
+            self.assertEqual(response.status_code, 200, modelo)
+            conteos[modelo] = len(consultas)
+        return conteos
+
+    def test_consultas_no_crecen_con_los_datos(self):
+        conteos = {}
+        for escala in (1, 3):
+            with transaction.atomic():
+                sembrar_datos(escala)
+                conteos[escala] = self.contar_consultas()
+                transaction.set_rollback(True)
+        self.assertEqual(conteos[3], conteos[1])
+
+    def test_busqueda_indexada(self):
+        sembrar_datos(1)
+        Aprendiz.objects.filter(documento='1000').update(nombre='Iván', apellido='Núñez')
+        Aprendiz.objects.get(documento='1000').save()
+
+        url = reverse('admin:aprendices_aprendiz_changelist')
+        self.assertEqual([a.pk for a in self.client.get(url, {'q': 'ivan nunez'}).context['cl'].result_list], ['1000'])
+        # Número de ficha
+        por_ficha = self.client.get(url, {'q': '101'}).context['cl'].result_list
+        self.assertEqual({a.ficha_id for a in por_ficha}, {'101'})
+
+        url = reverse('admin:aprendices_inasistencia_changelist')
+        self.assertEqual({i.aprendiz_id for i in self.client.get(url, {'q': 'Nuñez'}).context['cl'].result_list}, {'1000'})
+        url = reverse('admin:aprendices_aprendizresultado_changelist')
+        juicios = self.client.get(url, {'q': 'R1'}).context['cl'].result_list
+        self.assertEqual({j.resultado.codigo for j in juicios}, {'R1'})
+
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'aprendices', 'model_name': 'inasistencia', 'field_name': 'aprendiz', 'term': 'nunez',
+        })
+        self.assertEqual([r['id'] for r in response.json()['results']], ['1000'])
+
+    def test_formularios_con_autocompletar(self):
+        sembrar_datos(1)
+        inasistencia = Inasistencia.objects.first()
+        response = self.client.get(reverse('admin:aprendices_inasistencia_change', args=[inasistencia.pk]))
+        # Solo la opción seleccionada, no un <option> por aprendiz
+        self.assertContains(response, 'admin-autocomplete')
+        select = re.search(r'<select name="aprendiz".*?</select>', response.content.decode(), re.S).group()
+        self.assertEqual(select.count('<option'), 1)
+
+    def test_conteo_estimado(self):
+        sembrar_datos(1)
+        self.assertEqual(PaginadorEstimado(Aprendiz.objects.all(), 10).count, Aprendiz.objects.count())
+        paginador = PaginadorEstimado(Aprendiz.objects.filter(estado_formacion='POR_CERTIFICAR'), 10)
+        paginador.conteo_maximo = 1
+        self.assertEqual(paginador.count, 1)
@@ -2,12 +2,12 @@
 from django.urls import path
 from .views_import import import_excel
 from .views_import import import_excel, import_inasistencias
-from . import views
+from . import api_views, views
 from .views import (
     DashboardView, AprendizListView, AprendizCreateView, AprendizUpdateView, AprendizDetailView,
     InasistenciaCreateView, InasistenciaListView, ActaCreateView,
     casos_por_certificar, casos_vencidos, reporte_circular120,
-    aprobar_certificacion, cancelar_aprendiz
+    aprobar_certificacion, cancelar_aprendiz, certificar_lote, cancelar_lote
 )
 
 # Importar las nuevas vistas de fichas
@@ -53,10 +53,20 @@ urlpatterns = [
     # Acciones
     path('aprobar/<str:documento>/', aprobar_certificacion, name='aprobar_certificacion'),
     path('cancelar/<str:documento>/', cancelar_aprendiz, name='cancelar_aprendiz'),
+    path('certificar-lote/', certificar_lote, name='certificar_lote'),
+    path('cancelar-lote/', cancelar_lote, name='cancelar_lote'),
     
     # Reportes
     path('reportes/inasistencias/', views.descargar_reporte_inasistencias, name='reporte_inasistencias_excel'),
     path('reportes/juicios/', views.descargar_reporte_juicios, name='reporte_juicios_excel'),
     path('reportes/circular120/', views.descargar_reporte_circular120, name='reporte_circular120_excel'),
+    path('reportes/paquete/<str:codigo_centro>/', views.descargar_paquete_reportes, name='paquete_reportes'),
     path('reportes/generar-todos/', views.generar_todos_reportes_view, name='generar_todos_reportes'),
+    path('reportes/trabajos/<str:job_id>/', views.estado_reportes_json, name='estado_reportes'),
+
+    # API JSON
+    path('api/aprendices/', api_views.aprendices_json, name='api_aprendices'),
+    path('api/autocompletar/aprendices/', api_views.autocompletar_aprendices, name='autocompletar_aprendices'),
+    path('api/autocompletar/fichas/', api_views.autocompletar_fichas, name='autocompletar_fichas'),
+    path('api/cache/metricas/', api_views.metricas_cache_json, name='api_metricas_cache'),
 ]
\ No newline at end of file
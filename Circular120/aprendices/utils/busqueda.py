@@ -0,0 +1,122 @@
+import re
+import unicodedata
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.utils import DatabaseError
+
+
+TABLA_FTS = 'aprendices_aprendiz_fts'
+
+# Índice FTS5 (SQLite) con contenido externo: el texto vive en la columna
+# Aprendiz.busqueda y los triggers lo mantienen al día con cualquier
+# escritura, incluidos bulk_create y queryset.update()
+_SQL_SQLITE = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(
+        busqueda, content='aprendices_aprendiz', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON aprendices_aprendiz BEGIN
+        INSERT INTO {TABLA_FTS}(rowid, busqueda) VALUES (new.rowid, new.busqueda);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON aprendices_aprendiz BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, busqueda) VALUES ('delete', old.rowid, old.busqueda);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au AFTER UPDATE OF busqueda ON aprendices_aprendiz BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, busqueda) VALUES ('delete', old.rowid, old.busqueda);
+        INSERT INTO {TABLA_FTS}(rowid, busqueda) VALUES (new.rowid, new.busqueda);
+    END""",
+]
+_TRIGGERS_SQLITE = {f'{TABLA_FTS}_ai', f'{TABLA_FTS}_ad', f'{TABLA_FTS}_au'}
+
+# PostgreSQL: índice de trigramas para que busqueda LIKE '%...%' no recorra la tabla
+_SQL_POSTGRESQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS aprendiz_busqueda_trgm ON aprendices_aprendiz USING gin (busqueda gin_trgm_ops)',
+]
+
+_fts_disponible = {}
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes ni diéresis (Núñez -> nunez) y espacios simples"""
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+def instalar_indice_busqueda(using='default', reconstruir=False):
+    """
+    Crea el índice de búsqueda del motor (FTS5 en SQLite, trigramas en
+    PostgreSQL) si falta. En SQLite, si los triggers no estaban (tabla recién
+    creada o reconstruida por una migración), reindexa desde cero.
+
+    Retorna: True si el motor tiene índice de búsqueda
+    """
+    connection = connections[using]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s", [f'{TABLA_FTS}%'])
+                faltan = _TRIGGERS_SQLITE - {fila[0] for fila in cursor.fetchall()}
+                for sql in _SQL_SQLITE:
+                    cursor.execute(sql)
+                if faltan or reconstruir:
+                    cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')")
+            elif connection.vendor == 'postgresql':
+                for sql in _SQL_POSTGRESQL:
+                    cursor.execute(sql)
+            else:
+                return False
+    except DatabaseError:
+        # SQLite sin FTS5 o sin permisos para la extensión: se usa la búsqueda por LIKE
+        _fts_disponible[using] = False
+        return False
+    _fts_disponible[using] = connection.vendor == 'sqlite'
+    return True
+
+
+def _usar_fts(using):
+    if using not in _fts_disponible:
+        connection = connections[using]
+        if connection.vendor != 'sqlite':
+            _fts_disponible[using] = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLA_FTS])
+                _fts_disponible[using] = cursor.fetchone() is not None
+    return _fts_disponible[using]
+
+
+def buscar_aprendices(queryset, texto):
+    """
+    Filtra aprendices cuyo nombre, apellido o documento contengan todas las
+    palabras de texto, sin distinguir tildes ni mayúsculas.
+
+    En SQLite cada palabra es un prefijo en el índice FTS5 ("nu" encuentra
+    a Núñez); en los demás motores, una subcadena de Aprendiz.busqueda.
+    """
+    terminos = re.findall(r'\w+', normalizar(texto))
+    if not terminos:
+        return queryset
+
+    using = queryset.db or router.db_for_read(queryset.model)
+    if _usar_fts(using):
+        consulta = ' '.join(f'"{termino}"*' for termino in terminos)
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT documento FROM aprendices_aprendiz WHERE rowid IN '
+            f'(SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s)',
+            [consulta],
+        ))
+    for termino in terminos:
+        queryset = queryset.filter(busqueda__contains=termino)
+    return queryset
+
+
+def filtro_prefijo(campo, texto):
+    """
+    campo empieza por texto, como rango (>= texto y < texto + U+10FFFF) para
+    que use el índice del campo: startswith en SQLite es un LIKE que no lo usa.
+    """
+    return Q(**{f'{campo}__gte': texto, f'{campo}__lt': texto + '\U0010ffff'})
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from aprendices.models import ReporteGenerado, VersionDatos
+
+
+# Límites por defecto (se pueden sobrescribir en settings)
+MAX_BYTES_DEFECTO = 200 * 1024 * 1024   # 200 MB
+MAX_EDAD_DEFECTO = 7 * 24 * 3600        # 7 días
+
+
+def directorio_cache():
+    """Directorio donde se guardan los reportes cacheados"""
+    ruta = os.path.join(settings.MEDIA_ROOT, 'reportes', 'cache')
+    os.makedirs(ruta, exist_ok=True)
+    return ruta
+
+
+def version_datos():
+    """
+    Versión de los datos de los que dependen los reportes: el contador de
+    VersionDatos, que se incrementa con cada cambio confirmado de Aprendiz,
+    Ficha, Inasistencia o AprendizResultado (señales y lotes de importación),
+    incluidas las ediciones que no cambian fechas de creación ni totales.
+    Está en la base y no en el cache, así que el proceso web ve los cambios
+    hechos por los workers de Celery (y los reportes que precalculan).
+    """
+    version = VersionDatos.objects.filter(pk=1).values_list('version', flat=True).first()
+    return str(version or 0)
+
+
+def incrementar_version_datos():
+    """Incrementa la versión de los datos (un UPDATE atómico)"""
+    if VersionDatos.objects.filter(pk=1).update(version=F('version') + 1, updated_at=timezone.now()):
+        return
+    _, creada = VersionDatos.objects.get_or_create(pk=1, defaults={'version': 1})
+    if not creada:
+        # Otro proceso creó la fila a la vez: también hay que contar este cambio
+        VersionDatos.objects.filter(pk=1).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def clave_reporte(tipo, version, **params):
+    """Construye la clave del reporte a partir del tipo, parámetros y versión de datos"""
+    params_str = '&'.join(f'{k}={params[k] or ""}' for k in sorted(params))
+    # El reporte depende del día (días vencidos, fecha del reporte)
+    base = f'{tipo}?{params_str}#{version}@{timezone.localdate().isoformat()}'
+    return f'{tipo}_{hashlib.sha1(base.encode("utf-8")).hexdigest()[:20]}'
+
+
+def snapshot_vigente(tipo, version, ficha=None, centro=None):
+    """
+    Último reporte precalculado (ReporteGenerado) de hoy para el mismo ámbito
+    cuyos datos no han cambiado desde que se generó.
+    """
+    reportes = ReporteGenerado.objects.filter(
+        tipo=tipo,
+        estado='LISTO',
+        version=version,
+        created_at__date=timezone.localdate(),
+    )
+    if ficha:
+        reportes = reportes.filter(ficha_id=ficha)
+    else:
+        reportes = reportes.filter(ficha__isnull=True)
+    if centro:
+        reportes = reportes.filter(centro__codigo=centro)
+    else:
+        reportes = reportes.filter(centro__isnull=True)
+    return reportes.order_by('-created_at').first()
+
+
+def obtener_reporte(tipo, generar, extension='.xlsx', **params):
+    """
+    Devuelve la ruta del reporte en disco: el precalculado vigente si existe,
+    o el cacheado, generándolo solo si los datos cambiaron desde la última vez.
+
+    generar: función que recibe el archivo destino abierto y escribe en él el Excel
+    (o el archivo del tipo indicado por extension)
+    """
+    version = version_datos()
+
+    # Los precalculados no tienen filtro de fechas y solo existen para los tipos de ReporteGenerado
+    precalculable = tipo in dict(ReporteGenerado.TIPO_CHOICES)
+    if precalculable and not params.get('fecha_desde') and not params.get('fecha_hasta'):
+        snapshot = snapshot_vigente(tipo, version, ficha=params.get('ficha'), centro=params.get('centro'))
+        if snapshot and os.path.exists(snapshot.archivo.path):
+            return snapshot.archivo.path
+
+    ruta = os.path.join(directorio_cache(), clave_reporte(tipo, version, **params) + extension)
+
+    if os.path.exists(ruta):
+        # Marcar como usado recientemente para la evicción
+        os.utime(ruta, None)
+        return ruta
+
+    # El reporte se escribe directamente en su archivo final (vía un
+    # temporal en el mismo directorio), sin copias intermedias en memoria
+    tmp_path = f'{ruta}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'w+b') as destino:
+            generar(destino)
+        os.replace(tmp_path, ruta)
+    finally:
+        _eliminar(tmp_path)
+
+    limpiar_cache_reportes(conservar=ruta)
+    return ruta
+
+
+def limpiar_cache_reportes(max_bytes=None, max_edad=None, conservar=None):
+    """
+    Elimina reportes cacheados más viejos que max_edad (segundos) y luego
+    los menos usados hasta que el total quede por debajo de max_bytes.
+    `conservar` (el archivo que se va a devolver) nunca se elimina.
+
+    Retorna: número de archivos eliminados
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'REPORTES_CACHE_MAX_BYTES', MAX_BYTES_DEFECTO)
+    if max_edad is None:
+        max_edad = getattr(settings, 'REPORTES_CACHE_MAX_EDAD', MAX_EDAD_DEFECTO)
+
+    ahora = time.time()
+    archivos = []
+    for nombre in os.listdir(directorio_cache()):
+        ruta = os.path.join(directorio_cache(), nombre)
+        try:
+            st = os.stat(ruta)
+        except FileNotFoundError:
+            continue
+        archivos.append((st.st_mtime, st.st_size, ruta))
+
+    eliminados = 0
+    vigentes = []
+    for mtime, tamano, ruta in archivos:
+        if ahora - mtime > max_edad and ruta != conservar:
+            eliminados += _eliminar(ruta)
+        else:
+            vigentes.append((mtime, tamano, ruta))
+
+    # Evicción por tamaño: primero los usados hace más tiempo
+    total = sum(tamano for _, tamano, _ in vigentes)
+    for mtime, tamano, ruta in sorted(vigentes):
+        if total <= max_bytes:
+            break
+        if ruta == conservar:
+            continue
+        eliminados += _eliminar(ruta)
+        total -= tamano
+
+    return eliminados
+
+
+def _eliminar(ruta):
+    try:
+        os.remove(ruta)
+        return 1
+    except FileNotFoundError:
+        return 0
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+
+
+# Todas las claves incluyen la versión de los datos: al cambiar Aprendiz,
+# Ficha, Inasistencia o AprendizResultado se incrementa y las entradas
+# anteriores dejan de leerse (expiran solas). Funciona igual con locmem,
+# archivo o Redis: solo usa get/set/add/incr del backend configurado.
+CLAVE_VERSION = 'vistas:version'
+TIEMPO_POR_DEFECTO = 15 * 60
+
+# Vistas/fragmentos que han usado el cache en este proceso (para metricas_cache)
+_nombres = set()
+
+
+def _tiempo():
+    return getattr(settings, 'CACHE_VISTAS_TIEMPO', TIEMPO_POR_DEFECTO)
+
+
+def version_datos():
+    """Versión vigente de los datos; se inicializa con la hora para no reutilizar versiones viejas"""
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, int(time.time() * 1000), None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def invalidar_vistas():
+    """Invalida todo lo cacheado por las vistas (incremento atómico de la versión)"""
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        # Sin versión en el cache (expulsada o recién iniciado): la siguiente lectura crea una nueva
+        cache.add(CLAVE_VERSION, int(time.time() * 1000), None)
+
+
+def alcance(usuario):
+    """Ámbito de usuario de una entrada: lo que ve un administrador puede diferir de lo que ve el resto"""
+    if usuario is None or not usuario.is_authenticated:
+        return 'anonimo'
+    return 'staff' if usuario.is_staff else 'usuario'
+
+
+def clave_vista(nombre, *partes, usuario=None, por_usuario=False):
+    ambito = f'u{usuario.pk}' if por_usuario and usuario is not None else alcance(usuario)
+    # La fecha entra en la clave: los casos vencidos cambian con el día aunque no cambien los datos
+    resumen = hashlib.md5(json.dumps(partes, default=str, sort_keys=True).encode()).hexdigest()
+    return f'vistas:{nombre}:{version_datos()}:{timezone.localdate().isoformat()}:{ambito}:{resumen}'
+
+
+def parametros(request, excluir=()):
+    """Parámetros GET de la petición, en orden estable, para usarlos como parte de la clave"""
+    return sorted((clave, valores) for clave, valores in request.GET.lists() if clave not in excluir)
+
+
+def en_cache(nombre, calcular, *partes, usuario=None, por_usuario=False, timeout=None):
+    """
+    Retorna el valor cacheado para (nombre, partes, ámbito del usuario) o lo
+    calcula con calcular() y lo guarda. El valor debe poder serializarse con
+    pickle: listas y diccionarios, no querysets sin evaluar.
+    """
+    clave = clave_vista(nombre, *partes, usuario=usuario, por_usuario=por_usuario)
+    valor = _leer(nombre, clave)
+    if valor is None:
+        valor = calcular()
+        cache.set(clave, valor, _tiempo() if timeout is None else timeout)
+    return valor
+
+
+def respuesta_en_cache(nombre, request, generar, *partes, por_usuario=False):
+    """
+    Cachea el contenido de la respuesta de generar() según los parámetros GET
+    de la petición; solo las respuestas 200. Pensado para JSON y fragmentos
+    HTML sin token CSRF ni datos de la sesión.
+    """
+    clave = clave_vista(nombre, parametros(request), *partes, usuario=request.user, por_usuario=por_usuario)
+    guardada = _leer(nombre, clave)
+    if guardada is not None:
+        contenido, content_type = guardada
+        return HttpResponse(contenido, content_type=content_type)
+    respuesta = generar()
+    if respuesta.status_code == 200 and not respuesta.streaming:
+        cache.set(clave, (respuesta.content, respuesta['Content-Type']), _tiempo())
+    return respuesta
+
+
+def cachear_json(nombre, por_usuario=False):
+    """Decorador para vistas GET de solo lectura: cachea la respuesta por parámetros y ámbito"""
+    def decorador(vista):
+        _nombres.add(nombre)
+
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            return respuesta_en_cache(
+                nombre, request, lambda: vista(request, *args, **kwargs), args, kwargs, por_usuario=por_usuario
+            )
+        return envoltura
+    return decorador
+
+
+def _leer(nombre, clave):
+    _nombres.add(nombre)
+    valor = cache.get(clave)
+    _contar(nombre, 'fallos' if valor is None else 'aciertos')
+    return valor
+
+
+def _contar(nombre, tipo):
+    clave = f'vistas:metricas:{nombre}:{tipo}'
+    try:
+        cache.incr(clave)
+    except ValueError:
+        if not cache.add(clave, 1, None):
+            cache.incr(clave)
+
+
+def metricas_cache(nombres=None):
+    """Aciertos, fallos y tasa de aciertos por vista desde que se iniciaron los contadores"""
+    nombres = sorted(nombres or _nombres)
+    claves = [f'vistas:metricas:{nombre}:{tipo}' for nombre in nombres for tipo in ('aciertos', 'fallos')]
+    valores = cache.get_many(claves)
+    metricas = {}
+    for nombre in nombres:
+        aciertos = valores.get(f'vistas:metricas:{nombre}:aciertos', 0)
+        fallos = valores.get(f'vistas:metricas:{nombre}:fallos', 0)
+        total = aciertos + fallos
+        metricas[nombre] = {
+            'aciertos': aciertos,
+            'fallos': fallos,
+            'tasa_aciertos': round(aciertos / total, 3) if total else None,
+        }
+    return metricas
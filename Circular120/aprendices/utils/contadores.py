@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models import Count, Q
+from aprendices.models import Aprendiz, AprendizResultado, Inasistencia
+
+
+# Columnas de Aprendiz que se mantienen con estos conteos
+CAMPOS_CONTADORES = [
+    'juicios_pendientes', 'juicios_aprobados', 'juicios_no_aprobados',
+    'total_inasistencias', 'inasistencias_injustificadas',
+]
+
+TAMANO_LOTE = 500
+
+
+def calcular_contadores(documentos):
+    """
+    Cuenta desde cero juicios e inasistencias de los aprendices indicados,
+    con una consulta agrupada por tabla.
+
+    Retorna: dict {documento: {campo: valor}} (solo para quienes tienen registros)
+    """
+    resultados = {}
+
+    filas = Inasistencia.objects.filter(aprendiz_id__in=documentos).order_by().values('aprendiz').annotate(
+        total_inasistencias=Count('pk'),
+        inasistencias_injustificadas=Count('pk', filter=Q(justificada=False)),
+    )
+    for fila in filas:
+        resultados.setdefault(fila.pop('aprendiz'), {}).update(fila)
+
+    filas = AprendizResultado.objects.filter(aprendiz_id__in=documentos).order_by().values('aprendiz').annotate(
+        juicios_pendientes=Count('pk', filter=Q(estado='PENDIENTE')),
+        juicios_aprobados=Count('pk', filter=Q(estado='APROBADO')),
+        juicios_no_aprobados=Count('pk', filter=Q(estado='NO_APROBADO')),
+    )
+    for fila in filas:
+        resultados.setdefault(fila.pop('aprendiz'), {}).update(fila)
+
+    return resultados
+
+
+def actualizar_contadores(documentos):
+    """
+    Recalcula los contadores de los aprendices indicados y guarda solo los
+    que cambiaron (bulk_update, sin señales), por lotes.
+
+    Retorna: número de aprendices corregidos
+    """
+    documentos = [d for d in set(documentos) if d]
+    corregidos = 0
+    with transaction.atomic():
+        for i in range(0, len(documentos), TAMANO_LOTE):
+            lote = documentos[i:i + TAMANO_LOTE]
+            valores = calcular_contadores(lote)
+            cambiados = []
+            for aprendiz in Aprendiz.objects.filter(pk__in=lote).only('pk', *CAMPOS_CONTADORES):
+                nuevos = valores.get(aprendiz.pk, {})
+                if any(getattr(aprendiz, campo) != nuevos.get(campo, 0) for campo in CAMPOS_CONTADORES):
+                    for campo in CAMPOS_CONTADORES:
+                        setattr(aprendiz, campo, nuevos.get(campo, 0))
+                    cambiados.append(aprendiz)
+            Aprendiz.objects.bulk_update(cambiados, CAMPOS_CONTADORES, batch_size=TAMANO_LOTE)
+            corregidos += len(cambiados)
+    return corregidos
+
+
+def reparar_contadores():
+    """Revisa todos los aprendices y corrige los contadores desactualizados"""
+    documentos = Aprendiz.objects.order_by('pk').values_list('pk', flat=True)
+    return actualizar_contadores(list(documentos))
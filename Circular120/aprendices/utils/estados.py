@@ -0,0 +1,48 @@
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+from aprendices.models import Aprendiz, CambioEstadoAprendiz
+from aprendices.utils.resumenes import marcar_fichas
+
+
+def cambiar_estado_aprendices(aprendices, estado, usuario=None, origen='WEB'):
+    """
+    Pasa a `estado` los aprendices del queryset con un solo UPDATE y deja un
+    CambioEstadoAprendiz por aprendiz (un solo INSERT). Los que ya están en
+    ese estado se omiten. Los resúmenes y el cache de vistas se actualizan una
+    vez por lote al confirmar; los contadores no dependen del estado.
+    Retorna: número de aprendices cambiados
+    """
+    if usuario is not None and not usuario.is_authenticated:
+        usuario = None
+    
+    with transaction.atomic():
+        filas = list(
+            aprendices.exclude(estado_formacion=estado)
+            .select_for_update()
+            .order_by()
+            .values_list('documento', 'estado_formacion', 'ficha_id')
+        )
+        if not filas:
+            return 0
+        
+        documentos = [documento for documento, _, _ in filas]
+        # update() no toca auto_now: updated_at se fija aquí como lo haría save().
+        # La versión de los reportes la incrementa aplicar_pendientes al confirmar
+        Aprendiz.objects.filter(documento__in=documentos).update(
+            estado_formacion=estado, updated_at=timezone.now()
+        )
+        
+        lote = str(uuid.uuid4())
+        CambioEstadoAprendiz.objects.bulk_create([
+            CambioEstadoAprendiz(
+                aprendiz_id=documento, estado_anterior=anterior, estado_nuevo=estado,
+                usuario=usuario, origen=origen, lote=lote,
+            )
+            for documento, anterior, _ in filas
+        ])
+        
+        # update() no dispara señales: se marcan las fichas afectadas una sola vez
+        marcar_fichas({ficha_id for _, _, ficha_id in filas})
+    return len(filas)
@@ -0,0 +1,144 @@
+import csv
+import tempfile
+from datetime import date, datetime
+from itertools import islice
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: solo se necesita para ?format=parquet
+    pa = pq = None
+
+
+FORMATOS_EXPORTACION = ('csv', 'parquet')
+TAMANO_LOTE = 5000
+
+
+class _Eco:
+    """Pseudo-archivo: csv.writer escribe y el valor se devuelve tal cual para transmitirlo"""
+
+    def write(self, value):
+        return value
+
+
+def formato_solicitado(request):
+    """Formato de exportación pedido con ?format=csv|parquet, o None"""
+    formato = request.GET.get('format', '').lower()
+    return formato if formato in FORMATOS_EXPORTACION else None
+
+
+def respuesta_exportacion(formato, nombre, columnas, filas):
+    """Respuesta de descarga en el formato indicado a partir de un iterador de filas"""
+    if formato == 'parquet':
+        return respuesta_parquet(nombre, columnas, filas)
+    return respuesta_csv(nombre, columnas, filas)
+
+
+def respuesta_csv(nombre, columnas, filas):
+    """
+    CSV transmitido fila a fila con StreamingHttpResponse: el primer byte sale
+    en cuanto llega el primer lote de la BD y nada se acumula en memoria.
+    """
+    writer = csv.writer(_Eco())
+
+    def contenido():
+        # BOM para que Excel reconozca UTF-8 (tildes y ñ)
+        yield '\ufeff' + writer.writerow(columnas)
+        for fila in filas:
+            yield writer.writerow(fila)
+
+    response = StreamingHttpResponse(contenido(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{_nombre_archivo(nombre, "csv")}"'
+    return response
+
+
+def respuesta_parquet(nombre, columnas, filas):
+    """
+    Parquet escrito por lotes en un archivo temporal (el formato necesita el
+    pie de página al final) y entregado con FileResponse.
+    """
+    if pa is None:
+        return HttpResponse(
+            'La exportación Parquet requiere el paquete pyarrow.',
+            status=501,
+            content_type='text/plain; charset=utf-8'
+        )
+
+    destino = tempfile.TemporaryFile(suffix='.parquet')
+    filas = iter(filas)
+    lote = list(islice(filas, TAMANO_LOTE))
+    schema = pa.schema([(col, _tipo_arrow(lote, i)) for i, col in enumerate(columnas)])
+
+    with pq.ParquetWriter(destino, schema) as writer:
+        while True:
+            arrays = [
+                pa.array([_valor_arrow(fila[i], campo.type) for fila in lote], type=campo.type)
+                for i, campo in enumerate(schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            lote = list(islice(filas, TAMANO_LOTE))
+            if not lote:
+                break
+
+    destino.seek(0)
+    return FileResponse(
+        destino,
+        as_attachment=True,
+        filename=_nombre_archivo(nombre, 'parquet'),
+        content_type='application/vnd.apache.parquet'
+    )
+
+
+def _tipo_arrow(lote, indice):
+    """Tipo Arrow de una columna según el primer valor no vacío del primer lote"""
+    for fila in lote:
+        valor = fila[indice]
+        if valor is None or valor == '':
+            continue
+        if isinstance(valor, bool):
+            return pa.bool_()
+        if isinstance(valor, int):
+            return pa.int64()
+        if isinstance(valor, float):
+            return pa.float64()
+        if isinstance(valor, datetime):
+            return pa.timestamp('us')
+        if isinstance(valor, date):
+            return pa.date32()
+        break
+    return pa.string()
+
+
+def _valor_arrow(valor, tipo):
+    if valor is None or valor == '':
+        return None
+    if tipo == pa.string() and not isinstance(valor, str):
+        return str(valor)
+    return valor
+
+
+def _nombre_archivo(nombre, extension):
+    return f'{nombre}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+
+
+class ExportarListaMixin:
+    """
+    Permite descargar una ListView completa (con sus filtros, sin paginar) con
+    ?format=csv o ?format=parquet.
+
+    columnas_exportacion: lista de (encabezado, campo para values_list)
+    """
+    columnas_exportacion = []
+    nombre_exportacion = 'exportacion'
+
+    def get(self, request, *args, **kwargs):
+        formato = formato_solicitado(request)
+        if formato:
+            encabezados = [encabezado for encabezado, _ in self.columnas_exportacion]
+            campos = [campo for _, campo in self.columnas_exportacion]
+            filas = self.get_queryset().values_list(*campos).iterator(chunk_size=2000)
+            return respuesta_exportacion(formato, self.nombre_exportacion, encabezados, filas)
+        return super().get(request, *args, **kwargs)
@@ -0,0 +1,224 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+
+
+TAMANO_PAGINA = 25
+
+
+class PaginaKeyset:
+    """Una página de resultados y los cursores de la siguiente y la anterior (None si no hay)"""
+
+    def __init__(self, filas, siguiente, anterior=None):
+        self.filas = filas
+        self.siguiente = siguiente
+        self.anterior = anterior
+
+    def __iter__(self):
+        return iter(self.filas)
+
+    def __len__(self):
+        return len(self.filas)
+
+    @property
+    def hay_mas(self):
+        return self.siguiente is not None
+
+    @property
+    def hay_anterior(self):
+        return self.anterior is not None
+
+
+def paginar_keyset(queryset, orden, cursor=None, tamano=TAMANO_PAGINA, antes=None):
+    """
+    Pagina por keyset (WHERE sobre la última fila vista) en lugar de OFFSET:
+    cada página cuesta lo mismo sin importar qué tan adentro esté.
+
+    orden:  campos de ordenamiento ('-campo' = descendente). Ninguno puede
+            ser nulo y el último debe ser único (p. ej. la llave primaria).
+    cursor: valor de PaginaKeyset.siguiente de la página anterior
+    antes:  valor de PaginaKeyset.anterior, para retroceder una página
+
+    Un cursor inválido (alterado a mano o de otra lista) lleva a la primera página.
+    """
+    # Hacia atrás: mismo criterio con el orden invertido, y se voltea el resultado
+    invertido = [campo.lstrip('-') if campo.startswith('-') else f'-{campo}' for campo in orden]
+    anteriores = _filtrar_despues(queryset, invertido, antes)
+    if anteriores is not None:
+        filas = list(anteriores.order_by(*invertido)[:tamano + 1])
+        hay_anterior = len(filas) > tamano
+        filas = filas[:tamano][::-1]
+        return PaginaKeyset(
+            filas,
+            _cursor(filas[-1], orden) if filas else None,
+            _cursor(filas[0], orden) if hay_anterior else None,
+        )
+
+    siguientes = _filtrar_despues(queryset, orden, cursor)
+    desplazado = siguientes is not None
+    if desplazado:
+        queryset = siguientes
+
+    filas = list(queryset.order_by(*orden)[:tamano + 1])
+    siguiente = None
+    if len(filas) > tamano:
+        filas = filas[:tamano]
+        siguiente = _cursor(filas[-1], orden)
+    anterior = _cursor(filas[0], orden) if desplazado and filas else None
+    return PaginaKeyset(filas, siguiente, anterior)
+
+
+def contar_acotado(queryset, maximo=None):
+    """
+    Cuenta las filas sin pasar de maximo (COUNT sobre un LIMIT): el costo
+    queda acotado aunque la tabla crezca. Retorna (total, exacto); si no es
+    exacto, hay más de maximo filas. maximo=None cuenta todo.
+    """
+    if maximo is None:
+        return queryset.count(), True
+    total = queryset.order_by()[:maximo + 1].count()
+    return min(total, maximo), total <= maximo
+
+
+def estimar_filas(modelo, using='default'):
+    """
+    Filas de la tabla según las estadísticas del motor (pg_class.reltuples
+    en PostgreSQL, sqlite_stat1 en SQLite tras ANALYZE), sin recorrerla.
+    Retorna None si el motor no tiene estadísticas de la tabla.
+    """
+    connection = connections[using]
+    tabla = modelo._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [tabla])
+            elif connection.vendor == 'sqlite':
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [tabla])
+            else:
+                return None
+            fila = cursor.fetchone()
+    except DatabaseError:
+        # SQLite sin ANALYZE previo: la tabla sqlite_stat1 no existe
+        return None
+    if fila is None or fila[0] is None:
+        return None
+    # PostgreSQL: -1 si la tabla nunca se ha analizado. SQLite: "filas filas_por_valor..."
+    filas = int(str(fila[0]).split()[0])
+    return filas if filas >= 0 else None
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Paginator para tablas grandes (admin): sin filtros usa el estimado del
+    motor (estimar_filas); con filtros, contar_acotado hasta conteo_maximo.
+    Las páginas más allá del tope no se listan: se llega a ellas filtrando.
+    """
+    conteo_maximo = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimado = estimar_filas(queryset.model, queryset.db)
+            if estimado is not None:
+                return estimado
+            return queryset.count()
+        return contar_acotado(queryset, self.conteo_maximo)[0]
+
+
+class PaginacionKeysetMixin:
+    """
+    Reemplaza la paginación por OFFSET de una ListView por cursores
+    (?despues= / ?antes=). page_obj es una PaginaKeyset.
+
+    orden_keyset:  orden de la lista (ver paginar_keyset); get_orden_keyset()
+                   puede cambiarlo según los filtros
+    conteo_maximo: None para contar exacto, o tope para contar_acotado
+    """
+    orden_keyset = None
+    conteo_maximo = None
+
+    def get_orden_keyset(self):
+        return self.orden_keyset
+
+    def contar_resultados(self, queryset):
+        return contar_acotado(queryset, self.conteo_maximo)
+
+    def paginate_queryset(self, queryset, page_size):
+        pagina = paginar_keyset(
+            queryset, self.get_orden_keyset(), self.request.GET.get('despues'), page_size,
+            antes=self.request.GET.get('antes'),
+        )
+        return None, pagina, pagina.filas, pagina.hay_mas or pagina.hay_anterior
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx['total_resultados'], ctx['total_exacto'] = self.contar_resultados(self.object_list)
+        return ctx
+
+
+def respuesta_pagina(request, template_name, pagina, contexto=None):
+    """Respuesta JSON para "cargar más": filas renderizadas y cursor siguiente"""
+    contexto = dict(contexto or {}, filas=pagina.filas)
+    return JsonResponse({
+        'html': render_to_string(template_name, contexto, request=request),
+        'siguiente': pagina.siguiente,
+    })
+
+
+def _filtrar_despues(queryset, orden, cursor):
+    """queryset filtrado a las filas posteriores al cursor, o None si no hay cursor o no es válido"""
+    valores = _decodificar(cursor) if cursor else None
+    if valores is None or len(valores) != len(orden):
+        return None
+    try:
+        # Los valores se convierten al tipo de cada campo al construir el filtro
+        return queryset.filter(_despues_de(orden, valores))
+    except (TypeError, ValueError, ValidationError):
+        return None
+
+
+def _despues_de(orden, valores):
+    """(a > x) OR (a = x AND b > y) OR ... según la dirección de cada campo"""
+    condicion = Q()
+    iguales = Q()
+    for campo, valor in zip(orden, valores):
+        nombre = campo.lstrip('-')
+        lookup = 'lt' if campo.startswith('-') else 'gt'
+        condicion |= iguales & Q(**{f'{nombre}__{lookup}': valor})
+        iguales &= Q(**{nombre: valor})
+    return condicion
+
+
+def _cursor(fila, orden):
+    return _codificar([_valor(fila, campo.lstrip('-')) for campo in orden])
+
+
+def _valor(fila, campo):
+    valor = fila
+    for parte in campo.split('__'):
+        valor = getattr(valor, parte)
+    return valor
+
+
+def _codificar(valores):
+    return base64.urlsafe_b64encode(json.dumps(valores, cls=DjangoJSONEncoder).encode()).decode()
+
+
+def _decodificar(cursor):
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error):
+        return None
+    if not isinstance(valores, list) or not all(isinstance(valor, (str, int, float)) for valor in valores):
+        return None
+    return valores
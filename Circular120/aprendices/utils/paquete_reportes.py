@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import connections
+from aprendices.models import Ficha
+from aprendices.utils.reportes import GeneradorReportes, TIPOS_REPORTE, _inicializar_worker
+
+
+PROCESOS_DEFECTO = 2
+TAMANO_BLOQUE = 64 * 1024
+
+
+def _procesos():
+    return getattr(settings, 'REPORTES_PAQUETE_PROCESOS', None) or PROCESOS_DEFECTO
+
+
+# Pool de procesos compartido por todas las descargas del proceso web: limita
+# cuántos libros se generan a la vez sin importar cuántos paquetes se pidan
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_paquetes(procesos=None):
+    """
+    Pool compartido, creado en el primer uso con procesos (por defecto
+    REPORTES_PAQUETE_PROCESOS); los usos siguientes reciben el mismo pool
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Las conexiones abiertas no deben heredarse en los procesos hijos
+            connections.close_all()
+            _pool = ProcessPoolExecutor(max_workers=procesos or _procesos(), initializer=_inicializar_worker)
+        return _pool
+
+
+def _descartar_pool(pool):
+    """Descarta un pool roto (un proceso hijo murió) para que el siguiente uso cree otro"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _FlujoZip:
+    """
+    Pseudo-archivo no posicionable para zipfile: acumula lo escrito hasta que
+    se vacía. Como no tiene tell/seek, zipfile usa descriptores de datos y
+    nunca retrocede, así que cada bloque puede enviarse apenas se escribe.
+    """
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def generar_reporte_ficha(tipo, numero_ficha, directorio):
+    """
+    Genera un reporte de una ficha en directorio (en un proceso del pool o en el actual)
+    Retorna: ruta del archivo generado
+    """
+    ficha = Ficha.objects.get(pk=numero_ficha)
+    ruta = os.path.join(directorio, f'{tipo}_{numero_ficha}.xlsx')
+    with open(ruta, 'wb') as destino:
+        GeneradorReportes().generar(tipo, ficha=ficha, destino=destino)
+    return ruta
+
+
+def generar_archivos_paquete(centro, directorio, tipos=None, procesos=None):
+    """
+    Genera los reportes de cada ficha del centro: en el pool compartido o,
+    con procesos=1 (por defecto REPORTES_PAQUETE_PROCESOS), uno tras otro en
+    el proceso actual.
+
+    Produce (nombre dentro del ZIP, ruta) a medida que cada reporte termina.
+    """
+    tipos = tipos or TIPOS_REPORTE
+    fichas = list(Ficha.objects.filter(centro=centro).order_by('numero').values_list('numero', flat=True))
+    trabajos = [(tipo, numero) for numero in fichas for tipo in tipos]
+
+    if (procesos or _procesos()) == 1:
+        for tipo, numero in trabajos:
+            yield f'{numero}/{tipo}_{numero}.xlsx', generar_reporte_ficha(tipo, numero, directorio)
+        return
+
+    pool = pool_paquetes(procesos)
+    futuros = {pool.submit(generar_reporte_ficha, tipo, numero, directorio): (tipo, numero) for tipo, numero in trabajos}
+    try:
+        for futuro in as_completed(futuros):
+            tipo, numero = futuros[futuro]
+            yield f'{numero}/{tipo}_{numero}.xlsx', futuro.result()
+    except BrokenProcessPool:
+        _descartar_pool(pool)
+        raise
+    finally:
+        # Si falla un reporte no se siguen generando los del mismo paquete (el pool sigue vivo)
+        for futuro in futuros:
+            futuro.cancel()
+
+
+def flujo_paquete_centro(centro, tipos=None, procesos=None):
+    """
+    Paquete ZIP con los reportes por ficha de un centro, como iterador de bytes.
+
+    Cada libro se agrega al ZIP en cuanto termina y se borra del disco; el
+    archivo completo nunca se arma en memoria. Si se deja de consumir el
+    iterador (el cliente corta la descarga) se cancelan los reportes pendientes.
+    """
+    directorio = tempfile.mkdtemp(prefix='paquete_reportes_')
+    flujo = _FlujoZip()
+    try:
+        with zipfile.ZipFile(flujo, 'w', compression=zipfile.ZIP_DEFLATED) as zf, \
+                closing(generar_archivos_paquete(centro, directorio, tipos, procesos)) as archivos:
+            for nombre, ruta in archivos:
+                with open(ruta, 'rb') as origen, zf.open(nombre, 'w') as destino:
+                    while True:
+                        bloque = origen.read(TAMANO_BLOQUE)
+                        if not bloque:
+                            break
+                        destino.write(bloque)
+                        datos = flujo.vaciar()
+                        if datos:
+                            yield datos
+                os.remove(ruta)
+                yield flujo.vaciar()
+        # Directorio central del ZIP
+        yield flujo.vaciar()
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def generar_paquete_centro(centro, destino, tipos=None, procesos=None):
+    """
+    Escribe en destino (archivo abierto en modo binario) el ZIP de
+    flujo_paquete_centro, bloque a bloque
+    """
+    for bloque in flujo_paquete_centro(centro, tipos, procesos):
+        destino.write(bloque)
@@ -0,0 +1,198 @@
+import heapq
+import logging
+import os
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import Avg, Count, F, Max, Sum
+from django.db.models.functions import TruncDate
+from django.template.base import Template
+from django.utils import timezone
+from aprendices.models import PerfilPeticion
+
+logger = logging.getLogger(__name__)
+
+RETENCION_DIAS_DEFECTO = 30
+MAX_SQL = 2000
+
+# Medición de la petición en curso (por hilo/tarea): la leen el wrapper de
+# SQL y el render de plantillas instrumentado
+_medicion_actual = ContextVar('medicion_perfil', default=None)
+_render_original = Template.render
+# Marcos que no cuentan como origen de una consulta: Django, este módulo y el middleware
+_DIRECTORIO_DJANGO = os.path.dirname(django.__file__)
+_ARCHIVOS_EXCLUIDOS = {
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'middleware.py'),
+}
+
+
+class Medicion:
+    """Acumula consultas, tiempos de SQL y de plantillas de una petición"""
+
+    def __init__(self, max_lentas=5):
+        self.max_lentas = max_lentas
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.tiempo_plantillas = 0.0
+        self.en_plantilla = False
+        # Montículo (duración, orden, sql, origen) con las más lentas
+        self._lentas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.consultas += 1
+            self.tiempo_sql += duracion
+            if len(self._lentas) < self.max_lentas or duracion > self._lentas[0][0]:
+                # El origen solo se busca para las que entran al top: recorrer la pila cuesta
+                entrada = (duracion, self.consultas, sql[:MAX_SQL], origen_consulta())
+                if len(self._lentas) < self.max_lentas:
+                    heapq.heappush(self._lentas, entrada)
+                else:
+                    heapq.heapreplace(self._lentas, entrada)
+
+    def consultas_lentas(self):
+        return [
+            {'ms': round(duracion * 1000, 2), 'sql': sql, 'origen': origen}
+            for duracion, _, sql, origen in sorted(self._lentas, reverse=True)
+        ]
+
+
+def origen_consulta():
+    """Primer marco de la pila dentro del proyecto (no Django ni este módulo): 'ruta.py:línea en función'"""
+    base = str(settings.BASE_DIR)
+    marco = sys._getframe(1)
+    while marco is not None:
+        archivo = marco.f_code.co_filename
+        if (archivo.startswith(base) and archivo not in _ARCHIVOS_EXCLUIDOS
+                and not archivo.startswith(_DIRECTORIO_DJANGO) and 'site-packages' not in archivo):
+            return f'{os.path.relpath(archivo, base)}:{marco.f_lineno} en {marco.f_code.co_name}'
+        marco = marco.f_back
+    return ''
+
+
+def _render_medido(self, context):
+    medicion = _medicion_actual.get()
+    if medicion is None or medicion.en_plantilla:
+        # Sin medición, o plantilla incluida/extendida: ya cuenta en la de nivel superior
+        return _render_original(self, context)
+    medicion.en_plantilla = True
+    inicio = time.perf_counter()
+    try:
+        return _render_original(self, context)
+    finally:
+        medicion.tiempo_plantillas += time.perf_counter() - inicio
+        medicion.en_plantilla = False
+
+
+def instrumentar_plantillas():
+    """
+    Mide el render de plantillas de Django. Solo se instala si el perfilado
+    está activo; fuera de una petición medida cuesta una lectura del ContextVar.
+    El tiempo incluye las consultas que dispare la plantilla (querysets perezosos).
+    """
+    if Template.render is not _render_medido:
+        Template.render = _render_medido
+
+
+@contextmanager
+def medir_peticion(max_lentas=5):
+    """Registra en una Medicion todas las consultas y renders ejecutados dentro del bloque"""
+    medicion = Medicion(max_lentas)
+    token = _medicion_actual.set(medicion)
+    try:
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(medicion))
+            yield medicion
+    finally:
+        _medicion_actual.reset(token)
+
+
+def registrar_perfil(request, response, tiempo_total, medicion=None):
+    """Guarda un PerfilPeticion; un fallo al guardar no debe afectar la respuesta"""
+    coincidencia = getattr(request, 'resolver_match', None)
+    # Solo si la vista ya cargó el usuario: evaluarlo aquí agregaría consultas
+    usuario = getattr(request, '_cached_user', None)
+    datos = {
+        'vista': (coincidencia.view_name if coincidencia else '') or 'sin_ruta',
+        'ruta': request.path[:500],
+        'metodo': request.method,
+        'estado_http': response.status_code,
+        'usuario_id': usuario.pk if usuario is not None and usuario.is_authenticated else None,
+        'tiempo_total_ms': round(tiempo_total * 1000, 2),
+        'muestreada': medicion is not None,
+    }
+    if medicion is not None:
+        datos.update(
+            consultas=medicion.consultas,
+            tiempo_sql_ms=round(medicion.tiempo_sql * 1000, 2),
+            tiempo_plantillas_ms=round(medicion.tiempo_plantillas * 1000, 2),
+            consultas_lentas=medicion.consultas_lentas(),
+        )
+    try:
+        return PerfilPeticion.objects.create(**datos)
+    except DatabaseError:
+        logger.exception('No se pudo registrar el perfil de %s', request.path)
+        return None
+
+
+def peores_endpoints(desde, orden='total', limite=20):
+    """
+    Vistas agregadas desde `desde`, de peor a mejor según `orden`:
+    'total' (tiempo acumulado), 'promedio' o 'maximo'.
+    """
+    campos_orden = {'total': 'tiempo_acumulado', 'promedio': 'tiempo_promedio', 'maximo': 'tiempo_maximo'}
+    return list(
+        PerfilPeticion.objects.filter(created_at__gte=desde)
+        .values('vista')
+        .annotate(
+            peticiones=Count('pk'),
+            tiempo_acumulado=Sum('tiempo_total_ms'),
+            tiempo_promedio=Avg('tiempo_total_ms'),
+            tiempo_maximo=Max('tiempo_total_ms'),
+            consultas_promedio=Avg('consultas'),
+            consultas_maximo=Max('consultas'),
+            sql_promedio=Avg('tiempo_sql_ms'),
+            plantillas_promedio=Avg('tiempo_plantillas_ms'),
+        )
+        .order_by(F(campos_orden.get(orden, 'tiempo_acumulado')).desc(nulls_last=True), 'vista')[:limite]
+    )
+
+
+def tendencia_diaria(vistas, desde):
+    """{vista: [{'dia', 'peticiones', 'tiempo_promedio', 'consultas_promedio'}]} por día desde `desde`"""
+    filas = (
+        PerfilPeticion.objects.filter(created_at__gte=desde, vista__in=vistas)
+        .annotate(dia=TruncDate('created_at'))
+        .values('vista', 'dia')
+        .annotate(
+            peticiones=Count('pk'),
+            tiempo_promedio=Avg('tiempo_total_ms'),
+            consultas_promedio=Avg('consultas'),
+        )
+        .order_by('vista', 'dia')
+    )
+    tendencia = {vista: [] for vista in vistas}
+    for fila in filas:
+        tendencia[fila.pop('vista')].append(fila)
+    return tendencia
+
+
+def aplicar_retencion_perfiles(dias=None):
+    """Elimina los perfiles con más de `dias` de antigüedad. Retorna: número eliminados"""
+    if dias is None:
+        dias = getattr(settings, 'PERFIL_RETENCION_DIAS', RETENCION_DIAS_DEFECTO)
+    limite = timezone.now() - timedelta(days=dias)
+    eliminados, _ = PerfilPeticion.objects.filter(created_at__lt=limite).delete()
+    return eliminados
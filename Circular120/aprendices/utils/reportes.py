@@ -1,20 +1,69 @@
 import os
-from datetime import date, datetime
-from io import BytesIO
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import tempfile
 import pandas as pd
 from django.conf import settings
+from django.core.files import File
+from django.db import connections
 from django.db.models import Count, Q
+from django.utils import timezone
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
 from openpyxl.utils.dataframe import dataframe_to_rows
-from aprendices.models import Aprendiz, Ficha, Inasistencia, AprendizResultado
+from aprendices.models import (
+    ESTADOS_CERRADOS, Aprendiz, Ficha, Inasistencia, AprendizResultado, CentroFormacion, ReporteGenerado
+)
+from aprendices.utils.cache_reportes import version_datos
+
+
+COLUMNAS_INASISTENCIAS = [
+    'FICHA', 'INSTRUCTOR', 'IDENTIFICACION APRENDIZ', 'APRENDIZ',
+    'FECHA INICIO', 'FECHA F', 'CAN K', 'JUSTIFICACION',
+]
+
+COLUMNAS_JUICIOS = [
+    'Tipo', 'Documento', 'Nombre', 'Apellidos', 'Estado', 'Competencia',
+    'Resultado de Aprendizaje', 'Juicio', 'Fecha y Hora del Juicio', 'Funcionario que registró',
+]
+
+# Unión de las columnas de las tres hojas del reporte Circular 120
+COLUMNAS_CIRCULAR120 = [
+    'Sección', 'Documento', 'Nombre Completo', 'Ficha', 'Programa', 'Estado',
+    'Fecha Fin Productiva', 'Fecha Fin Ficha', 'Días Vencido', 'Nivel Urgencia', 'Observaciones',
+]
+
+
+def filtros_circular120(hoy):
+    """
+    Condición de cada sección del reporte Circular 120. La comparten el
+    reporte (Excel/CSV) y la página, para que los totales que muestra la
+    página coincidan con las filas que se descargan.
+    """
+    return {
+        'por_certificar': Q(estado_formacion='POR_CERTIFICAR'),
+        'productiva_vencida': Q(estado_formacion='ETAPA_PRODUCTIVA', fecha_fin_productiva__lt=hoy),
+        # Fichas vencidas como subconsulta: se parte del índice de fecha_fin aunque
+        # el listado se ordene por otro campo
+        'ficha_vencida': Q(ficha__in=Ficha.objects.filter(fecha_fin__lt=hoy)) & ~Q(estado_formacion__in=ESTADOS_CERRADOS),
+    }
+
+
+# Tamaño a partir del cual los reportes en generación pasan de memoria a disco
+SPOOL_MAX_BYTES = 5 * 1024 * 1024
+
+
+def _fecha_str(fecha):
+    return fecha.strftime('%d/%m/%Y') if fecha else ''
 
 
 class GeneradorReportes:
     """Genera reportes automáticos en Excel con formato profesional"""
     
     def __init__(self):
-        self.hoy = date.today()
+        self.hoy = timezone.localdate()
         
     def _aplicar_estilo_cabecera(self, ws, fila=1):
         """Aplica estilo a la fila de cabecera"""
@@ -31,11 +80,21 @@ class GeneradorReportes:
             cell.alignment = alignment
             cell.border = border
     
+    def _guardar(self, wb, destino=None):
+        """
+        Escribe el libro en destino (archivo abierto) o, si no se indica, en un
+        archivo temporal que pasa de memoria a disco al superar SPOOL_MAX_BYTES.
+        """
+        output = destino if destino is not None else tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        wb.save(output)
+        output.seek(0)
+        return output
+    
     def _ajustar_columnas(self, ws):
         """Ajusta el ancho de las columnas automáticamente"""
         for column in ws.columns:
             max_length = 0
-            column_letter = column[0].column_letter
+            column_letter = get_column_letter(column[0].column)
             for cell in column:
                 try:
                     if len(str(cell.value)) > max_length:
@@ -45,39 +104,70 @@ class GeneradorReportes:
             adjusted_width = min(max_length + 2, 50)
             ws.column_dimensions[column_letter].width = adjusted_width
     
-    def generar_reporte_inasistencias(self, ficha=None, fecha_desde=None, fecha_hasta=None):
+    def generar(self, tipo, **kwargs):
+        """Genera el reporte indicado por tipo ('inasistencias', 'juicios' o 'circular120')"""
+        metodos = {
+            'inasistencias': self.generar_reporte_inasistencias,
+            'juicios': self.generar_reporte_juicios,
+            'circular120': self.generar_reporte_circular120,
+        }
+        return metodos[tipo](**kwargs)
+    
+    def tabla(self, tipo, **kwargs):
         """
-        Genera reporte consolidado de inasistencias
+        Datos planos de un reporte para exportar (CSV / Parquet)
         
-        Retorna: BytesIO con el archivo Excel
+        Retorna: (columnas, generador de filas)
         """
-        # Filtrar inasistencias
-        queryset = Inasistencia.objects.select_related('aprendiz', 'ficha')
+        tablas = {
+            'inasistencias': (COLUMNAS_INASISTENCIAS, self.filas_inasistencias),
+            'juicios': (COLUMNAS_JUICIOS, self.filas_juicios),
+            'circular120': (COLUMNAS_CIRCULAR120, self.filas_circular120),
+        }
+        columnas, filas = tablas[tipo]
+        return columnas, filas(**kwargs)
+    
+    def filas_inasistencias(self, ficha=None, fecha_desde=None, fecha_hasta=None, centro=None):
+        """Filas del reporte de inasistencias, leídas de la BD por lotes"""
+        queryset = Inasistencia.objects.all()
         
         if ficha:
             queryset = queryset.filter(ficha=ficha)
+        if centro:
+            queryset = queryset.filter(ficha__centro=centro)
         if fecha_desde:
             queryset = queryset.filter(fecha__gte=fecha_desde)
         if fecha_hasta:
             queryset = queryset.filter(fecha__lte=fecha_hasta)
         
-        queryset = queryset.order_by('ficha__numero', 'fecha')
+        queryset = queryset.order_by('ficha__numero', 'fecha').values_list(
+            'ficha__numero', 'ficha__instructor', 'aprendiz__documento',
+            'aprendiz__nombre', 'aprendiz__apellido',
+            'aprendiz__fecha_inicio', 'aprendiz__fecha_final', 'motivo',
+        )
         
-        # Crear DataFrame
-        data = []
-        for ina in queryset:
-            data.append({
-                'FICHA': ina.ficha.numero if ina.ficha else '',
-                'INSTRUCTOR': ina.ficha.instructor if ina.ficha else '',
-                'IDENTIFICACION APRENDIZ': ina.aprendiz.documento,
-                'APRENDIZ': f"{ina.aprendiz.nombre} {ina.aprendiz.apellido}",
-                'FECHA INICIO': ina.aprendiz.fecha_inicio.strftime('%d/%m/%Y') if ina.aprendiz.fecha_inicio else '',
-                'FECHA F': ina.aprendiz.fecha_final.strftime('%d/%m/%Y') if ina.aprendiz.fecha_final else '',
-                'CAN K': '',  # Campo vacío según tu imagen
-                'JUSTIFICACION': ina.motivo or '',
-            })
+        for numero, instructor, documento, nombre, apellido, inicio, final, motivo in queryset.iterator(chunk_size=2000):
+            yield (
+                numero or '',
+                instructor or '',
+                documento,
+                f"{nombre} {apellido}",
+                _fecha_str(inicio),
+                _fecha_str(final),
+                '',  # CAN K: campo vacío según el formato del SENA
+                motivo or '',
+            )
+    
+    def generar_reporte_inasistencias(self, ficha=None, fecha_desde=None, fecha_hasta=None, centro=None, destino=None):
+        """
+        Genera reporte consolidado de inasistencias
         
-        df = pd.DataFrame(data)
+        Retorna: archivo Excel abierto y posicionado al inicio (destino o temporal)
+        """
+        df = pd.DataFrame(
+            list(self.filas_inasistencias(ficha, fecha_desde, fecha_hasta, centro)),
+            columns=COLUMNAS_INASISTENCIAS
+        )
         
         # Crear Excel con formato
         wb = Workbook()
@@ -109,46 +199,44 @@ class GeneradorReportes:
         
         self._ajustar_columnas(ws)
         
-        # Guardar en BytesIO
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
+        return self._guardar(wb, destino)
+    
+    def filas_juicios(self, ficha=None, centro=None):
+        """Filas del reporte de juicios evaluativos, leídas de la BD por lotes"""
+        queryset = AprendizResultado.objects.all()
         
-        return output
+        if ficha:
+            queryset = queryset.filter(aprendiz__ficha=ficha)
+        if centro:
+            queryset = queryset.filter(aprendiz__ficha__centro=centro)
+        
+        queryset = queryset.order_by('aprendiz__ficha__numero', 'aprendiz__documento').values_list(
+            'aprendiz__documento', 'aprendiz__nombre', 'aprendiz__apellido',
+            'aprendiz__estado_formacion', 'resultado__competencia__codigo',
+            'resultado__codigo', 'estado', 'fecha',
+        )
+        
+        for documento, nombre, apellido, estado_formacion, competencia, resultado, estado, fecha in queryset.iterator(chunk_size=2000):
+            yield (
+                'CC',
+                documento,
+                nombre,
+                apellido,
+                estado_formacion,
+                competencia or '',
+                resultado,
+                estado,
+                fecha.strftime('%d/%m/%Y %H:%M') if fecha else '',
+                'Sistema',
+            )
     
-    def generar_reporte_juicios(self, ficha=None):
+    def generar_reporte_juicios(self, ficha=None, centro=None, destino=None):
         """
         Genera reporte de juicios de evaluación
         
-        Retorna: BytesIO con el archivo Excel
+        Retorna: archivo Excel abierto y posicionado al inicio (destino o temporal)
         """
-        # Obtener datos
-        queryset = AprendizResultado.objects.select_related(
-            'aprendiz', 'aprendiz__ficha', 'resultado', 'resultado__competencia'
-        )
-        
-        if ficha:
-            queryset = queryset.filter(aprendiz__ficha=ficha)
-        
-        queryset = queryset.order_by('aprendiz__ficha__numero', 'aprendiz__documento')
-        
-        # Crear DataFrame
-        data = []
-        for ar in queryset:
-            data.append({
-                'Tipo': 'CC',
-                'Documento': ar.aprendiz.documento,
-                'Nombre': ar.aprendiz.nombre,
-                'Apellidos': ar.aprendiz.apellido,
-                'Estado': ar.aprendiz.estado_formacion,
-                'Competencia': ar.resultado.competencia.codigo if ar.resultado.competencia else '',
-                'Resultado de Aprendizaje': ar.resultado.codigo,
-                'Juicio': ar.estado,
-                'Fecha y Hora del Juicio': ar.fecha.strftime('%d/%m/%Y %H:%M') if ar.fecha else '',
-                'Funcionario que registró': 'Sistema',
-            })
-        
-        df = pd.DataFrame(data)
+        df = pd.DataFrame(list(self.filas_juicios(ficha, centro)), columns=COLUMNAS_JUICIOS)
         
         # Crear Excel
         wb = Workbook()
@@ -190,33 +278,81 @@ class GeneradorReportes:
         
         self._ajustar_columnas(ws)
         
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
+        return self._guardar(wb, destino)
+    
+    def consultas_circular120(self, ficha=None, centro=None):
+        """Querysets de las tres secciones del reporte Circular 120"""
+        hoy = self.hoy
         
-        return output
+        aprendices = Aprendiz.objects.select_related('ficha').con_vencimiento(hoy)
+        if ficha:
+            aprendices = aprendices.filter(ficha=ficha)
+        if centro:
+            aprendices = aprendices.filter(ficha__centro=centro)
+        
+        filtros = filtros_circular120(hoy)
+        por_certificar = aprendices.filter(filtros['por_certificar'])
+        productiva_vencida = aprendices.filter(filtros['productiva_vencida'])
+        ficha_vencida = aprendices.filter(filtros['ficha_vencida'])
+        
+        return por_certificar, productiva_vencida, ficha_vencida
+    
+    def _filas_por_certificar(self, queryset):
+        for ap in queryset.iterator(chunk_size=2000):
+            yield {
+                'Documento': ap.documento,
+                'Nombre Completo': f"{ap.nombre} {ap.apellido}",
+                'Ficha': ap.ficha.numero if ap.ficha else '',
+                'Programa': ap.ficha.programa if ap.ficha else '',
+                'Estado': ap.estado_formacion,
+                'Fecha Fin Productiva': _fecha_str(ap.fecha_fin_productiva),
+                'Observaciones': ap.observaciones or '',
+            }
+    
+    def _filas_productiva_vencida(self, queryset):
+        for ap in queryset.iterator(chunk_size=2000):
+            yield {
+                'Documento': ap.documento,
+                'Nombre Completo': f"{ap.nombre} {ap.apellido}",
+                'Ficha': ap.ficha.numero if ap.ficha else '',
+                'Programa': ap.ficha.programa if ap.ficha else '',
+                'Fecha Fin Productiva': _fecha_str(ap.fecha_fin_productiva),
+                'Días Vencido': ap.dias_vencidos,
+                'Nivel Urgencia': ap.nivel_urgencia,
+            }
     
-    def generar_reporte_circular120(self):
+    def _filas_ficha_vencida(self, queryset):
+        for ap in queryset.iterator(chunk_size=2000):
+            yield {
+                'Documento': ap.documento,
+                'Nombre Completo': f"{ap.nombre} {ap.apellido}",
+                'Ficha': ap.ficha.numero if ap.ficha else '',
+                'Programa': ap.ficha.programa if ap.ficha else '',
+                'Fecha Fin Ficha': _fecha_str(ap.ficha.fecha_fin) if ap.ficha else '',
+                'Días Vencido': ap.dias_vencidos,
+                'Estado': ap.estado_formacion,
+            }
+    
+    def filas_circular120(self, ficha=None, centro=None):
+        """Filas de las tres secciones del reporte Circular 120 en una sola tabla"""
+        por_certificar, productiva_vencida, ficha_vencida = self.consultas_circular120(ficha, centro)
+        secciones = [
+            ('Por Certificar', self._filas_por_certificar(por_certificar)),
+            ('Productiva Vencida', self._filas_productiva_vencida(productiva_vencida)),
+            ('Ficha Vencida', self._filas_ficha_vencida(ficha_vencida)),
+        ]
+        for seccion, filas in secciones:
+            for fila in filas:
+                fila['Sección'] = seccion
+                yield tuple(fila.get(col, '') for col in COLUMNAS_CIRCULAR120)
+    
+    def generar_reporte_circular120(self, ficha=None, centro=None, destino=None):
         """
         Genera reporte Circular 120 con casos vencidos y por certificar
         
-        Retorna: BytesIO con el archivo Excel
+        Retorna: archivo Excel abierto y posicionado al inicio (destino o temporal)
         """
-        hoy = self.hoy
-        
-        # Obtener aprendices relevantes
-        por_certificar = Aprendiz.objects.filter(estado_formacion='POR_CERTIFICAR').select_related('ficha')
-        
-        productiva_vencida = Aprendiz.objects.filter(
-            estado_formacion='ETAPA_PRODUCTIVA',
-            fecha_fin_productiva__lt=hoy
-        ).select_related('ficha')
-        
-        ficha_vencida = Aprendiz.objects.filter(
-            ficha__fecha_fin__lt=hoy
-        ).exclude(
-            estado_formacion__in=['CERTIFICADO', 'CANCELADO']
-        ).select_related('ficha')
+        por_certificar, productiva_vencida, ficha_vencida = self.consultas_circular120(ficha, centro)
         
         # Crear Excel con múltiples hojas
         wb = Workbook()
@@ -225,19 +361,7 @@ class GeneradorReportes:
         ws1 = wb.active
         ws1.title = "Por Certificar"
         
-        data1 = []
-        for ap in por_certificar:
-            data1.append({
-                'Documento': ap.documento,
-                'Nombre Completo': f"{ap.nombre} {ap.apellido}",
-                'Ficha': ap.ficha.numero if ap.ficha else '',
-                'Programa': ap.ficha.programa if ap.ficha else '',
-                'Estado': ap.estado_formacion,
-                'Fecha Fin Productiva': ap.fecha_fin_productiva.strftime('%d/%m/%Y') if ap.fecha_fin_productiva else '',
-                'Observaciones': ap.observaciones or '',
-            })
-        
-        df1 = pd.DataFrame(data1)
+        df1 = pd.DataFrame(list(self._filas_por_certificar(por_certificar)))
         
         ws1['A1'] = "APRENDICES POR CERTIFICAR"
         ws1['A1'].font = Font(bold=True, size=14, color="00954a")
@@ -255,20 +379,7 @@ class GeneradorReportes:
         # ===== HOJA 2: PRODUCTIVA VENCIDA =====
         ws2 = wb.create_sheet("Productiva Vencida")
         
-        data2 = []
-        for ap in productiva_vencida:
-            dias_venc = ap.dias_vencido()
-            data2.append({
-                'Documento': ap.documento,
-                'Nombre Completo': f"{ap.nombre} {ap.apellido}",
-                'Ficha': ap.ficha.numero if ap.ficha else '',
-                'Programa': ap.ficha.programa if ap.ficha else '',
-                'Fecha Fin Productiva': ap.fecha_fin_productiva.strftime('%d/%m/%Y') if ap.fecha_fin_productiva else '',
-                'Días Vencido': dias_venc,
-                'Nivel Urgencia': 'CRÍTICO' if dias_venc > 60 else 'MODERADO' if dias_venc > 30 else 'RECIENTE',
-            })
-        
-        df2 = pd.DataFrame(data2)
+        df2 = pd.DataFrame(list(self._filas_productiva_vencida(productiva_vencida)))
         
         ws2['A1'] = "ETAPA PRODUCTIVA VENCIDA"
         ws2['A1'].font = Font(bold=True, size=14, color="d32f2f")
@@ -286,20 +397,7 @@ class GeneradorReportes:
         # ===== HOJA 3: FICHA VENCIDA =====
         ws3 = wb.create_sheet("Ficha Vencida")
         
-        data3 = []
-        for ap in ficha_vencida:
-            dias_venc = ap.dias_vencido()
-            data3.append({
-                'Documento': ap.documento,
-                'Nombre Completo': f"{ap.nombre} {ap.apellido}",
-                'Ficha': ap.ficha.numero if ap.ficha else '',
-                'Programa': ap.ficha.programa if ap.ficha else '',
-                'Fecha Fin Ficha': ap.ficha.fecha_fin.strftime('%d/%m/%Y') if ap.ficha and ap.ficha.fecha_fin else '',
-                'Días Vencido': dias_venc,
-                'Estado': ap.estado_formacion,
-            })
-        
-        df3 = pd.DataFrame(data3)
+        df3 = pd.DataFrame(list(self._filas_ficha_vencida(ficha_vencida)))
         
         ws3['A1'] = "FICHAS VENCIDAS SIN CERTIFICAR"
         ws3['A1'].font = Font(bold=True, size=14, color="f57c00")
@@ -314,57 +412,166 @@ class GeneradorReportes:
         
         self._ajustar_columnas(ws3)
         
-        # Guardar
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-        
-        return output
+        return self._guardar(wb, destino)
 
 
-# Función helper para generar todos los reportes
-def generar_todos_reportes():
+TIPOS_REPORTE = ['inasistencias', 'juicios', 'circular120']
+
+# Retención por defecto de los reportes registrados (se puede sobrescribir en settings)
+RETENCION_DIAS_DEFECTO = 7
+# Un reporte PENDIENTE más viejo que esto ya no se va a generar (tarea perdida o worker caído)
+PENDIENTE_MAX_HORAS_DEFECTO = 24
+RETENCION_MAX_BYTES_DEFECTO = 1024 * 1024 * 1024  # 1 GB
+
+
+def registrar_trabajos_reportes(job_id=None, por_centro=True, fichas=(), origen='MANUAL'):
     """
-    Genera todos los reportes automáticamente y los guarda
-    Retorna: dict con rutas de archivos generados
+    Registra (estado PENDIENTE) los reportes a generar: los tres globales,
+    si por_centro sus variantes para cada centro activo, y las de cada ficha indicada.
+    Retorna: (job_id, lista de ids de ReporteGenerado)
     """
-    generador = GeneradorReportes()
-    reportes_generados = {}
+    job_id = job_id or uuid.uuid4().hex
+    ambitos = [{}]
+    if por_centro:
+        ambitos += [{'centro': c} for c in CentroFormacion.objects.filter(activo=True)]
+    ambitos += [{'ficha': f} for f in fichas]
     
-    # Directorio de reportes
-    reportes_dir = os.path.join(settings.MEDIA_ROOT, 'reportes')
-    os.makedirs(reportes_dir, exist_ok=True)
-    
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    
-    # 1. Reporte de Inasistencias
+    reportes = ReporteGenerado.objects.bulk_create([
+        ReporteGenerado(job_id=job_id, tipo=tipo, origen=origen, **ambito)
+        for ambito in ambitos
+        for tipo in TIPOS_REPORTE
+    ])
+    if not all(r.pk for r in reportes):
+        # Backends sin RETURNING en bulk_create
+        reportes = ReporteGenerado.objects.filter(job_id=job_id)
+    return job_id, [r.pk for r in reportes]
+
+
+def marcar_reportes_error(reporte_ids, error):
+    """Marca ERROR los reportes aún PENDIENTES de reporte_ids (lista o subconsulta). Retorna: número marcados"""
+    return ReporteGenerado.objects.filter(pk__in=reporte_ids, estado='PENDIENTE').update(
+        estado='ERROR', error=error, finalizado=timezone.now()
+    )
+
+
+def fichas_con_casos_abiertos(hoy=None):
+    """Fichas con aprendices por certificar, con productiva vencida o con la ficha vencida"""
+    hoy = hoy or timezone.localdate()
+    # Subconsulta sobre Aprendiz en lugar de JOIN + DISTINCT: cada rama del OR usa su índice
+    casos = Aprendiz.objects.filter(
+        Q(estado_formacion='POR_CERTIFICAR') |
+        Q(estado_formacion='ETAPA_PRODUCTIVA', fecha_fin_productiva__lt=hoy) |
+        (Q(ficha__in=Ficha.objects.filter(fecha_fin__lt=hoy)) & ~Q(estado_formacion__in=ESTADOS_CERRADOS))
+    )
+    return Ficha.objects.filter(numero__in=casos.values('ficha'))
+
+
+def registrar_reportes_nocturnos():
+    """Registra los reportes estándar a precalcular: global, por centro y por ficha con casos abiertos"""
+    return registrar_trabajos_reportes(
+        por_centro=True,
+        fichas=fichas_con_casos_abiertos(),
+        origen='NOCTURNO',
+    )
+
+
+def generar_reporte_registrado(reporte_id):
+    """
+    Genera el archivo de un ReporteGenerado pendiente y lo marca LISTO o ERROR.
+    Es la unidad de trabajo de las tareas Celery y del pool de procesos.
+    Retorna: ruta del archivo (relativa a MEDIA_ROOT) o None si falló
+    """
+    reporte = ReporteGenerado.objects.select_related('centro', 'ficha').get(pk=reporte_id)
     try:
-        excel_inas = generador.generar_reporte_inasistencias()
-        ruta_inas = os.path.join(reportes_dir, f'inasistencias_{timestamp}.xlsx')
-        with open(ruta_inas, 'wb') as f:
-            f.write(excel_inas.read())
-        reportes_generados['inasistencias'] = ruta_inas
+        # La versión se toma antes de generar: si los datos cambian mientras
+        # tanto, el reporte simplemente no se considerará vigente.
+        reporte.version = version_datos()
+        if reporte.ficha:
+            sufijo = f'ficha{reporte.ficha.numero}'
+        else:
+            sufijo = reporte.centro.codigo if reporte.centro else 'general'
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        nombre = f'{reporte.tipo}_{sufijo}_{timestamp}.xlsx'
+        with GeneradorReportes().generar(reporte.tipo, ficha=reporte.ficha, centro=reporte.centro) as excel:
+            reporte.archivo.save(nombre, File(excel, name=nombre), save=False)
+        reporte.tamano = reporte.archivo.size
+        reporte.estado = 'LISTO'
     except Exception as e:
-        reportes_generados['inasistencias_error'] = str(e)
+        reporte.estado = 'ERROR'
+        reporte.error = str(e)
+    reporte.finalizado = timezone.now()
+    reporte.save()
+    return reporte.archivo.name if reporte.estado == 'LISTO' else None
+
+
+def aplicar_retencion_reportes(dias=None, max_bytes=None):
+    """
+    Marca ERROR los reportes PENDIENTES que ya no se van a generar, elimina
+    los registrados (fila y archivo) con más de `dias` de antigüedad, sin
+    importar su estado, y luego los más antiguos hasta que el total ocupe
+    menos de max_bytes.
+    Retorna: número de reportes eliminados
+    """
+    if dias is None:
+        dias = getattr(settings, 'REPORTES_RETENCION_DIAS', RETENCION_DIAS_DEFECTO)
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'REPORTES_RETENCION_MAX_BYTES', RETENCION_MAX_BYTES_DEFECTO)
+    horas = getattr(settings, 'REPORTES_PENDIENTE_MAX_HORAS', PENDIENTE_MAX_HORAS_DEFECTO)
     
-    # 2. Reporte de Juicios
-    try:
-        excel_juicios = generador.generar_reporte_juicios()
-        ruta_juicios = os.path.join(reportes_dir, f'juicios_{timestamp}.xlsx')
-        with open(ruta_juicios, 'wb') as f:
-            f.write(excel_juicios.read())
-        reportes_generados['juicios'] = ruta_juicios
-    except Exception as e:
-        reportes_generados['juicios_error'] = str(e)
+    perdidos = ReporteGenerado.objects.filter(estado='PENDIENTE', created_at__lt=timezone.now() - timedelta(hours=horas))
+    marcar_reportes_error(perdidos.values('pk'), 'No se generó: la tarea se perdió o no había un worker disponible')
     
-    # 3. Reporte Circular 120
-    try:
-        excel_circular = generador.generar_reporte_circular120()
-        ruta_circular = os.path.join(reportes_dir, f'circular120_{timestamp}.xlsx')
-        with open(ruta_circular, 'wb') as f:
-            f.write(excel_circular.read())
-        reportes_generados['circular120'] = ruta_circular
-    except Exception as e:
-        reportes_generados['circular120_error'] = str(e)
+    limite = timezone.now() - timedelta(days=dias)
+    eliminar = list(ReporteGenerado.objects.filter(created_at__lt=limite))
+    
+    vigentes = ReporteGenerado.objects.filter(
+        created_at__gte=limite, estado='LISTO'
+    ).order_by('-created_at').only('pk', 'archivo', 'tamano')
+    total = 0
+    for reporte in vigentes:
+        total += reporte.tamano
+        if total > max_bytes:
+            eliminar.append(reporte)
+    
+    for reporte in eliminar:
+        if reporte.archivo:
+            reporte.archivo.delete(save=False)
+        reporte.delete()
+    return len(eliminar)
+
+
+def _inicializar_worker():
+    """Inicializa Django en procesos hijos (necesario con el método 'spawn')"""
+    import django
+    django.setup()
+
+
+def generar_reportes_en_paralelo(reporte_ids, procesos=None):
+    """
+    Genera los reportes registrados en un pool de procesos.
+    Retorna: dict {reporte_id: ruta o None}
+    """
+    # Las conexiones abiertas no deben heredarse en los procesos hijos
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_worker) as pool:
+        return dict(zip(reporte_ids, pool.map(generar_reporte_registrado, reporte_ids)))
+
+
+# Función helper para generar todos los reportes
+def generar_todos_reportes(procesos=None, por_centro=False):
+    """
+    Genera todos los reportes en paralelo y los registra en ReporteGenerado
+    Retorna: dict con rutas de archivos generados
+    """
+    job_id, reporte_ids = registrar_trabajos_reportes(por_centro=por_centro)
+    generar_reportes_en_paralelo(reporte_ids, procesos=procesos)
+    
+    reportes_generados = {}
+    for reporte in ReporteGenerado.objects.filter(job_id=job_id).select_related('centro'):
+        clave = reporte.tipo if not reporte.centro else f'{reporte.tipo}_{reporte.centro.codigo}'
+        if reporte.estado == 'LISTO':
+            reportes_generados[clave] = reporte.archivo.path
+        else:
+            reportes_generados[f'{clave}_error'] = reporte.error
     
-    return reportes_generados
\ No newline at end of file
+    return reportes_generados
@@ -0,0 +1,381 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from aprendices.models import ESTADOS_CERRADOS, Aprendiz, AprendizResultado, Ficha, Inasistencia, ResumenEstadisticas
+from aprendices.utils.cache_reportes import incrementar_version_datos
+from aprendices.utils.cache_vistas import invalidar_vistas
+from aprendices.utils.contadores import actualizar_contadores
+
+
+CLAVE_GLOBAL = 'global'
+CLAVE_SIN_FICHA = 'ficha:-'
+
+# Conteos que se suman de las fichas a su centro y al global
+CAMPOS_CONTEO = [
+    'total_aprendices', 'total_inasistencias', 'inasistencias_justificadas',
+    'juicios_pendientes', 'productiva_vencida', 'ficha_vencida', 'casos_urgentes',
+    'total_fichas', 'fichas_activas', 'fichas_vencidas',
+]
+
+_estado = threading.local()
+
+
+def clave_ficha(numero):
+    return f'ficha:{numero}' if numero else CLAVE_SIN_FICHA
+
+
+def clave_centro(centro_id):
+    return f'centro:{centro_id}'
+
+
+def conteos_aprendices(hoy):
+    """Conteos condicionales sobre Aprendiz (con el JOIN a ficha) para aggregate/annotate"""
+    hace_30 = hoy - timedelta(days=30)
+    conteos = {
+        'total_aprendices': Count('pk'),
+        'productiva_vencida': Count('pk', filter=Q(
+            estado_formacion='ETAPA_PRODUCTIVA', fecha_fin_productiva__lt=hoy
+        )),
+        'ficha_vencida': Count('pk', filter=Q(ficha__fecha_fin__lt=hoy) & ~Q(estado_formacion='CERTIFICADO')),
+        'casos_urgentes': Count('pk', filter=(
+            Q(ficha__fecha_fin__lt=hace_30) | Q(fecha_fin_productiva__lt=hace_30)
+        ) & ~Q(estado_formacion__in=ESTADOS_CERRADOS)),
+    }
+    for estado, _ in Aprendiz.ESTADO_FORMACION_CHOICES:
+        conteos[f'estado_{estado}'] = Count('pk', filter=Q(estado_formacion=estado))
+    return conteos
+
+
+def _valores_vacios():
+    valores = dict.fromkeys(CAMPOS_CONTEO, 0)
+    valores['por_estado'] = {}
+    return valores
+
+
+def calcular_resumenes_fichas(numeros=None, hoy=None):
+    """
+    Calcula desde cero los conteos de las fichas indicadas (None en la lista
+    = aprendices sin ficha; numeros=None = todas) con una consulta agrupada
+    por tabla.
+
+    Retorna: dict {numero o None: (centro_id, valores)}
+    """
+    hoy = hoy or timezone.localdate()
+
+    def por_ficha(campo):
+        if numeros is None:
+            return Q()
+        filtro = Q(**{f'{campo}__in': [n for n in numeros if n]})
+        if None in numeros:
+            filtro |= Q(**{f'{campo}__isnull': True})
+        return filtro
+
+    resultados = {}
+    fichas = Ficha.objects.all() if numeros is None else Ficha.objects.filter(numero__in=[n for n in numeros if n])
+    for numero, centro_id, fecha_fin in fichas.values_list('numero', 'centro_id', 'fecha_fin'):
+        valores = _valores_vacios()
+        valores['total_fichas'] = 1
+        valores['fichas_activas'] = int(bool(fecha_fin and fecha_fin >= hoy))
+        valores['fichas_vencidas'] = int(bool(fecha_fin and fecha_fin < hoy))
+        resultados[numero] = (centro_id, valores)
+    if numeros is None or None in numeros:
+        resultados[None] = (None, _valores_vacios())
+
+    filas = Aprendiz.objects.filter(por_ficha('ficha')).order_by().values('ficha').annotate(**conteos_aprendices(hoy))
+    for fila in filas:
+        if fila['ficha'] not in resultados:
+            continue
+        valores = resultados[fila['ficha']][1]
+        for campo in ('total_aprendices', 'productiva_vencida', 'ficha_vencida', 'casos_urgentes'):
+            valores[campo] = fila[campo]
+        valores['por_estado'] = {
+            estado: fila[f'estado_{estado}']
+            for estado, _ in Aprendiz.ESTADO_FORMACION_CHOICES
+            if fila[f'estado_{estado}']
+        }
+
+    filas = Inasistencia.objects.filter(por_ficha('ficha')).order_by().values('ficha').annotate(
+        total=Count('pk'),
+        justificadas=Count('pk', filter=Q(justificada=True)),
+    )
+    for fila in filas:
+        if fila['ficha'] in resultados:
+            valores = resultados[fila['ficha']][1]
+            valores['total_inasistencias'] = fila['total']
+            valores['inasistencias_justificadas'] = fila['justificadas']
+
+    filas = AprendizResultado.objects.filter(
+        por_ficha('aprendiz__ficha'), estado='PENDIENTE'
+    ).order_by().values('aprendiz__ficha').annotate(total=Count('pk'))
+    for fila in filas:
+        if fila['aprendiz__ficha'] in resultados:
+            resultados[fila['aprendiz__ficha']][1]['juicios_pendientes'] = fila['total']
+
+    return resultados
+
+
+def _sumar(destino, valores, signo=1):
+    for campo in CAMPOS_CONTEO:
+        destino[campo] = destino.get(campo, 0) + signo * valores[campo]
+    por_estado = Counter(destino.get('por_estado') or {})
+    por_estado.update({estado: signo * total for estado, total in valores['por_estado'].items()})
+    destino['por_estado'] = {estado: total for estado, total in por_estado.items() if total}
+
+
+def _valores(resumen):
+    valores = {campo: getattr(resumen, campo) for campo in CAMPOS_CONTEO}
+    valores['por_estado'] = resumen.por_estado
+    return valores
+
+
+def reconstruir_resumenes(hoy=None):
+    """
+    Recalcula desde cero todos los resúmenes (fichas, centros y global).
+    Se usa a diario (los conteos de vencidos dependen de la fecha) y para reparar.
+    """
+    hoy = hoy or timezone.localdate()
+    resultados = calcular_resumenes_fichas(None, hoy)
+
+    resumenes = []
+    centros = {}
+    total = _valores_vacios()
+    for numero, (centro_id, valores) in resultados.items():
+        resumenes.append(ResumenEstadisticas(
+            clave=clave_ficha(numero), ambito='FICHA', ficha_id=numero, centro_id=centro_id,
+            fecha_calculo=hoy, **valores
+        ))
+        if centro_id:
+            _sumar(centros.setdefault(centro_id, _valores_vacios()), valores)
+        _sumar(total, valores)
+    for centro_id, valores in centros.items():
+        resumenes.append(ResumenEstadisticas(
+            clave=clave_centro(centro_id), ambito='CENTRO', centro_id=centro_id,
+            fecha_calculo=hoy, **valores
+        ))
+
+    with transaction.atomic():
+        # La fila global se bloquea y se actualiza en su sitio: dos reconstrucciones
+        # (de cualquier proceso) no se mezclan ni chocan en la clave única
+        ResumenEstadisticas.objects.select_for_update().filter(clave=CLAVE_GLOBAL).first()
+        ResumenEstadisticas.objects.exclude(clave=CLAVE_GLOBAL).delete()
+        ResumenEstadisticas.objects.bulk_create(resumenes, batch_size=500)
+        ResumenEstadisticas.objects.update_or_create(
+            clave=CLAVE_GLOBAL, defaults=dict(ambito='GLOBAL', centro=None, ficha=None, fecha_calculo=hoy, **total)
+        )
+    invalidar_vistas()
+    return len(resumenes) + 1
+
+
+def actualizar_resumenes(numeros, hoy=None):
+    """
+    Recalcula los resúmenes de las fichas indicadas (None = sin ficha) y
+    aplica la diferencia con el valor anterior a su centro y al global,
+    sin recorrer el resto de fichas.
+    """
+    hoy = hoy or timezone.localdate()
+    numeros = set(numeros)
+
+    global_ = ResumenEstadisticas.objects.filter(clave=CLAVE_GLOBAL).first()
+    if global_ is None or global_.fecha_calculo != hoy:
+        # Cambió el día: los conteos de vencidos de todas las fichas están desactualizados.
+        # Si otro proceso ya reconstruyó los de hoy, se aplica solo el cambio de estas fichas
+        if reconstruir_con_bloqueo(hoy) is not None:
+            return
+
+    with transaction.atomic():
+        nuevos = calcular_resumenes_fichas(list(numeros), hoy)
+        anteriores = {
+            r.clave: r for r in ResumenEstadisticas.objects.select_for_update().filter(
+                clave__in=[clave_ficha(n) for n in numeros]
+            )
+        }
+
+        deltas = {}
+        for numero in numeros:
+            anterior = anteriores.get(clave_ficha(numero))
+            centro_id, valores = nuevos.get(numero, (None, None))
+            if anterior is not None:
+                _sumar(deltas.setdefault(anterior.centro_id, _valores_vacios()), _valores(anterior), -1)
+            if valores is not None:
+                _sumar(deltas.setdefault(centro_id, _valores_vacios()), valores)
+                ResumenEstadisticas.objects.update_or_create(
+                    clave=clave_ficha(numero),
+                    defaults=dict(ambito='FICHA', ficha_id=numero, centro_id=centro_id, fecha_calculo=hoy, **valores),
+                )
+            elif anterior is not None:
+                # La ficha ya no existe
+                anterior.delete()
+
+        total = _valores_vacios()
+        for centro_id, delta in deltas.items():
+            _sumar(total, delta)
+            if centro_id:
+                _aplicar_delta(clave_centro(centro_id), 'CENTRO', delta, hoy, centro_id=centro_id)
+        _aplicar_delta(CLAVE_GLOBAL, 'GLOBAL', total, hoy)
+
+        # Centros eliminados
+        ResumenEstadisticas.objects.filter(ambito='CENTRO', centro__isnull=True).delete()
+
+
+def _aplicar_delta(clave, ambito, delta, hoy, centro_id=None):
+    resumen = ResumenEstadisticas.objects.select_for_update().filter(clave=clave).first()
+    if resumen is None:
+        resumen = ResumenEstadisticas(clave=clave, ambito=ambito, centro_id=centro_id)
+    valores = _valores(resumen) if resumen.pk else _valores_vacios()
+    _sumar(valores, delta)
+    for campo, valor in valores.items():
+        setattr(resumen, campo, valor)
+    resumen.fecha_calculo = hoy
+    resumen.save()
+
+
+def obtener_resumen(clave=CLAVE_GLOBAL):
+    """
+    Resumen guardado para la clave (ver clave_ficha / clave_centro). Es una
+    lectura: el cambio de día lo aplica la tarea diaria (o el primer cambio de
+    datos del día), aunque el resumen sea de ayer se sirve tal cual. Solo si
+    nunca se han calculado (base recién creada) se reconstruyen aquí, un
+    proceso a la vez.
+    """
+    resumen = ResumenEstadisticas.objects.filter(clave=clave).first()
+    if resumen is None and clave != CLAVE_GLOBAL and ResumenEstadisticas.objects.filter(clave=CLAVE_GLOBAL).exists():
+        # Ámbito sin datos (por ejemplo, un centro sin fichas)
+        return _resumen_vacio(clave)
+    if resumen is None:
+        # Los calcula esta petición o los acaba de calcular otro proceso
+        reconstruir_con_bloqueo()
+        resumen = ResumenEstadisticas.objects.filter(clave=clave).first() or _resumen_vacio(clave)
+    return resumen
+
+
+def _resumen_vacio(clave):
+    return ResumenEstadisticas(clave=clave, fecha_calculo=timezone.localdate(), **_valores_vacios())
+
+
+def reconstruir_con_bloqueo(hoy=None):
+    """
+    reconstruir_resumenes() con la fila del resumen global bloqueada
+    (select_for_update): la tarea diaria, los workers y las peticiones de
+    cualquier proceso se turnan, y quien esperaba no repite la reconstrucción
+    si al obtener el bloqueo los resúmenes ya son de hoy.
+    Retorna: número de resúmenes, o None si otro proceso ya los reconstruyó
+    """
+    hoy = hoy or timezone.localdate()
+    try:
+        with transaction.atomic():
+            global_ = ResumenEstadisticas.objects.select_for_update().filter(clave=CLAVE_GLOBAL).first()
+            if global_ is not None and global_.fecha_calculo == hoy:
+                return None
+            return reconstruir_resumenes(hoy)
+    except IntegrityError:
+        # Sin fila global que bloquear (base nueva), otro proceso insertó los resúmenes a la vez
+        return None
+
+
+# ── Actualización diferida ──────────────────────────────────────────
+
+def _pendientes():
+    if not hasattr(_estado, 'fichas'):
+        _estado.fichas = set()
+        _estado.aprendices = set()
+        _estado.contadores = set()
+        _estado.lotes = 0
+    return _estado
+
+
+def marcar_fichas(numeros):
+    """Marca fichas cuyos resúmenes deben recalcularse (None = aprendices sin ficha)"""
+    pendientes = _pendientes()
+    pendientes.fichas.update(numeros)
+    _programar(pendientes)
+
+
+def marcar_aprendices(documentos):
+    """Marca las fichas de estos aprendices (se resuelven al aplicar, en una consulta)"""
+    pendientes = _pendientes()
+    pendientes.aprendices.update(documentos)
+    _programar(pendientes)
+
+
+def marcar_contadores(documentos):
+    """
+    Recalcula los contadores de estos aprendices (Aprendiz.juicios_pendientes,
+    total_inasistencias...). Fuera de un lote se hace de inmediato, dentro de
+    la misma transacción que el cambio; dentro de un lote, al cerrarlo.
+    """
+    pendientes = _pendientes()
+    if pendientes.lotes:
+        pendientes.contadores.update(documentos)
+    else:
+        actualizar_contadores(documentos)
+
+
+def _programar(pendientes):
+    # Dentro de un lote se aplica al final; si no, al confirmar la transacción
+    if not pendientes.lotes:
+        transaction.on_commit(aplicar_pendientes)
+
+
+def aplicar_pendientes():
+    """
+    Recalcula los resúmenes de todas las fichas marcadas, incrementa la
+    versión de los reportes e invalida el cache de vistas. Corre tras
+    confirmar cualquier cambio de Aprendiz, Ficha, Inasistencia o
+    AprendizResultado, y al cerrar cada lote de importación.
+    """
+    pendientes = _pendientes()
+    fichas, aprendices = set(pendientes.fichas), set(pendientes.aprendices)
+    pendientes.fichas.clear()
+    pendientes.aprendices.clear()
+    _aplicar(fichas, aprendices)
+
+
+def _aplicar(fichas, aprendices, contadores=()):
+    if contadores:
+        actualizar_contadores(contadores)
+    if aprendices:
+        fichas = fichas | set(
+            Aprendiz.objects.filter(documento__in=aprendices).values_list('ficha_id', flat=True).distinct()
+        )
+    if fichas:
+        actualizar_resumenes(fichas)
+    incrementar_version_datos()
+    invalidar_vistas()
+
+
+@contextmanager
+def lote_resumenes():
+    """
+    Agrupa las actualizaciones de resúmenes de una importación: mientras está
+    activo, las señales solo marcan fichas y el recálculo se hace una vez al
+    final (al confirmar la transacción, si hay una abierta). Los contadores
+    por aprendiz se recalculan al salir del lote, antes de confirmar.
+
+    Al salir del lote más externo, aun con error, lo marcado sale del estado
+    del hilo: no queda para la siguiente petición que atienda. Si el lote
+    falló, todo se aplica solo si sus cambios llegan a confirmarse.
+    """
+    pendientes = _pendientes()
+    pendientes.lotes += 1
+    completo = False
+    try:
+        yield
+        completo = True
+    finally:
+        pendientes.lotes -= 1
+        if not pendientes.lotes:
+            fichas, aprendices = set(pendientes.fichas), set(pendientes.aprendices)
+            documentos = set(pendientes.contadores)
+            pendientes.fichas.clear()
+            pendientes.aprendices.clear()
+            pendientes.contadores.clear()
+            if completo and documentos:
+                actualizar_contadores(documentos)
+                documentos = set()
+            transaction.on_commit(partial(_aplicar, fichas, aprendices, documentos))
@@ -1,163 +1,283 @@
 # aprendices/views.py
 import os
+from urllib.parse import urlencode
 from datetime import date, timedelta
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, CreateView, UpdateView, DetailView, TemplateView, View
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q
+from django.db.models import Count, Q, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_POST
 from django.conf import settings
 from django.contrib import messages
+from django.core.paginator import Paginator
 from django.core.management import call_command
-from .models import Aprendiz, Ficha, Inasistencia, Competencia, ResultadoAprendizaje, AprendizResultado, ActaComite
-from .forms import AprendizForm, InasistenciaForm, UploadFileForm, UploadFileWithDatesForm
-from django.http import HttpResponse, FileResponse
-from aprendices.utils.reportes import GeneradorReportes, generar_todos_reportes
+from .models import ESTADOS_CERRADOS, URGENCIA_CRITICO, URGENCIA_MODERADO, URGENCIA_RECIENTE
+from .models import Aprendiz, Ficha, Inasistencia, Competencia, ResultadoAprendizaje, AprendizResultado, ActaComite, ReporteGenerado, CentroFormacion
+from .forms import AprendizForm, AutocompletarWidget, InasistenciaForm, UploadFileForm, UploadFileWithDatesForm
+from django.http import HttpResponse, FileResponse, JsonResponse, StreamingHttpResponse
+from aprendices.utils.reportes import GeneradorReportes, filtros_circular120
+from aprendices.utils.cache_reportes import obtener_reporte
+from aprendices.utils.busqueda import buscar_aprendices
+from aprendices.utils.cache_vistas import en_cache, respuesta_en_cache
+from aprendices.utils.estados import cambiar_estado_aprendices
+from aprendices.utils.exportar import ExportarListaMixin, formato_solicitado, respuesta_exportacion
+from aprendices.utils.paginacion import PaginacionKeysetMixin, paginar_keyset, respuesta_pagina
+from aprendices.utils.paquete_reportes import flujo_paquete_centro
+from aprendices.utils.resumenes import lote_resumenes, obtener_resumen
+from aprendices.tasks import lanzar_generacion_reportes
 import mimetypes
 
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+def metricas_dashboard():
+    """Métricas del dashboard, leídas del resumen global precalculado (ResumenEstadisticas)"""
+    resumen = obtener_resumen()
+    return {
+        'total_aprendices': resumen.total_aprendices,
+        'total_fichas': resumen.total_fichas,
+        'total_inasistencias': resumen.total_inasistencias,
+        'por_certificar': resumen.total_estado('POR_CERTIFICAR'),
+        'productiva_vencida': resumen.productiva_vencida,
+        'ficha_vencida': resumen.ficha_vencida,
+        'casos_urgentes': resumen.casos_urgentes,
+        'por_estado': resumen.distribucion_estados,
+    }
+
+
 @login_required
 def dashboard(request):
-    hoy = timezone.now().date()
+    return render(request, 'aprendices/dashboard.html', en_cache('dashboard', contexto_dashboard, usuario=request.user))
 
-    total_aprendices = Aprendiz.objects.count()
-    total_fichas = Ficha.objects.count()
-    total_inasistencias = Inasistencia.objects.count()
 
-    por_certificar = Aprendiz.objects.filter(estado_formacion='POR_CERTIFICAR')
+def contexto_dashboard():
+    hoy = timezone.localdate()
+    hace_30 = hoy - timedelta(days=30)
 
-    productiva_vencida = Aprendiz.objects.filter(
-        estado_formacion='ETAPA_PRODUCTIVA',
-        fecha_fin_productiva__lt=hoy
-    )
+    context = metricas_dashboard()
+
+    # Primeros 10 casos urgentes para mostrar. Las fichas vencidas van como
+    # subconsulta (no como JOIN) para que el OR use un índice por rama
+    context['lista_urgentes'] = list(Aprendiz.objects.filter(
+        Q(ficha__in=Ficha.objects.filter(fecha_fin__lt=hace_30)) |
+        Q(fecha_fin_productiva__lt=hace_30)
+    ).exclude(
+        estado_formacion__in=ESTADOS_CERRADOS
+    ).select_related('ficha').con_vencimiento(hoy)[:10])
+    return context
 
-    ficha_vencida = Aprendiz.objects.filter(
-        ficha__fecha_fin__lt=hoy
-    ).exclude(estado_formacion='CERTIFICADO')
-
-    casos_urgentes = Aprendiz.objects.filter(
-        Q(ficha__fecha_fin__lt=hoy - timedelta(days=30)) |
-        Q(fecha_fin_productiva__lt=hoy - timedelta(days=30))
-    ).exclude(estado_formacion='CERTIFICADO').exclude(estado_formacion='CANCELADO')
-
-    # Distribución por estado
-    por_estado = Aprendiz.objects.values('estado_formacion').annotate(total=Count('documento'))
-
-    context = {
-        'total_aprendices': total_aprendices,
-        'total_fichas': total_fichas,
-        'total_inasistencias': total_inasistencias,
-        'por_certificar': por_certificar.count(),
-        'productiva_vencida': productiva_vencida.count(),
-        'ficha_vencida': ficha_vencida.count(),
-        'casos_urgentes': casos_urgentes.count(),
-        'por_estado': por_estado,
-        'lista_urgentes': casos_urgentes[:10],  # Primeros 10 para mostrar
-    }
-    
-    return render(request, 'aprendices/dashboard.html', context)
+
+# Orden de los listados paginados (el último campo es único)
+ORDEN_POR_CERTIFICAR = ['orden_fecha', 'documento']
+ORDEN_VENCIDOS = ['-dias_vencidos', 'documento']
+SECCIONES_VENCIDOS = {
+    'urgentes':  URGENCIA_CRITICO,
+    'moderados': URGENCIA_MODERADO,
+    'recientes': URGENCIA_RECIENTE,
+}
 
 
 @login_required
 def casos_por_certificar(request):
     aprendices = Aprendiz.objects.filter(
         estado_formacion='POR_CERTIFICAR'
-    ).select_related('ficha').order_by('fecha_fin_productiva')
-    
-    return render(request, 'aprendices/casos_por_certificar.html', {
-        'aprendices': aprendices,
-        'total': aprendices.count()
-    })
+    ).select_related('ficha').annotate(
+        # Sin fecha de fin de productiva al final
+        orden_fecha=Coalesce('fecha_fin_productiva', Value(date.max))
+    )
+    despues = request.GET.get('despues')
+
+    # "Cargar más": solo las tarjetas siguientes
+    if despues:
+        return respuesta_en_cache('por_certificar:tarjetas', request, lambda: respuesta_pagina(
+            request, 'aprendices/casos_por_certificar_tarjetas.html',
+            paginar_keyset(aprendices, ORDEN_POR_CERTIFICAR, despues),
+        ))
+
+    return render(request, 'aprendices/casos_por_certificar.html', en_cache('por_certificar', lambda: {
+        'aprendices': paginar_keyset(aprendices, ORDEN_POR_CERTIFICAR),
+        'total': obtener_resumen().total_estado('POR_CERTIFICAR')
+    }, usuario=request.user))
 
 
 @login_required
 def casos_vencidos(request):
-    hoy = timezone.now().date()
+    hoy = timezone.localdate()
 
     aprendices_vencidos = Aprendiz.objects.filter(
         estado_formacion='EN_FORMACION'          
     ).filter(
         Q(ficha__fecha_fin__lt=hoy) |
         Q(fecha_fin_productiva__lt=hoy)
-    ).select_related('ficha')
-
-    urgentes  = []
-    moderados = []
-    recientes = []
-
-    for aprendiz in aprendices_vencidos:
-        dias = aprendiz.dias_vencido()
-        if dias > 60:
-            urgentes.append(aprendiz)
-        elif dias > 30:
-            moderados.append(aprendiz)
-        else:
-            recientes.append(aprendiz)
-
-    return render(request, 'aprendices/casos_vencidos.html', {
-        'urgentes':  urgentes,
-        'moderados': moderados,
-        'recientes': recientes,
-        'total': len(urgentes) + len(moderados) + len(recientes)
-    })
+    ).select_related('ficha').con_vencimiento(hoy)
+
+    # "Cargar más" de una sección: solo las filas siguientes
+    seccion = request.GET.get('seccion')
+    if seccion in SECCIONES_VENCIDOS:
+        pagina = paginar_keyset(
+            aprendices_vencidos.filter(nivel_urgencia=SECCIONES_VENCIDOS[seccion]),
+            ORDEN_VENCIDOS,
+            request.GET.get('despues'),
+        )
+        return respuesta_pagina(request, 'aprendices/casos_vencidos_filas.html', pagina, {'seccion': seccion})
 
-@login_required
-def reporte_circular120(request):
-    hoy = timezone.now().date()
+    # Clasificación y conteo por nivel de urgencia en la BD (una consulta agrupada)
+    conteos = dict(
+        aprendices_vencidos.order_by().values_list('nivel_urgencia').annotate(total=Count('pk'))
+    )
 
-    por_certificar = Aprendiz.objects.filter(
-        estado_formacion='POR_CERTIFICAR'
-    ).select_related('ficha')
+    contexto = {'total': sum(conteos.values())}
+    for seccion, nivel in SECCIONES_VENCIDOS.items():
+        contexto[f'total_{seccion}'] = conteos.get(nivel, 0)
+        contexto[seccion] = paginar_keyset(
+            aprendices_vencidos.filter(nivel_urgencia=nivel), ORDEN_VENCIDOS
+        ) if conteos.get(nivel) else []
 
-    productiva_vencida = Aprendiz.objects.filter(
-        estado_formacion='ETAPA_PRODUCTIVA',
-        fecha_fin_productiva__lt=hoy
-    ).select_related('ficha')
+    return render(request, 'aprendices/casos_vencidos.html', contexto)
 
-    ficha_vencida = Aprendiz.objects.filter(
-        ficha__fecha_fin__lt=hoy,
-        estado_formacion='EN_FORMACION'          
-    ).select_related('ficha')
+@login_required
+def reporte_circular120(request):
+    hoy = timezone.localdate()
+
+    # Las mismas secciones que el reporte descargable (Excel / "Todos los casos" en CSV)
+    filtros = filtros_circular120(hoy)
+    secciones = {
+        'por_certificar': (
+            Aprendiz.objects.filter(filtros['por_certificar']).select_related('ficha').annotate(
+                orden_fecha=Coalesce('fecha_fin_productiva', Value(date.max))
+            ),
+            ORDEN_POR_CERTIFICAR,
+        ),
+        'productiva_vencida': (
+            Aprendiz.objects.filter(filtros['productiva_vencida']).select_related('ficha').con_vencimiento(hoy),
+            ORDEN_VENCIDOS,
+        ),
+        'ficha_vencida': (
+            Aprendiz.objects.filter(filtros['ficha_vencida']).select_related('ficha').con_vencimiento(hoy),
+            ORDEN_VENCIDOS,
+        ),
+    }
 
-    return render(request, 'aprendices/reporte_circular120.html', {
-        'por_certificar':     por_certificar,
-        'productiva_vencida': productiva_vencida,
-        'ficha_vencida':      ficha_vencida,
-        'fecha_generacion':   hoy,
-    })
+    # "Cargar más" de una sección: solo las filas siguientes
+    seccion = request.GET.get('seccion')
+    if seccion in secciones:
+        queryset, orden = secciones[seccion]
+        try:
+            inicio = max(int(request.GET.get('inicio', 0)), 0)
+        except ValueError:
+            inicio = 0
+        return respuesta_en_cache('circular120:filas', request, lambda: respuesta_pagina(
+            request, 'aprendices/reporte_circular120_filas.html',
+            paginar_keyset(queryset, orden, request.GET.get('despues')), {'seccion': seccion, 'inicio': inicio},
+        ))
+
+    def calcular():
+        # Los tres totales en una sola consulta, que solo recorre las filas de alguna sección
+        conteos = Aprendiz.objects.filter(
+            filtros['por_certificar'] | filtros['productiva_vencida'] | filtros['ficha_vencida']
+        ).aggregate(**{
+            f'total_{nombre}': Count('pk', filter=filtro) for nombre, filtro in filtros.items()
+        })
+
+        contexto = dict(conteos, fecha_generacion=hoy, inicio=0)
+        contexto['total_casos'] = sum(conteos.values())
+        for nombre, (queryset, orden) in secciones.items():
+            contexto[nombre] = paginar_keyset(queryset, orden) if conteos[f'total_{nombre}'] else []
+        return contexto
+
+    return render(request, 'aprendices/reporte_circular120.html', en_cache('circular120', calcular, usuario=request.user))
 
 @login_required
+@require_POST
 def aprobar_certificacion(request, documento):
-    aprendiz = get_object_or_404(Aprendiz, documento=documento)
-    aprendiz.estado_formacion = 'CERTIFICADO'
-    aprendiz.save()
+    aprendiz = get_object_or_404(Aprendiz.objects.only('nombre', 'apellido'), documento=documento)
+    cambiar_estado_aprendices(Aprendiz.objects.filter(pk=aprendiz.pk), 'CERTIFICADO', request.user)
     messages.success(request, f'Aprendiz {aprendiz.nombre} {aprendiz.apellido} marcado como CERTIFICADO')
     return redirect('casos_por_certificar')
 
 
 @login_required
+@require_POST
 def cancelar_aprendiz(request, documento):
-    aprendiz = get_object_or_404(Aprendiz, documento=documento)
-    aprendiz.estado_formacion = 'CANCELADO'
-    aprendiz.save()
+    aprendiz = get_object_or_404(Aprendiz.objects.only('nombre', 'apellido'), documento=documento)
+    cambiar_estado_aprendices(Aprendiz.objects.filter(pk=aprendiz.pk), 'CANCELADO', request.user)
     messages.warning(request, f'Aprendiz {aprendiz.nombre} {aprendiz.apellido} marcado como CANCELADO')
     return redirect('casos_vencidos')
 
 
-class AprendizListView(LoginRequiredMixin, ListView):
+@login_required
+@require_POST
+def certificar_lote(request):
+    """Certifica los aprendices seleccionados (documentos) o todos los POR_CERTIFICAR de una ficha"""
+    ficha = request.POST.get('ficha', '').strip()
+    documentos = request.POST.getlist('documentos')
+    if ficha:
+        aprendices = Aprendiz.objects.filter(ficha_id=ficha, estado_formacion='POR_CERTIFICAR')
+    elif documentos:
+        # Un aprendiz cancelado no se certifica por lote
+        aprendices = Aprendiz.objects.filter(documento__in=documentos).exclude(estado_formacion__in=ESTADOS_CERRADOS)
+    else:
+        messages.warning(request, 'No se seleccionó ningún aprendiz')
+        return redirect('casos_por_certificar')
+    
+    total = cambiar_estado_aprendices(aprendices, 'CERTIFICADO', request.user)
+    messages.success(request, f'{total} aprendices marcados como CERTIFICADO')
+    return redirect('casos_por_certificar')
+
+
+@login_required
+@require_POST
+def cancelar_lote(request):
+    """Cancela los aprendices seleccionados (documentos), excepto los ya certificados"""
+    documentos = request.POST.getlist('documentos')
+    if not documentos:
+        messages.warning(request, 'No se seleccionó ningún aprendiz')
+        return redirect('casos_vencidos')
+    
+    aprendices = Aprendiz.objects.filter(documento__in=documentos).exclude(estado_formacion__in=ESTADOS_CERRADOS)
+    total = cambiar_estado_aprendices(aprendices, 'CANCELADO', request.user)
+    messages.warning(request, f'{total} aprendices marcados como CANCELADO')
+    return redirect('casos_vencidos')
+
+
+class AprendizListView(LoginRequiredMixin, PaginacionKeysetMixin, ExportarListaMixin, ListView):
     model = Aprendiz
     template_name = 'aprendices/aprendiz_list.html'
     paginate_by = 50
-    ordering = ['-created_at']
+    conteo_maximo = 10000
+    nombre_exportacion = 'aprendices'
+    columnas_exportacion = [
+        ('Documento', 'documento'),
+        ('Nombre', 'nombre'),
+        ('Apellido', 'apellido'),
+        ('Email', 'email'),
+        ('Teléfono', 'telefono'),
+        ('Estado', 'estado_formacion'),
+        ('Ficha', 'ficha__numero'),
+        ('Programa', 'ficha__programa'),
+        ('Fecha Inicio', 'fecha_inicio'),
+        ('Fecha Final', 'fecha_final'),
+        ('Fecha Fin Productiva', 'fecha_fin_productiva'),
+        ('Juicios Pendientes', 'juicios_pendientes'),
+        ('Juicios Aprobados', 'juicios_aprobados'),
+        ('Juicios No Aprobados', 'juicios_no_aprobados'),
+        ('Inasistencias', 'total_inasistencias'),
+        ('Inasistencias sin Justificar', 'inasistencias_injustificadas'),
+    ]
+    # ?orden=...: los contadores son columnas indexadas de Aprendiz, sin JOIN ni GROUP BY
+    ordenes = {
+        'juicios': ['-juicios_pendientes', 'apellido', 'nombre', 'documento'],
+        'inasistencias': ['-inasistencias_injustificadas', 'apellido', 'nombre', 'documento'],
+    }
+    orden_keyset = ['apellido', 'nombre', 'documento']
     
     def get_queryset(self):
-        qs = Aprendiz.objects.select_related('ficha').annotate(
-            juicios_pendientes=Count(
-                'juicios',
-                filter=Q(juicios__estado='PENDIENTE')
-            )
-        )
+        qs = Aprendiz.objects.select_related('ficha')
 
         self.filtro_ficha = self.request.GET.get('ficha', '').strip()
         if self.filtro_ficha:
@@ -167,14 +287,33 @@ class AprendizListView(LoginRequiredMixin, ListView):
         if self.filtro_estado:
             qs = qs.filter(estado_formacion=self.filtro_estado)
 
-        return qs.order_by('apellido', 'nombre')
+        self.filtro_q = self.request.GET.get('q', '').strip()
+        if self.filtro_q:
+            qs = buscar_aprendices(qs, self.filtro_q)
+
+        self.orden = self.request.GET.get('orden', '')
+        return qs.order_by(*self.get_orden_keyset())
+
+    def get_orden_keyset(self):
+        return self.ordenes.get(getattr(self, 'orden', ''), self.orden_keyset)
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx['fichas'] = Ficha.objects.order_by('numero')
+        ctx['campo_ficha'] = AutocompletarWidget('autocompletar_fichas', Ficha, attrs={'class': 'fm-select'}).render(
+            'ficha', getattr(self, 'filtro_ficha', ''), attrs={'id': 'filtroFicha'}
+        )
         ctx['estados'] = Aprendiz.ESTADO_FORMACION_CHOICES
         ctx['filtro_ficha'] = getattr(self, 'filtro_ficha', '')
         ctx['filtro_estado'] = getattr(self, 'filtro_estado', '')
+        ctx['filtro_q'] = getattr(self, 'filtro_q', '')
+        ctx['orden'] = getattr(self, 'orden', '')
+        ctx['filtros_query'] = urlencode({
+            campo: valor for campo, valor in [
+                ('q', ctx['filtro_q']), ('ficha', ctx['filtro_ficha']),
+                ('estado', ctx['filtro_estado']), ('orden', ctx['orden']),
+            ]
+            if valor
+        })
         return ctx
     
 class AprendizCreateView(LoginRequiredMixin, CreateView):
@@ -192,6 +331,36 @@ class AprendizUpdateView(LoginRequiredMixin, UpdateView):
 class AprendizDetailView(LoginRequiredMixin, DetailView):
     model = Aprendiz
     template_name = 'aprendices/aprendiz_detail.html'
+    inasistencias_por_pagina = 20
+
+    def get_queryset(self):
+        return Aprendiz.objects.select_related('ficha')
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        # Historial paginado: un COUNT y una página con su ficha, ordenada por fecha
+        inasistencias = self.object.inasistencias.select_related('ficha').order_by('-fecha', '-pk')
+        ctx['inasistencias'] = Paginator(inasistencias, self.inasistencias_por_pagina).get_page(
+            self.request.GET.get('page')
+        )
+        ctx['juicios_por_competencia'] = resumen_juicios(self.object)
+        return ctx
+
+
+def resumen_juicios(aprendiz):
+    """Juicios del aprendiz agrupados por competencia, en una sola consulta"""
+    return list(
+        AprendizResultado.objects.filter(aprendiz=aprendiz)
+        .values('resultado__competencia__codigo', 'resultado__competencia__nombre')
+        .annotate(
+            total=Count('pk'),
+            aprobados=Count('pk', filter=Q(estado='APROBADO')),
+            pendientes=Count('pk', filter=Q(estado='PENDIENTE')),
+            no_aprobados=Count('pk', filter=Q(estado='NO_APROBADO')),
+        )
+        .order_by('resultado__competencia__codigo')
+    )
+
 
 class InasistenciaCreateView(LoginRequiredMixin, CreateView):
     model = Inasistencia
@@ -199,11 +368,76 @@ class InasistenciaCreateView(LoginRequiredMixin, CreateView):
     template_name = 'aprendices/inasistencia_form.html'
     success_url = reverse_lazy('inasistencia_list')
 
-class InasistenciaListView(LoginRequiredMixin, ListView):
+def _fecha(valor):
+    """Fecha AAAA-MM-DD de un parámetro GET, o None si falta o no es válida"""
+    try:
+        return parse_date(valor or '')
+    except ValueError:
+        return None
+
+
+class InasistenciaListView(LoginRequiredMixin, PaginacionKeysetMixin, ExportarListaMixin, ListView):
     model = Inasistencia
     template_name = 'aprendices/inasistencia_list.html'
     paginate_by = 50
-    ordering = ['-fecha']
+    orden_keyset = ['-fecha', '-id']
+    nombre_exportacion = 'inasistencias'
+    columnas_exportacion = [
+        ('Documento', 'aprendiz__documento'),
+        ('Nombre', 'aprendiz__nombre'),
+        ('Apellido', 'aprendiz__apellido'),
+        ('Ficha', 'ficha__numero'),
+        ('Fecha', 'fecha'),
+        ('Justificada', 'justificada'),
+        ('Motivo', 'motivo'),
+        ('Reportado Por', 'reportado_por'),
+    ]
+    filtros = ('ficha', 'documento', 'desde', 'hasta', 'justificada')
+
+    def get_queryset(self):
+        qs = Inasistencia.objects.select_related('aprendiz', 'ficha')
+        self.filtros_activos = {
+            campo: self.request.GET.get(campo, '').strip()
+            for campo in self.filtros
+            if self.request.GET.get(campo, '').strip()
+        }
+        filtros = self.filtros_activos
+
+        if 'ficha' in filtros:
+            qs = qs.filter(ficha_id=filtros['ficha'])
+        if 'documento' in filtros:
+            qs = qs.filter(aprendiz_id=filtros['documento'])
+        desde = _fecha(filtros.get('desde'))
+        if desde:
+            qs = qs.filter(fecha__gte=desde)
+        hasta = _fecha(filtros.get('hasta'))
+        if hasta:
+            qs = qs.filter(fecha__lte=hasta)
+        if filtros.get('justificada') in ('si', 'no'):
+            qs = qs.filter(justificada=filtros['justificada'] == 'si')
+
+        return qs.order_by(*self.orden_keyset)
+
+    def contar_resultados(self, queryset):
+        if self.filtros_activos:
+            # Los totales del encabezado salen de un solo aggregate, que también da el total de la lista
+            self.totales = queryset.aggregate(
+                total=Count('pk'),
+                justificadas=Count('pk', filter=Q(justificada=True)),
+            )
+        else:
+            # Sin filtros, del resumen global precalculado: contarlas todas recorrería la tabla
+            resumen = obtener_resumen()
+            self.totales = {'total': resumen.total_inasistencias, 'justificadas': resumen.inasistencias_justificadas}
+        self.totales['no_justificadas'] = self.totales['total'] - self.totales['justificadas']
+        return self.totales['total'], True
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx['totales'] = self.totales
+        ctx['filtros'] = self.filtros_activos
+        ctx['filtros_query'] = urlencode(self.filtros_activos)
+        return ctx
 
 class ActaCreateView(LoginRequiredMixin, CreateView):
     model = ActaComite
@@ -216,53 +450,88 @@ class DashboardView(LoginRequiredMixin, View):
     def get(self, request):
         return dashboard(request)
     
+def _ficha_y_centro(request):
+    """Ficha y centro de formación solicitados por GET (?ficha=...&centro=...)"""
+    ficha_id = request.GET.get('ficha')
+    centro_id = request.GET.get('centro')
+    
+    ficha = None
+    if ficha_id:
+        ficha = Ficha.objects.filter(numero=ficha_id).first()
+    centro = None
+    if centro_id:
+        centro = CentroFormacion.objects.filter(codigo=centro_id).first()
+    return ficha, centro
+
+
 @login_required
 def descargar_reporte_inasistencias(request):
-    """Genera y descarga reporte de inasistencias en Excel"""
+    """Genera (o sirve desde caché) y descarga reporte de inasistencias en Excel"""
     generador = GeneradorReportes()
     
-    ficha_id = request.GET.get('ficha')
+    ficha, centro = _ficha_y_centro(request)
     fecha_desde = request.GET.get('fecha_desde')
     fecha_hasta = request.GET.get('fecha_hasta')
     
-    ficha = None
-    if ficha_id:
-        ficha = Ficha.objects.filter(numero=ficha_id).first()
+    formato = formato_solicitado(request)
+    if formato:
+        columnas, filas = generador.tabla(
+            'inasistencias', ficha=ficha, fecha_desde=fecha_desde, fecha_hasta=fecha_hasta, centro=centro
+        )
+        return respuesta_exportacion(formato, 'reporte_inasistencias', columnas, filas)
     
-    excel_file = generador.generar_reporte_inasistencias(
-        ficha=ficha,
+    ruta = obtener_reporte(
+        'inasistencias',
+        lambda destino: generador.generar_reporte_inasistencias(
+            ficha=ficha,
+            fecha_desde=fecha_desde,
+            fecha_hasta=fecha_hasta,
+            centro=centro,
+            destino=destino
+        ),
+        ficha=ficha.numero if ficha else None,
+        centro=centro.codigo if centro else None,
         fecha_desde=fecha_desde,
-        fecha_hasta=fecha_hasta
+        fecha_hasta=fecha_hasta,
     )
     
-    response = HttpResponse(
-        excel_file.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
     filename = f'reporte_inasistencias_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response = FileResponse(
+        open(ruta, 'rb'),
+        as_attachment=True,
+        filename=filename,
+        content_type=XLSX_CONTENT_TYPE
+    )
     
     messages.success(request, f'Reporte de inasistencias generado: {filename}')
     return response
 
 @login_required
 def descargar_reporte_juicios(request):
-    """Genera y descarga reporte de juicios evaluativos en Excel"""
+    """Genera (o sirve desde caché) y descarga reporte de juicios evaluativos en Excel"""
     generador = GeneradorReportes()
     
-    ficha_id = request.GET.get('ficha')
-    ficha = None
-    if ficha_id:
-        ficha = Ficha.objects.filter(numero=ficha_id).first()
+    ficha, centro = _ficha_y_centro(request)
     
-    excel_file = generador.generar_reporte_juicios(ficha=ficha)
+    formato = formato_solicitado(request)
+    if formato:
+        columnas, filas = generador.tabla('juicios', ficha=ficha, centro=centro)
+        return respuesta_exportacion(formato, 'reporte_juicios', columnas, filas)
     
-    response = HttpResponse(
-        excel_file.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    ruta = obtener_reporte(
+        'juicios',
+        lambda destino: generador.generar_reporte_juicios(ficha=ficha, centro=centro, destino=destino),
+        ficha=ficha.numero if ficha else None,
+        centro=centro.codigo if centro else None,
     )
+    
     filename = f'reporte_juicios_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response = FileResponse(
+        open(ruta, 'rb'),
+        as_attachment=True,
+        filename=filename,
+        content_type=XLSX_CONTENT_TYPE
+    )
     
     messages.success(request, f'Reporte de juicios generado: {filename}')
     return response
@@ -270,47 +539,86 @@ def descargar_reporte_juicios(request):
 
 @login_required
 def descargar_reporte_circular120(request):
-    """Genera y descarga reporte Circular 120 completo en Excel"""
+    """Genera (o sirve desde caché) y descarga reporte Circular 120 completo en Excel"""
     generador = GeneradorReportes()
-    excel_file = generador.generar_reporte_circular120()
+    ficha, centro = _ficha_y_centro(request)
+    
+    formato = formato_solicitado(request)
+    if formato:
+        columnas, filas = generador.tabla('circular120', ficha=ficha, centro=centro)
+        return respuesta_exportacion(formato, 'reporte_circular120', columnas, filas)
     
-    response = HttpResponse(
-        excel_file.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    ruta = obtener_reporte(
+        'circular120',
+        lambda destino: generador.generar_reporte_circular120(ficha=ficha, centro=centro, destino=destino),
+        ficha=ficha.numero if ficha else None,
+        centro=centro.codigo if centro else None,
     )
+    
     filename = f'reporte_circular120_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response = FileResponse(
+        open(ruta, 'rb'),
+        as_attachment=True,
+        filename=filename,
+        content_type=XLSX_CONTENT_TYPE
+    )
     
     messages.success(request, f'Reporte Circular 120 generado: {filename}')
     return response
 
 
+@login_required
+def descargar_paquete_reportes(request, codigo_centro):
+    """
+    Descarga un ZIP con los reportes (inasistencias, juicios y Circular 120) de
+    cada ficha del centro. Los libros se generan en el pool compartido de
+    procesos y el ZIP se transmite a medida que van quedando listos.
+    """
+    centro = get_object_or_404(CentroFormacion, codigo=codigo_centro)
+    
+    filename = f'paquete_reportes_{centro.codigo}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.zip'
+    response = StreamingHttpResponse(flujo_paquete_centro(centro), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
 def generar_todos_reportes_view(request):
-    """Genera todos los reportes automáticamente"""
+    """Encola la generación de todos los reportes (globales y por centro) en Celery"""
     try:
-        reportes = generar_todos_reportes()
-        
-        exitosos = sum(1 for k, v in reportes.items() if not k.endswith('_error'))
-        errores = sum(1 for k in reportes.keys() if k.endswith('_error'))
-        
-        if exitosos > 0:
-            messages.success(
-                request,
-                f'✅ Se generaron {exitosos} reportes correctamente.'
-            )
-        
-        if errores > 0:
-            messages.warning(
-                request,
-                f'⚠ {errores} reportes tuvieron errores.'
-            )
-        
+        job_id = lanzar_generacion_reportes()
+        messages.success(
+            request,
+            f'⏳ Generación de reportes en curso (trabajo {job_id}). '
+            f'Los archivos quedarán registrados al terminar.'
+        )
     except Exception as e:
         messages.error(request, f'Error generando reportes: {e}')
     
     return redirect('dashboard')
 
+
+@login_required
+def estado_reportes_json(request, job_id):
+    """Estado de un trabajo de generación de reportes y sus archivos"""
+    reportes = ReporteGenerado.objects.filter(job_id=job_id).select_related('centro')
+    data = {
+        'job_id': job_id,
+        'reportes': [
+            {
+                'tipo': r.tipo,
+                'centro': r.centro.codigo if r.centro else None,
+                'estado': r.estado,
+                'url': r.archivo.url if r.archivo else None,
+                'tamano': r.tamano,
+                'error': r.error,
+            }
+            for r in reportes
+        ]
+    }
+    data['terminado'] = bool(data['reportes']) and all(r['estado'] != 'PENDIENTE' for r in data['reportes'])
+    return JsonResponse(data)
+
 class FileUploadView(LoginRequiredMixin, View):
     template_name = 'aprendices/upload_file.html'
     form_class = UploadFileWithDatesForm
@@ -319,6 +627,7 @@ class FileUploadView(LoginRequiredMixin, View):
         form = self.form_class()
         return render(request, self.template_name, {'form': form})
  
+    @method_decorator(lote_resumenes())
     def post(self, request):
         form = self.form_class(request.POST, request.FILES)
  
@@ -1,7 +1,6 @@
 # aprendices/views_fichas.py
 import os
 import pandas as pd
-from datetime import date
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, CreateView, UpdateView, DetailView, View
 from django.urls import reverse_lazy
@@ -10,31 +9,81 @@ from django.contrib import messages
 from django.conf import settings
 from django.utils.dateparse import parse_date
 from django.db import transaction
-from django.db.models import Count
+from django.db.models import Case, Count, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.decorators import method_decorator
 
 from .models import (
     Ficha, Aprendiz, Inasistencia,
     ResultadoAprendizaje, AprendizResultado, Competencia,
 )
 from .forms import FichaForm, UploadFichaDataForm
+from .utils.cache_vistas import en_cache
+from .utils.exportar import ExportarListaMixin
+from .utils.resumenes import clave_ficha, lote_resumenes, obtener_resumen
 
 
-class FichaListView(LoginRequiredMixin, ListView):
+def _conteo(queryset, campo):
+    """COUNT(*) de queryset agrupado por campo, como subconsulta escalar (0 si no hay filas)"""
+    return Coalesce(
+        Subquery(queryset.order_by().values(campo).annotate(n=Count("pk")).values("n")),
+        0,
+    )
+
+
+class FichaListView(LoginRequiredMixin, ExportarListaMixin, ListView):
     model = Ficha
     template_name = "aprendices/ficha_list.html"
     paginate_by = 20
     ordering = ["-fecha_inicio"]
+    nombre_exportacion = "fichas"
+    columnas_exportacion = [
+        ("Número", "numero"),
+        ("Programa", "programa"),
+        ("Instructor", "instructor"),
+        ("Centro", "centro__nombre"),
+        ("Fecha Inicio", "fecha_inicio"),
+        ("Fecha Fin", "fecha_fin"),
+        ("Aprendices", "num_aprendices"),
+        ("Inasistencias", "num_inasistencias"),
+        ("Estado", "estado_ficha"),
+    ]
+
+    def get_queryset(self):
+        # Conteos como subconsultas correlacionadas: sin JOIN que multiplique filas
+        hoy = timezone.localdate()
+        return super().get_queryset().annotate(
+            num_aprendices=_conteo(Aprendiz.objects.filter(ficha=OuterRef("pk")), "ficha"),
+            num_inasistencias=_conteo(Inasistencia.objects.filter(ficha=OuterRef("pk")), "ficha"),
+            estado_ficha=Case(
+                When(fecha_fin__lt=hoy, then=Value("vencida")),
+                default=Value("activa"),
+            ),
+        )
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        paginator = super().get_paginator(queryset, per_page, **kwargs)
+        # El COUNT se cachea; las filas de la página se leen dentro del fragmento cacheado de la tabla
+        paginator.count = en_cache("fichas:conteo", queryset.count, usuario=self.request.user)
+        return paginator
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        hoy = date.today()
-        ctx["total_fichas"]     = Ficha.objects.count()
-        ctx["total_aprendices"] = Aprendiz.objects.count()
-        ctx["fichas_activas"]   = Ficha.objects.filter(fecha_fin__gte=hoy).count()
-        ctx["fichas_vencidas"]  = Ficha.objects.filter(fecha_fin__lt=hoy).count()
-        ctx["hoy"] = hoy
+        ctx.update(en_cache("fichas:resumen", self.resumen_fichas, usuario=self.request.user))
+        ctx["hoy"] = timezone.localdate()
         return ctx
 
+    @staticmethod
+    def resumen_fichas():
+        resumen = obtener_resumen()
+        return {
+            "total_fichas":     resumen.total_fichas,
+            "total_aprendices": resumen.total_aprendices,
+            "fichas_activas":   resumen.fichas_activas,
+            "fichas_vencidas":  resumen.fichas_vencidas,
+        }
+
 
 class FichaCreateView(LoginRequiredMixin, CreateView):
     model = Ficha
@@ -64,18 +113,17 @@ class FichaDetailView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ficha = self.object
-        aprendices = ficha.aprendices.all()
-        ctx["total_aprendices"]      = aprendices.count()
-        ctx["aprendices_activos"]    = aprendices.exclude(
-            estado_formacion__in=["CANCELADO", "DESERTADO", "CERTIFICADO"]
-        ).count()
-        ctx["aprendices_certificados"] = aprendices.filter(estado_formacion="CERTIFICADO").count()
-        ctx["total_inasistencias"]   = Inasistencia.objects.filter(ficha=ficha).count()
-        ctx["aprendices_por_estado"] = aprendices.values("estado_formacion").annotate(
-            total=Count("documento")
+        resumen = obtener_resumen(clave_ficha(self.object.numero))
+        ctx["total_aprendices"]      = resumen.total_aprendices
+        ctx["aprendices_activos"]    = resumen.total_aprendices - resumen.total_estado(
+            "CANCELADO", "DESERTADO", "CERTIFICADO"
         )
-        ctx["hoy"] = date.today()
+        ctx["aprendices_certificados"] = resumen.total_estado("CERTIFICADO")
+        ctx["total_inasistencias"]   = resumen.total_inasistencias
+        ctx["aprendices_por_estado"] = resumen.distribucion_estados
+        # Los conteos por aprendiz son columnas de Aprendiz: una sola consulta para la tabla
+        ctx["aprendices"] = self.object.aprendices.all()
+        ctx["hoy"] = timezone.localdate()
         return ctx
 
 
@@ -86,8 +134,9 @@ class FichaUploadDataView(LoginRequiredMixin, View):
     def get(self, request, numero_ficha):
         ficha = get_object_or_404(Ficha, numero=numero_ficha)
         form = self.form_class(initial={"ficha": ficha})
-        return render(request, self.template_name, {"form": form, "ficha": ficha})
+        return render(request, self.template_name, self._contexto(form, ficha))
 
+    @method_decorator(lote_resumenes())
     def post(self, request, numero_ficha):
         ficha = get_object_or_404(Ficha, numero=numero_ficha)
         form = self.form_class(request.POST, request.FILES)
@@ -118,7 +167,14 @@ class FichaUploadDataView(LoginRequiredMixin, View):
                 if os.path.exists(tmp_path):
                     os.remove(tmp_path)
             return redirect("ficha_detail", pk=ficha.numero)
-        return render(request, self.template_name, {"form": form, "ficha": ficha})
+        return render(request, self.template_name, self._contexto(form, ficha))
+
+    def _contexto(self, form, ficha):
+        return {
+            "form": form,
+            "ficha": ficha,
+            "total_aprendices": obtener_resumen(clave_ficha(ficha.numero)).total_aprendices,
+        }
 
     # ── helpers ──────────────────────────────────────────────────
     def _find_column(self, df, candidates):
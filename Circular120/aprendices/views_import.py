@@ -5,6 +5,7 @@ from django.contrib.auth.decorators import login_required
 from tablib import Dataset
 from .models import Aprendiz, Ficha, Inasistencia
 from .resources import AprendizJuiciosResource
+from .utils.resumenes import lote_resumenes
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 
@@ -14,6 +15,7 @@ from dateutil.relativedelta import relativedelta
 # ══════════════════════════════════════════════════════════════════
 
 @login_required
+@lote_resumenes()
 def import_excel(request):
     if request.method == 'POST' and request.FILES.get('file'):
         try:
@@ -151,6 +153,7 @@ PALABRAS_INASISTENCIAS = [
 
 
 @login_required
+@lote_resumenes()
 def import_inasistencias(request):
     """Importa el Excel consolidado de inasistencias del SENA"""
     if request.method != 'POST' or not request.FILES.get('file'):